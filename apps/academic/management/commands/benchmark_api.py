@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from apps.accounts.models import User
+from config.benchmark import BENCHMARK_ENDPOINTS, dataset_summary, find_regressions, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the key API endpoints through the test client, recording p50/p95 '
+        'latency and query counts. Writes a JSON baseline with --output and fails '
+        'when results regress against one given with --baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--baseline', help='Compare the results with this JSON file')
+        parser.add_argument('--user', help='Username to request as (default: the first superuser)')
+        parser.add_argument('--runs', type=int, default=20, help='Timed requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per endpoint')
+        parser.add_argument('--tolerance', type=float, default=0.5, help='Allowed p50 slowdown as a fraction; p95 may slow by twice this')
+        parser.add_argument('--only', nargs='*', help='Endpoint names to run')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs must be at least 1")
+        known = {name for name, path in BENCHMARK_ENDPOINTS}
+        unknown = set(options['only'] or []) - known
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+        users = User.objects.filter(username=options['user']) if options['user'] else (
+            User.objects.filter(is_superuser=True, is_active=True).order_by('id')
+        )
+        user = users.first()
+        if user is None:
+            raise CommandError("No user to benchmark as. Pass --user or create a superuser.")
+
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = json.loads(Path(options['baseline']).read_text())
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        dataset = dataset_summary()
+        results = run_benchmark(user, runs=options['runs'], warmup=options['warmup'], names=options['only'])
+
+        self.stdout.write(f"{'endpoint':32} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'queries':>8}")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:32} {result['status']:>6} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['queries']:>8}"
+            )
+
+        if options['output']:
+            report = {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'runs': options['runs'],
+                'dataset': dataset,
+                'endpoints': results,
+            }
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is None:
+            return
+        if baseline.get('dataset') != dataset or baseline.get('database') != connection.vendor:
+            self.stdout.write(self.style.WARNING(
+                "Baseline was recorded against a different dataset or database; latency comparisons may be meaningless."
+            ))
+        regressions = find_regressions(baseline['endpoints'], results, latency_tolerance=options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(regression))
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
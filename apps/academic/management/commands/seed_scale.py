@@ -0,0 +1,505 @@
+import random
+import string
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Subject, Enrollment, SubjectAssignment
+from apps.attendance.models import Attendance
+from apps.finance.models import FeeStructure, Invoice, InvoiceItem, Payment, Expenditure
+from apps.grades.models import Grade
+from apps.staff.models import Staff, SalaryStructure, StaffAttendance
+from apps.students.models import Student, Parent, StudentParent
+from apps.teachers.models import Teacher
+
+
+# Every seeded identifier carries this prefix, so scale data never collides
+# with document numbers issued by the application
+PREFIX = 'SCALE'
+
+FIRST_NAMES = [
+    "Kwame", "Ama", "Kofi", "Akosua", "Yaw", "Abena", "Kwabena", "Adwoa", "Kojo", "Efua",
+    "James", "Mary", "John", "Grace", "David", "Esther", "Samuel", "Ruth", "Daniel", "Joyce",
+]
+LAST_NAMES = [
+    "Mensah", "Owusu", "Boateng", "Asante", "Osei", "Agyeman", "Addo", "Quansah", "Appiah", "Amoah",
+    "Darko", "Badu", "Frimpong", "Sarpong", "Ofori", "Annan", "Tetteh", "Nkrumah", "Acheampong", "Bonsu",
+]
+SUBJECTS = [
+    ('Mathematics', 'MATH'),
+    ('English Language', 'ENG'),
+    ('Integrated Science', 'SCI'),
+    ('Social Studies', 'SOC'),
+    ('Information Technology', 'ICT'),
+    ('French', 'FRE'),
+    ('Religious and Moral Education', 'RME'),
+    ('Creative Arts', 'ART'),
+]
+FEES = [
+    ("Tuition Fee", Decimal('1500.00'), FeeStructure.Frequency.TERM),
+    ("ICT Fee", Decimal('100.00'), FeeStructure.Frequency.TERM),
+    ("Development Levy", Decimal('200.00'), FeeStructure.Frequency.TERM),
+]
+GRADE_LEVELS = range(1, 13)
+INVOICE_TERMS = [Invoice.Term.TERM_1, Invoice.Term.TERM_2, Invoice.Term.TERM_3]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates a large school for load testing: students, parents, staff, a full '
+        'year of attendance and grades, invoices and payments. Uses bulk inserts and '
+        'rebuilds the precomputed tables afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=5000)
+        parser.add_argument('--staff', type=int, default=200)
+        parser.add_argument('--payments', type=int, default=30000)
+        parser.add_argument('--class-size', type=int, default=40)
+        parser.add_argument(
+            '--attendance-days', type=int, default=None,
+            help='Limit attendance to the first N school days (default: the whole year)'
+        )
+        parser.add_argument('--year', default='2025/2026', help='Academic year name, e.g. 2025/2026')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; equal seeds give equal data')
+        parser.add_argument('--password', default='password123', help='Password of every seeded user')
+
+    def handle(self, *args, **options):
+        if Student.objects.filter(admission_number__startswith=f'{PREFIX}/').exists():
+            raise CommandError("Scale data is already present. Run seed_scale against an empty database.")
+
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        started = timezone.now()
+
+        with transaction.atomic():
+            self.academic_year = self.seed_year(options['year'])
+            self.admin = self.seed_admin(options['password'])
+            staff = self.seed_staff(options['staff'], options['password'])
+            self.subjects = self.seed_subjects()
+            classes = self.seed_classes(options['students'], options['class_size'], staff)
+            enrollments = self.seed_students(options['students'], classes)
+        self.log(f"{len(enrollments)} students in {len(classes)} classes, {len(staff)} staff")
+
+        school_days = self.school_days(options['attendance_days'])
+        self.seed_attendance(enrollments, school_days)
+        self.seed_staff_attendance(staff, school_days)
+        self.log(f"Attendance for {len(school_days)} school days")
+
+        with transaction.atomic():
+            grades = self.seed_grades(enrollments)
+        self.log(f"{grades} grades")
+
+        with transaction.atomic():
+            invoices, payments = self.seed_finance(enrollments, options['payments'])
+        self.log(f"{invoices} invoices, {payments} payments")
+
+        # bulk_create bypasses the save() hooks that keep these tables current
+        for command in (
+            'rebuild_attendance_rollups',
+            'rebuild_finance_rollups',
+            'rebuild_grade_standings',
+            'rebuild_search_index',
+        ):
+            self.log(f"Running {command}...")
+            call_command(command, stdout=self.stdout)
+
+        elapsed = (timezone.now() - started).total_seconds()
+        self.stdout.write(self.style.SUCCESS(f"Seeded scale data in {elapsed:.0f}s"))
+
+    def log(self, message):
+        self.stdout.write(message)
+
+    def bulk_insert(self, model, objects, key):
+        """bulk_create, then backfill primary keys by a unique field where the backend cannot return them"""
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if objects and not connection.features.can_return_rows_from_bulk_insert:
+            ids = {}
+            for start in range(0, len(objects), self.batch_size):
+                values = [getattr(obj, key) for obj in objects[start:start + self.batch_size]]
+                ids.update(model.objects.filter(**{f'{key}__in': values}).values_list(key, 'id'))
+            for obj in objects:
+                obj.id = ids[getattr(obj, key)]
+        return objects
+
+    def seed_year(self, year_name):
+        start_year = int(year_name.split('/')[0])
+        academic_year, _ = AcademicYear.objects.get_or_create(
+            year_name=year_name,
+            defaults={
+                'start_date': date(start_year, 9, 1),
+                'end_date': date(start_year + 1, 7, 31),
+                'is_current': True,
+            }
+        )
+        return academic_year
+
+    def seed_admin(self, password):
+        admin, created = User.objects.get_or_create(
+            username=f'{PREFIX.lower()}.admin',
+            defaults={
+                'email': f'{PREFIX.lower()}.admin@example.com',
+                'role': User.Role.ADMIN,
+                'is_staff': True,
+                'is_superuser': True,
+            }
+        )
+        if created:
+            admin.set_password(password)
+            admin.save()
+        return admin
+
+    def seed_staff(self, count, password):
+        # Hashing once keeps 200 users from costing 200 key derivations
+        password_hash = make_password(password)
+        roles = [
+            (Staff.StaffType.HEADMASTER, User.Role.HEADMASTER),
+            (Staff.StaffType.BURSAR, User.Role.BURSAR),
+            (Staff.StaffType.BURSAR, User.Role.BURSAR),
+        ]
+        users, staff = [], []
+        for number in range(1, count + 1):
+            staff_type, role = roles[number - 1] if number <= len(roles) else (
+                Staff.StaffType.TEACHER, User.Role.TEACHER
+            )
+            first_name = self.random.choice(FIRST_NAMES)
+            last_name = self.random.choice(LAST_NAMES)
+            username = f'{PREFIX.lower()}.staff{number:04d}'
+            users.append(User(
+                username=username,
+                email=f'{username}@example.com',
+                first_name=first_name,
+                last_name=last_name,
+                role=role,
+                password=password_hash,
+            ))
+            staff.append(Staff(
+                first_name=first_name,
+                last_name=last_name,
+                email=f'{username}@example.com',
+                staff_type=staff_type,
+                gender=self.random.choice(Staff.Gender.values[:2]),
+                employment_date=date(2015, 1, 1) + timedelta(days=self.random.randint(0, 3650)),
+                national_id=f'{PREFIX}-STF-{number:05d}',
+                phone_number=f'+23320{number:07d}',
+            ))
+        self.bulk_insert(User, users, 'username')
+        for user, member in zip(users, staff):
+            member.user = user
+        self.bulk_insert(Staff, staff, 'national_id')
+
+        self.teachers = self.bulk_insert(Teacher, [
+            Teacher(user=member.user, first_name=member.first_name, last_name=member.last_name)
+            for member in staff if member.staff_type == Staff.StaffType.TEACHER
+        ], 'user_id')
+        SalaryStructure.objects.bulk_create([
+            SalaryStructure(
+                staff=member,
+                base_salary=Decimal(self.random.randrange(3000, 9000, 50)),
+                housing_allowance=Decimal('500.00'),
+                transport_allowance=Decimal('300.00'),
+                effective_from=member.employment_date,
+            )
+            for member in staff
+        ], batch_size=self.batch_size)
+        return staff
+
+    def seed_subjects(self):
+        subjects = []
+        for name, code in SUBJECTS:
+            subject, _ = Subject.objects.get_or_create(
+                subject_code=f'{PREFIX[:2]}-{code}',
+                defaults={'subject_name': name}
+            )
+            subjects.append(subject)
+        return subjects
+
+    def seed_classes(self, student_count, class_size, staff):
+        teaching_staff = [member for member in staff if member.staff_type == Staff.StaffType.TEACHER] or staff
+        per_level = -(-student_count // len(GRADE_LEVELS))
+        sections = max(1, -(-per_level // class_size))
+        classes = []
+        for level in GRADE_LEVELS:
+            for index in range(sections):
+                section = string.ascii_uppercase[index] if index < 26 else str(index + 1)
+                classes.append(Class(
+                    class_name=f'{PREFIX.title()} Grade {level}{section}',
+                    grade_level=level,
+                    section=section,
+                    academic_year=self.academic_year,
+                    class_teacher=self.teachers[len(classes) % len(self.teachers)] if self.teachers else None,
+                    capacity=class_size,
+                    room_number=f'R{level:02d}{section}',
+                ))
+        self.bulk_insert(Class, classes, 'class_name')
+
+        SubjectAssignment.objects.bulk_create([
+            SubjectAssignment(
+                class_obj=class_obj,
+                subject=subject,
+                teacher=teaching_staff[(position * len(self.subjects) + offset) % len(teaching_staff)],
+            )
+            for position, class_obj in enumerate(classes)
+            for offset, subject in enumerate(self.subjects)
+        ], batch_size=self.batch_size)
+        return classes
+
+    def seed_students(self, count, classes):
+        students, parents, placements = [], [], []
+        for number in range(1, count + 1):
+            class_obj = classes[(number - 1) % len(classes)]
+            last_name = self.random.choice(LAST_NAMES)
+            age = 5 + class_obj.grade_level
+            students.append(Student(
+                admission_number=f'{PREFIX}/{number:06d}',
+                first_name=self.random.choice(FIRST_NAMES),
+                last_name=last_name,
+                date_of_birth=self.academic_year.start_date - timedelta(days=age * 365 + self.random.randint(0, 364)),
+                gender=self.random.choice(Student.Gender.values[:2]),
+                admission_date=self.academic_year.start_date - timedelta(days=self.random.randint(0, 365 * 3)),
+                status=Student.Status.ACTIVE,
+                class_obj=class_obj,
+                nationality="Ghanaian",
+                created_by=self.admin,
+            ))
+            placements.append(class_obj)
+            # Every student has a mother; every other one a father as well
+            for relationship in (Parent.Relationship.MOTHER, Parent.Relationship.FATHER)[:1 + number % 2]:
+                parents.append((number - 1, Parent(
+                    first_name=self.random.choice(FIRST_NAMES),
+                    last_name=last_name,
+                    phone_number=f'+23324{len(parents) + 1:07d}',
+                    email=f'{PREFIX.lower()}.parent{len(parents) + 1}@example.com',
+                    relationship=relationship,
+                )))
+        self.bulk_insert(Student, students, 'admission_number')
+        self.bulk_insert(Parent, [parent for position, parent in parents], 'email')
+
+        StudentParent.objects.bulk_create([
+            StudentParent(
+                student=students[position],
+                parent=parent,
+                is_primary_contact=parent.relationship == Parent.Relationship.MOTHER,
+            )
+            for position, parent in parents
+        ], batch_size=self.batch_size)
+
+        roll_numbers = {}
+        enrollments = []
+        for student, class_obj in zip(students, placements):
+            roll_numbers[class_obj.pk] = roll_numbers.get(class_obj.pk, 0) + 1
+            enrollments.append(Enrollment(
+                student=student,
+                class_obj=class_obj,
+                roll_number=roll_numbers[class_obj.pk],
+                status=Enrollment.EnrollmentStatus.ACTIVE,
+            ))
+        Enrollment.objects.bulk_create(enrollments, batch_size=self.batch_size)
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids = dict(Enrollment.objects.filter(
+                class_obj__in=classes
+            ).values_list('student_id', 'id'))
+            for enrollment in enrollments:
+                enrollment.id = ids[enrollment.student_id]
+        return enrollments
+
+    def school_days(self, limit):
+        days = []
+        day = self.academic_year.start_date
+        while day <= self.academic_year.end_date and (limit is None or len(days) < limit):
+            if day.weekday() < 5:
+                days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def seed_attendance(self, enrollments, school_days):
+        statuses = Attendance.AttendanceStatus
+        weights = [(statuses.PRESENT, 0.92), (statuses.ABSENT, 0.04), (statuses.LATE, 0.03), (statuses.EXCUSED, 0.01)]
+        population = [status for status, weight in weights]
+        cumulative = [weight for status, weight in weights]
+        # One insert batch per day keeps a year of records out of memory
+        for day in school_days:
+            picks = self.random.choices(population, weights=cumulative, k=len(enrollments))
+            Attendance.objects.bulk_create([
+                Attendance(
+                    student_id=enrollment.student_id,
+                    class_obj_id=enrollment.class_obj_id,
+                    attendance_date=day,
+                    status=status,
+                    marked_by=self.admin,
+                )
+                for enrollment, status in zip(enrollments, picks)
+            ], batch_size=self.batch_size)
+
+    def seed_staff_attendance(self, staff, school_days):
+        statuses = StaffAttendance.AttendanceStatus
+        records = []
+        for day in school_days:
+            for member in staff:
+                roll = self.random.random()
+                if roll < 0.03:
+                    records.append(StaffAttendance(staff=member, attendance_date=day, status=statuses.ABSENT))
+                    continue
+                if roll < 0.05:
+                    records.append(StaffAttendance(staff=member, attendance_date=day, status=statuses.ON_LEAVE))
+                    continue
+                check_in = datetime.combine(day, time(7, 0)) + timedelta(minutes=self.random.randint(20, 75))
+                check_out = datetime.combine(day, time(16, 0)) + timedelta(minutes=self.random.randint(0, 60))
+                records.append(StaffAttendance(
+                    staff=member,
+                    attendance_date=day,
+                    status=statuses.PRESENT,
+                    check_in=timezone.make_aware(check_in),
+                    check_out=timezone.make_aware(check_out),
+                ))
+            if len(records) >= self.batch_size:
+                StaffAttendance.objects.bulk_create(records, batch_size=self.batch_size)
+                records = []
+        StaffAttendance.objects.bulk_create(records, batch_size=self.batch_size)
+
+    def seed_grades(self, enrollments):
+        academic_year = self.academic_year.year_name.replace('/', '-')
+        ability = {enrollment.student_id: self.random.uniform(35, 90) for enrollment in enrollments}
+        count = 0
+        for term in Grade.Term.values:
+            for subject in self.subjects:
+                grades = []
+                for enrollment in enrollments:
+                    score = min(max(ability[enrollment.student_id] + self.random.uniform(-12, 12), 0), 100)
+                    grade = Grade(
+                        student_id=enrollment.student_id,
+                        subject=subject,
+                        class_obj_id=enrollment.class_obj_id,
+                        enrollment=enrollment,
+                        entered_by=self.admin,
+                        academic_year=academic_year,
+                        term=term,
+                        grade_type=Grade.GradeType.FINAL,
+                        assessment_score=Decimal(score).quantize(Decimal('0.01')),
+                        test_score=Decimal(score).quantize(Decimal('0.01')),
+                        exam_score=Decimal(score).quantize(Decimal('0.01')),
+                        weighted_assessment=Decimal(score * 0.20).quantize(Decimal('0.01')),
+                        weighted_test=Decimal(score * 0.30).quantize(Decimal('0.01')),
+                        weighted_exam=Decimal(score * 0.50).quantize(Decimal('0.01')),
+                    )
+                    # What Grade.save() derives
+                    grade.total_score = grade.weighted_assessment + grade.weighted_test + grade.weighted_exam
+                    grade.grade_letter = grade.calculate_letter_grade(grade.total_score)
+                    grades.append(grade)
+                Grade.objects.bulk_create(grades, batch_size=self.batch_size)
+                count += len(grades)
+        return count
+
+    def seed_finance(self, enrollments, payment_count):
+        structures = FeeStructure.objects.bulk_create([
+            FeeStructure(
+                academic_year=self.academic_year,
+                category_name=f'{name} ({PREFIX.title()})',
+                amount=amount,
+                frequency=frequency,
+                term=FeeStructure.Term.ALL,
+                is_mandatory=True,
+            )
+            for name, amount, frequency in FEES
+        ])
+        if not connection.features.can_return_rows_from_bulk_insert:
+            structures = list(FeeStructure.objects.filter(
+                academic_year=self.academic_year, category_name__endswith=f'({PREFIX.title()})'
+            ).order_by('id'))
+        total = sum(structure.amount for structure in structures)
+
+        term_starts = [self.academic_year.start_date + timedelta(days=offset) for offset in (0, 120, 240)]
+        invoices = []
+        for invoice_term, term_start in zip(INVOICE_TERMS, term_starts):
+            for enrollment in enrollments:
+                invoices.append(Invoice(
+                    invoice_number=f'{PREFIX}-INV-{len(invoices) + 1:07d}',
+                    student_id=enrollment.student_id,
+                    academic_year=self.academic_year,
+                    term=invoice_term,
+                    total_amount=total,
+                    amount_paid=Decimal('0.00'),
+                    balance=total,
+                    due_date=term_start + timedelta(days=30),
+                    generated_by=self.admin,
+                ))
+        self.bulk_insert(Invoice, invoices, 'invoice_number')
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=invoice, fee_structure=structure, description=structure.category_name,
+                        amount=structure.amount)
+            for invoice in invoices
+            for structure in structures
+        ], batch_size=self.batch_size)
+
+        # Spread the payments over the invoices in instalments
+        payments, paid_on = [], {}
+        methods = Payment.PaymentMethod.values
+        open_invoices = list(invoices)
+        while len(payments) < payment_count and open_invoices:
+            position = self.random.randrange(len(open_invoices))
+            invoice = open_invoices[position]
+            amount = min(invoice.balance, Decimal(self.random.randrange(100, 1200, 50)))
+            invoice.amount_paid += amount
+            invoice.balance -= amount
+            if invoice.balance <= 0:
+                open_invoices[position] = open_invoices[-1]
+                open_invoices.pop()
+            number = len(payments) + 1
+            payment_number = f'{PREFIX}-PAY-{number:07d}'
+            term_start = term_starts[int(invoice.term) - 1]
+            paid_on[payment_number] = term_start + timedelta(days=self.random.randint(0, 100))
+            payments.append(Payment(
+                payment_number=payment_number,
+                invoice=invoice,
+                amount_paid=amount,
+                payment_method=self.random.choice(methods),
+                transaction_reference=f'{PREFIX}-REF-{number:07d}',
+                received_by=self.admin,
+            ))
+        Payment.objects.bulk_create(payments, batch_size=self.batch_size)
+
+        # payment_date is auto_now_add, so backdate it one day at a time
+        numbers_by_day = {}
+        for payment_number, day in paid_on.items():
+            numbers_by_day.setdefault(day, []).append(payment_number)
+        for day, numbers in numbers_by_day.items():
+            paid_at = timezone.make_aware(datetime.combine(day, time(10, 0)))
+            for start in range(0, len(numbers), self.batch_size):
+                Payment.objects.filter(
+                    payment_number__in=numbers[start:start + self.batch_size]
+                ).update(payment_date=paid_at)
+
+        # What Invoice.save() derives
+        for invoice in invoices:
+            if invoice.balance <= 0:
+                invoice.status = Invoice.InvoiceStatus.PAID
+            elif invoice.amount_paid > 0:
+                invoice.status = Invoice.InvoiceStatus.PARTIAL
+        Invoice.objects.bulk_update(
+            [invoice for invoice in invoices if invoice.amount_paid > 0],
+            ['amount_paid', 'balance', 'status'],
+            batch_size=self.batch_size
+        )
+
+        categories = Expenditure.Category.values
+        Expenditure.objects.bulk_create([
+            Expenditure(
+                expenditure_number=f'{PREFIX}-EXP-{number:05d}',
+                item_name=f'{category.title()} expense',
+                category=category,
+                amount=Decimal(self.random.randrange(100, 5000, 10)),
+                transaction_date=self.academic_year.start_date + timedelta(days=self.random.randint(0, 330)),
+                payment_method=Expenditure.PaymentMethod.BANK_TRANSFER,
+                approved_by=self.admin,
+                processed_by=self.admin,
+            )
+            for number, category in enumerate(
+                (self.random.choice(categories) for _ in range(len(enrollments) // 10 or 1)), start=1
+            )
+        ], batch_size=self.batch_size)
+        return len(invoices), len(payments)
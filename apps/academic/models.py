@@ -62,6 +62,9 @@ class Class(models.Model):
     
     @property
     def current_enrollment(self):
+        """Active enrollments, read from an active_enrollment_count annotation when present"""
+        if hasattr(self, 'active_enrollment_count'):
+            return self.active_enrollment_count
         return self.enrollments.filter(status='active').count()
 
 
@@ -8,7 +8,7 @@ from .serializers import (
     AcademicYearSerializer, ClassSerializer, SubjectSerializer,
     EnrollmentSerializer, SubjectAssignmentSerializer, ClassDetailSerializer
 )
-from apps.accounts.permissions import CanManageStudents, IsAdminOrHeadmaster
+from apps.accounts.permissions import CanManageStudents, ClassScopedMixin, IsAdminOrHeadmaster
 
 
 class AcademicYearViewSet(viewsets.ModelViewSet):
@@ -138,7 +138,7 @@ class ClassViewSet(viewsets.ModelViewSet):
             'gender_breakdown': list(gender_breakdown)
         })
     
-class EnrollmentViewSet(viewsets.ModelViewSet):
+class EnrollmentViewSet(ClassScopedMixin, viewsets.ModelViewSet):
     """ViewSet for Enrollment management"""
     queryset = Enrollment.objects.select_related('student', 'class_obj').all()
     serializer_class = EnrollmentSerializer
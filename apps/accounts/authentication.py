@@ -0,0 +1,101 @@
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import router
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from .models import User, ClaimsUser
+
+
+CLAIM_NAMES = ClaimsUser.CLAIM_FIELDS + ('teacher_id', 'staff_id')
+STATUS_CACHE_MAX_ENTRIES = 10000
+
+# user pk -> (expires_at, status); per process, so no network round trip
+_status_cache = {}
+
+
+def to_user_pk(user_id):
+    """Token user IDs may be serialized as strings"""
+    return User._meta.pk.to_python(user_id)
+
+
+def status_cache_timeout():
+    return getattr(settings, 'JWT_USER_STATUS_TIMEOUT', 60)
+
+
+def load_user_claims(user_id):
+    """Current is_active flag and token claims of a user, None if it does not exist"""
+    row = User.objects.filter(pk=user_id).values_list(
+        'is_active', 'role', 'is_superuser', 'is_staff', 'teacher_profile__id', 'staff_profile__id'
+    ).first()
+    if row is None:
+        return None
+    return {'is_active': row[0], **dict(zip(CLAIM_NAMES, row[1:]))}
+
+
+def get_user_status(user_id):
+    """load_user_claims() through the in-process cache"""
+    user_id = to_user_pk(user_id)
+    now = time.monotonic()
+    entry = _status_cache.get(user_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    status = load_user_claims(user_id)
+    if len(_status_cache) >= STATUS_CACHE_MAX_ENTRIES:
+        _status_cache.clear()
+    _status_cache[user_id] = (now + status_cache_timeout(), status)
+    return status
+
+
+def forget_user_status(user_id):
+    """
+    Drop a user's cached status so their next request re-reads it. Only this
+    process is affected; other workers pick the change up within
+    JWT_USER_STATUS_TIMEOUT seconds.
+    """
+    _status_cache.pop(to_user_pk(user_id), None)
+
+
+def add_user_claims(token, claims):
+    for name in CLAIM_NAMES:
+        token[name] = claims[name]
+    return token
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that builds request.user from the token's claims.
+
+    Role and profile claims are trusted once checked against the in-process
+    status cache, so most requests authenticate without touching the users
+    table. A deactivated user is rejected, and a token whose claims no longer
+    match the user is rejected so the client refreshes it. Tokens issued
+    before the claims existed fall back to loading the user.
+    """
+
+    def get_user(self, validated_token):
+        if any(name not in validated_token for name in CLAIM_NAMES):
+            return super().get_user(validated_token)
+
+        try:
+            user_id = to_user_pk(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, ValidationError):
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        status = get_user_status(user_id)
+        if status is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+        if not status['is_active']:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if any(validated_token[name] != status[name] for name in CLAIM_NAMES):
+            raise InvalidToken("Token claims are out of date")
+
+        return ClaimsUser.from_claims(user_id, validated_token, db=router.db_for_read(User))
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """Document ClaimsJWTAuthentication as the usual bearer JWT scheme"""
+
+    target_class = 'apps.accounts.authentication.ClaimsJWTAuthentication'
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+PRINCIPAL_VERSION_KEY = 'accounts:principal:version'
+
+
+def get_principal_version():
+    """Current version of the cached principals"""
+    version = cache.get(PRINCIPAL_VERSION_KEY)
+    if version is None:
+        # A fresh timestamp cannot collide with entries written under an evicted version
+        cache.add(PRINCIPAL_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(PRINCIPAL_VERSION_KEY)
+    return version
+
+
+def principal_cache_key(user_id):
+    return f'accounts:principal:v{get_principal_version()}:{user_id}'
+
+
+def principal_cache_timeout():
+    return getattr(settings, 'PRINCIPAL_CACHE_TIMEOUT', 3600)
+
+
+def invalidate_principals():
+    """
+    Retire every cached principal once the current transaction commits.
+    Teaching assignments change rarely, so one version bump is cheaper than
+    working out which users an assignment touched.
+    """
+    transaction.on_commit(lambda: cache.set(PRINCIPAL_VERSION_KEY, time.time_ns(), None))
@@ -53,4 +53,34 @@ class User(AbstractUser):
         }
         
         user_permissions = permission_map.get(self.role, [])
-        return 'all' in user_permissions or permission in user_permissions
\ No newline at end of file
+        return 'all' in user_permissions or permission in user_permissions
+
+class ClaimsUser(User):
+    """
+    A User rebuilt from access token claims without a database query.
+
+    Only the claimed fields are loaded; the rest are deferred, and touching any
+    of them loads all of them in a single query. It is still a User, so it can
+    be assigned to foreign keys and compared with other users.
+    """
+
+    CLAIM_FIELDS = ('role', 'is_superuser', 'is_staff')
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, claims, db=None):
+        values = {'id': user_id, 'is_active': True}
+        values.update({field: claims[field] for field in cls.CLAIM_FIELDS})
+        field_names = [field.attname for field in cls._meta.concrete_fields if field.attname in values]
+        user = cls.from_db(db, field_names, [values[name] for name in field_names])
+        user.teacher_id = claims.get('teacher_id')
+        user.staff_id = claims.get('staff_id')
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
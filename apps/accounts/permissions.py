@@ -1,90 +1,199 @@
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.functional import cached_property
 from rest_framework import permissions
-from .models import User
+from rest_framework.exceptions import PermissionDenied
+from apps.academic.models import Class
+from .cache import principal_cache_key, principal_cache_timeout
+from .models import User, ClaimsUser
 
 
-class IsAdminOrHeadmaster(permissions.BasePermission):
-    """Permission for admin and headmaster only"""
-    
+class Principal:
+    """
+    The requesting user's role and teaching scope.
+
+    Role flags come from the already-loaded user. The teacher/staff profile IDs
+    and the IDs of classes the user teaches (as class teacher or through a
+    subject assignment) are loaded on first use, cached per user and
+    invalidated when assignments change, so role-only checks cost nothing.
+    """
+
+    def __init__(self, user):
+        self.user_id = user.pk
+        self.role = user.role
+        self.is_superuser = user.is_superuser
+        self.is_staff = user.is_staff
+        # Access token claims already carry the profile IDs
+        self._profile_ids = (user.teacher_id, user.staff_id) if isinstance(user, ClaimsUser) else None
+
+    @cached_property
+    def _scope(self):
+        cache_key = principal_cache_key(self.user_id)
+        scope = cache.get(cache_key)
+        if scope is None:
+            teacher_id, staff_id = User.objects.filter(pk=self.user_id).values_list(
+                'teacher_profile__id', 'staff_profile__id'
+            ).first() or (None, None)
+            class_ids = frozenset(
+                Class.objects.filter(
+                    Q(class_teacher__user_id=self.user_id) |
+                    Q(subject_assignments__teacher__user_id=self.user_id)
+                ).values_list('id', flat=True)
+            )
+            scope = (teacher_id, staff_id, class_ids)
+            cache.set(cache_key, scope, principal_cache_timeout())
+        return scope
+
+    @property
+    def teacher_id(self):
+        return (self._profile_ids or self._scope)[0]
+
+    @property
+    def staff_id(self):
+        return (self._profile_ids or self._scope)[1]
+
+    @property
+    def class_ids(self):
+        return self._scope[2]
+
+    def has_role(self, *roles):
+        return self.role in roles
+
+    @property
+    def is_admin(self):
+        """Unrestricted access: superusers, admins and headmasters"""
+        return self.is_superuser or self.has_role(User.Role.ADMIN, User.Role.HEADMASTER)
+
+    @property
+    def is_teacher(self):
+        return self.teacher_id is not None or self.has_role(User.Role.TEACHER)
+
+    def can_manage_class(self, class_id):
+        if self.is_admin:
+            return True
+        return class_id is not None and int(class_id) in self.class_ids
+
+    def scope_to_classes(self, queryset, class_field='class_obj'):
+        """Rows of classes this principal may manage, as a queryset filter"""
+        if self.is_admin:
+            return queryset
+        return queryset.filter(**{f'{class_field}__in': self.class_ids})
+
+
+def get_principal(request):
+    """The principal for a request's user, resolved at most once per request"""
+    user = request.user
+    if not (user and user.is_authenticated):
+        return None
+    # Memoised on the underlying HttpRequest, which DRF's Request wraps
+    http_request = getattr(request, '_request', request)
+    principal = getattr(http_request, 'principal', None)
+    if principal is None or principal.user_id != user.pk:
+        principal = http_request.principal = Principal(user)
+    return principal
+
+
+class ClassScopedMixin:
+    """
+    Viewset mixin limiting teachers' writes to classes they teach.
+
+    Updates and deletes filter the queryset by the principal's classes, so rows
+    outside them 404 without a per-object query; creates and updates check the
+    target class against the same in-memory set.
+    """
+
+    class_scope_field = 'class_obj'
+    class_scoped_actions = ('update', 'partial_update', 'destroy')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in self.class_scoped_actions:
+            queryset = get_principal(self.request).scope_to_classes(queryset, self.class_scope_field)
+        return queryset
+
+    def check_class_scope(self, class_obj):
+        class_id = getattr(class_obj, 'pk', class_obj)
+        if not get_principal(self.request).can_manage_class(class_id):
+            raise PermissionDenied("You can only manage records for classes you teach.")
+
+    def perform_create(self, serializer):
+        self.check_class_scope(serializer.validated_data.get(self.class_scope_field))
+        super().perform_create(serializer)
+
+    def perform_update(self, serializer):
+        if self.class_scope_field in serializer.validated_data:
+            self.check_class_scope(serializer.validated_data[self.class_scope_field])
+        super().perform_update(serializer)
+
+
+class PrincipalPermission(permissions.BasePermission):
+    """Base for role checks made against the request principal"""
+
     def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.role in [User.Role.ADMIN, User.Role.HEADMASTER]
-        )
+        principal = get_principal(request)
+        return principal is not None and self.allows(principal, request)
 
+    def allows(self, principal, request):
+        raise NotImplementedError
 
-class IsBursar(permissions.BasePermission):
+
+class IsAdminOrHeadmaster(PrincipalPermission):
+    """Permission for admin and headmaster only"""
+
+    def allows(self, principal, request):
+        return principal.has_role(User.Role.ADMIN, User.Role.HEADMASTER)
+
+
+class IsBursar(PrincipalPermission):
     """Permission for bursar only"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.role == User.Role.BURSAR
-        )
 
+    def allows(self, principal, request):
+        return principal.has_role(User.Role.BURSAR)
 
-class IsTeacher(permissions.BasePermission):
+
+class IsTeacher(PrincipalPermission):
     """Permission for teachers"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.role == User.Role.TEACHER
-        )
+
+    def allows(self, principal, request):
+        return principal.has_role(User.Role.TEACHER)
+
+
+class IsTeacherOrAdmin(PrincipalPermission):
+    """Permission for superusers, staff users and anyone with a teacher profile"""
+
+    def allows(self, principal, request):
+        return principal.is_superuser or principal.is_staff or principal.teacher_id is not None
 
 
-class CanManageStaff(permissions.BasePermission):
+class CanManageStaff(PrincipalPermission):
     """Permission to manage staff (admin and headmaster)"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.role in [User.Role.ADMIN, User.Role.HEADMASTER]
-        )
 
+    def allows(self, principal, request):
+        return principal.has_role(User.Role.ADMIN, User.Role.HEADMASTER)
 
-class CanManageFinance(permissions.BasePermission):
+
+class CanManageFinance(PrincipalPermission):
     """Permission to manage finance (admin, headmaster, bursar)"""
-    
-    def has_permission(self, request, view):
-        return (
-            request.user and
-            request.user.is_authenticated and
-            request.user.role in [User.Role.ADMIN, User.Role.HEADMASTER, User.Role.BURSAR]
-        )
+
+    def allows(self, principal, request):
+        return principal.has_role(User.Role.ADMIN, User.Role.HEADMASTER, User.Role.BURSAR)
 
 
-class CanManageStudents(permissions.BasePermission):
+class CanManageStudents(PrincipalPermission):
     """Permission to manage students (superuser, admin, headmaster, teacher)"""
-    
-    def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-            
-        return (
-            request.user.is_superuser or 
-            request.user.role in [
-                User.Role.ADMIN, 
-                User.Role.HEADMASTER, 
-                User.Role.TEACHER
-            ]
+
+    def allows(self, principal, request):
+        return principal.is_superuser or principal.has_role(
+            User.Role.ADMIN,
+            User.Role.HEADMASTER,
+            User.Role.TEACHER
         )
-class CanManageGrades(permissions.BasePermission):
-    """Permission to manage grades (admin, headmaster, teacher)"""
-    
-    def has_permission(self, request, view):
-        if not (request.user and request.user.is_authenticated):
-            return False
-        
-        # Admin and headmaster have full access
-        if request.user.role in [User.Role.ADMIN, User.Role.HEADMASTER]:
-            return True
-        
-        # Teachers can manage grades
-        if request.user.role == User.Role.TEACHER:
+
+
+class CanManageGrades(PrincipalPermission):
+    """Read access for any authenticated user; writes for admin, headmaster and teachers"""
+
+    def allows(self, principal, request):
+        if request.method in permissions.SAFE_METHODS:
             return True
-        
-        return False
\ No newline at end of file
+        return principal.is_admin or principal.has_role(User.Role.TEACHER)
\ No newline at end of file
@@ -1,6 +1,10 @@
 from rest_framework import serializers
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth import authenticate
+from .authentication import add_user_claims, load_user_claims
 from .models import User
 
 
@@ -31,6 +35,12 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     
     username_field = 'email'
     
+    @classmethod
+    def get_token(cls, user):
+        """Embed role and profile claims so requests can skip the user lookup"""
+        token = super().get_token(user)
+        return add_user_claims(token, load_user_claims(user.pk))
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         # Replace username field with email
@@ -77,8 +87,23 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class CustomTokenRefreshSerializer(TokenRefreshSerializer):
-    """Custom token refresh serializer"""
-    pass
+    """
+    Custom token refresh serializer that re-reads the user's claims, so a
+    role or profile change reaches the client on its next refresh
+    """
+    
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        
+        user_id = AccessToken(data['access'])[api_settings.USER_ID_CLAIM]
+        claims = load_user_claims(user_id)
+        if claims is None or not claims['is_active']:
+            raise AuthenticationFailed(self.error_messages['no_active_account'], 'no_active_account')
+        
+        data['access'] = str(add_user_claims(AccessToken(data['access']), claims))
+        if 'refresh' in data:
+            data['refresh'] = str(add_user_claims(RefreshToken(data['refresh']), claims))
+        return data
 
 
 class ChangePasswordSerializer(serializers.Serializer):
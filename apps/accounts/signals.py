@@ -0,0 +1,33 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.academic.models import Class, SubjectAssignment
+from apps.staff.models import Staff
+from apps.teachers.models import Teacher
+from .authentication import forget_user_status
+from .cache import invalidate_principals
+from .models import User, ClaimsUser
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=ClaimsUser)
+def forget_saved_user_status(sender, instance, raw=False, **kwargs):
+    """Deactivation and role changes take effect on this worker's next request"""
+    if not raw:
+        forget_user_status(instance.pk)
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+@receiver(post_save, sender=SubjectAssignment)
+@receiver(post_delete, sender=SubjectAssignment)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def invalidate_teaching_scope(sender, raw=False, **kwargs):
+    """Class teachers, subject assignments and profile links define who teaches which class"""
+    if raw:
+        return
+    if sender in (Teacher, Staff):
+        forget_user_status(kwargs['instance'].user_id)
+    invalidate_principals()
@@ -1,3 +1,147 @@
-from django.test import TestCase
+from datetime import date
+from django.core.cache import cache
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.academic.models import AcademicYear, Class
+from apps.teachers.models import Teacher
+from .authentication import ClaimsJWTAuthentication, _status_cache
+from .models import ClaimsUser, User
+from .permissions import Principal
+from .serializers import CustomTokenObtainPairSerializer
 
-# Create your tests here.
+
+class PrincipalCacheTest(TestCase):
+    """Teaching scope is resolved once, cached per user and retired when assignments change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='head', password='head-pass-123', role=User.Role.ADMIN
+        )
+        cls.teacher_user = User.objects.create_user(
+            username='tutor', password='tutor-pass-123', role=User.Role.TEACHER
+        )
+        cls.teacher = Teacher.objects.create(user=cls.teacher_user, first_name='Adjoa', last_name='Quaye')
+        year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.own_class = Class.objects.create(
+            class_name='Grade 2A', grade_level=2, academic_year=year, class_teacher=cls.teacher
+        )
+        cls.other_class = Class.objects.create(class_name='Grade 2B', grade_level=2, academic_year=year)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_role_checks_do_not_query(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(Principal(self.admin).is_admin)
+            self.assertTrue(Principal(self.admin).can_manage_class(self.other_class.pk))
+            self.assertFalse(Principal(self.teacher_user).is_admin)
+
+    def test_scope_is_cached_across_requests(self):
+        with self.assertNumQueries(2):
+            # profile ids, taught classes
+            self.assertEqual(Principal(self.teacher_user).class_ids, {self.own_class.pk})
+
+        with self.assertNumQueries(0):
+            principal = Principal(self.teacher_user)
+            self.assertEqual(principal.teacher_id, self.teacher.pk)
+            self.assertTrue(principal.can_manage_class(self.own_class.pk))
+            self.assertFalse(principal.can_manage_class(self.other_class.pk))
+
+    def test_assignment_change_retires_cached_scope_on_commit(self):
+        self.assertEqual(Principal(self.teacher_user).class_ids, {self.own_class.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_class.class_teacher = self.teacher
+            self.other_class.save()
+
+        self.assertEqual(Principal(self.teacher_user).class_ids, {self.own_class.pk, self.other_class.pk})
+
+    def test_teachers_write_only_to_classes_they_teach(self):
+        client = APIClient()
+        client.force_authenticate(self.teacher_user)
+
+        def mark(school_class):
+            return client.post('/attendance/bulk_mark/', {
+                'class_id': school_class.pk,
+                'attendance_date': date(2025, 10, 6),
+                'attendance_records': [],
+            }, format='json')
+
+        self.assertEqual(mark(self.own_class).status_code, 201)
+        self.assertEqual(mark(self.other_class).status_code, 403)
+
+
+class ClaimsAuthenticationTest(TestCase):
+    """Requests with current token claims authenticate without reading the users table"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            username='head', email='head@example.com', password='head-pass-123', role=User.Role.ADMIN
+        )
+        cls.teacher = User.objects.create_user(
+            username='tutor', email='tutor@example.com', password='tutor-pass-123',
+            role=User.Role.TEACHER, first_name='Adjoa'
+        )
+
+    def setUp(self):
+        _status_cache.clear()
+
+    def bearer(self, user):
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        return f'Bearer {token}'
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=self.bearer(user))
+        return client
+
+    def users_queries(self, queries):
+        return [query['sql'] for query in queries.captured_queries if '"users"' in query['sql']]
+
+    def test_valid_claims_skip_the_users_table(self):
+        client = self.client_for(self.teacher)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/search/', {'q': ''}).status_code, 200)
+        # The first request of the status cache window checks is_active once
+        self.assertEqual(len(self.users_queries(queries)), 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/search/', {'q': ''}).status_code, 200)
+        self.assertEqual(self.users_queries(queries), [])
+
+    def test_non_claim_fields_load_lazily(self):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=self.bearer(self.teacher))
+        ClaimsJWTAuthentication().authenticate(request)
+
+        with self.assertNumQueries(0):
+            user, token = ClaimsJWTAuthentication().authenticate(request)
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertEqual((user.pk, user.role), (self.teacher.pk, User.Role.TEACHER))
+            self.assertEqual(user, self.teacher)
+
+        with self.assertNumQueries(1):
+            # every deferred field in one query
+            self.assertEqual(user.email, 'tutor@example.com')
+            self.assertEqual(user.first_name, 'Adjoa')
+
+    def test_deactivation_rejects_the_next_request(self):
+        teacher_client = self.client_for(self.teacher)
+        self.assertEqual(teacher_client.get('/search/', {'q': ''}).status_code, 200)
+        self.assertIn(self.teacher.pk, _status_cache)
+
+        response = self.client_for(self.admin).post(f'/users/{self.teacher.pk}/deactivate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(self.teacher.pk, _status_cache)
+
+        self.assertEqual(teacher_client.get('/search/', {'q': ''}).status_code, 401)
+
+    def test_stale_role_claim_is_rejected(self):
+        client = self.client_for(self.teacher)
+        User.objects.filter(pk=self.teacher.pk).update(role=User.Role.BURSAR)
+        self.assertEqual(client.get('/search/', {'q': ''}).status_code, 401)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Attendance
+from .models import Attendance, StudentAttendanceMonthly
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
@@ -8,3 +8,11 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ('student__user__username', 'class_obj__class_name')
     ordering = ('-attendance_date',)
 
+
+
+@admin.register(StudentAttendanceMonthly)
+class StudentAttendanceMonthlyAdmin(admin.ModelAdmin):
+    list_display = ('student', 'month', 'total_days', 'present_days', 'absent_days', 'late_days', 'excused_days')
+    list_filter = ('month',)
+    search_fields = ('student__admission_number', 'student__last_name')
+    readonly_fields = ('student', 'month', 'total_days', 'present_days', 'absent_days', 'late_days', 'excused_days', 'updated_at')
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.attendance.models import StudentAttendanceMonthly
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly per-student attendance counts from the attendance table'
+
+    def handle(self, *args, **kwargs):
+        months = StudentAttendanceMonthly.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt attendance rollups for {months} month(s)."))
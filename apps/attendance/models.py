@@ -1,4 +1,8 @@
-from django.db import models
+import calendar
+from datetime import timedelta
+from django.db import connection, models, transaction
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from apps.students.models import Student
 from apps.academic.models import Class
 from apps.accounts.models import User
@@ -33,10 +37,185 @@ class Attendance(models.Model):
         unique_together = ['student', 'attendance_date']
         ordering = ['-attendance_date']
         indexes = [
-            models.Index(fields=['attendance_date']),
+            # Keyset pagination walks (attendance_date, id)
+            models.Index(fields=['attendance_date', 'id']),
             models.Index(fields=['class_obj', 'attendance_date']),
             models.Index(fields=['status']),
         ]
     
     def __str__(self):
-        return f"{self.student.full_name} - {self.attendance_date} ({self.get_status_display()})"
\ No newline at end of file
+        return f"{self.student.full_name} - {self.attendance_date} ({self.get_status_display()})"
+
+    @classmethod
+    def status_counts(cls, prefix='', condition=None):
+        """
+        Count(filter=...) expressions for total_days and <status>_days, for use in
+        aggregate() or annotate(). `prefix` is the path to the attendance rows
+        (e.g. 'attendance_records__' from Student) and `condition` narrows them.
+        """
+        condition = condition or Q()
+        counts = {'total_days': Count(f'{prefix}id', filter=condition)}
+        for status in cls.AttendanceStatus.values:
+            counts[f'{status}_days'] = Count(f'{prefix}id', filter=condition & Q(**{f'{prefix}status': status}))
+        return counts
+
+    @classmethod
+    def report_breakdown(cls, counts):
+        """Day counts and attendance percentage from status_counts() results (dict or annotated instance)"""
+        get = counts.get if isinstance(counts, dict) else lambda name: getattr(counts, name)
+        breakdown = {'total_days': get('total_days')}
+        for status in cls.AttendanceStatus.values:
+            breakdown[f'{status}_days'] = get(f'{status}_days')
+
+        total_days = breakdown['total_days']
+        attendance_percentage = (breakdown['present_days'] / total_days * 100) if total_days > 0 else 0
+        breakdown['attendance_percentage'] = round(attendance_percentage, 2)
+        return breakdown
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Attendance.objects.filter(pk=self.pk).values('student_id', 'attendance_date').first()
+
+            super().save(*args, **kwargs)
+
+            if previous and (previous['student_id'], previous['attendance_date']) != (self.student_id, self.attendance_date):
+                StudentAttendanceMonthly.refresh([previous['student_id']], previous['attendance_date'])
+            StudentAttendanceMonthly.refresh([self.student_id], self.attendance_date)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            StudentAttendanceMonthly.refresh([self.student_id], self.attendance_date)
+        return result
+
+
+class StudentAttendanceMonthly(models.Model):
+    """
+    Attendance counts per student per calendar month, so reports over long
+    date ranges read one row per student-month instead of every daily record.
+    Kept current by Attendance.save()/delete() and bulk_mark; rebuild with
+    `rebuild_attendance_rollups`.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField(help_text="First day of the month")
+    total_days = models.PositiveIntegerField(default=0)
+    present_days = models.PositiveIntegerField(default=0)
+    absent_days = models.PositiveIntegerField(default=0)
+    late_days = models.PositiveIntegerField(default=0)
+    excused_days = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'student_attendance_monthly'
+        unique_together = ['student', 'month']
+        ordering = ['-month']
+        indexes = [
+            models.Index(fields=['month']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} - {self.month:%B %Y}: {self.present_days}/{self.total_days}"
+
+    @staticmethod
+    def month_bounds(day):
+        """First and last day of the month containing `day`"""
+        first = day.replace(day=1)
+        return first, first.replace(day=calendar.monthrange(first.year, first.month)[1])
+
+    @classmethod
+    def refresh(cls, student_ids, day):
+        """Recount the month containing `day` for the given students from raw attendance"""
+        student_ids = list(student_ids)
+        if not student_ids:
+            return
+        month, month_end = cls.month_bounds(day)
+
+        counts = {
+            row['student_id']: row
+            for row in Attendance.objects.filter(
+                student_id__in=student_ids,
+                attendance_date__range=[month, month_end]
+            ).order_by().values('student_id').annotate(**Attendance.status_counts())
+        }
+
+        with transaction.atomic():
+            cls.objects.filter(month=month, student_id__in=set(student_ids) - set(counts)).delete()
+            if counts:
+                cls.objects.bulk_create(
+                    [cls(month=month, **row) for row in counts.values()],
+                    update_conflicts=True,
+                    unique_fields=(
+                        ['student', 'month']
+                        if connection.features.supports_update_conflicts_with_target else None
+                    ),
+                    update_fields=[
+                        'total_days', 'present_days', 'absent_days',
+                        'late_days', 'excused_days', 'updated_at'
+                    ]
+                )
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """Recompute every monthly row from the attendance table"""
+        cls.objects.all().delete()
+        months = Attendance.objects.dates('attendance_date', 'month')
+        for month in months:
+            student_ids = Attendance.objects.filter(
+                attendance_date__range=cls.month_bounds(month)
+            ).values_list('student_id', flat=True).distinct()
+            cls.refresh(student_ids, month)
+        return len(months)
+
+    @classmethod
+    def full_months(cls, start_date, end_date):
+        """First and last whole calendar month inside [start_date, end_date], or None"""
+        first_full = start_date if start_date.day == 1 else cls.month_bounds(start_date)[1] + timedelta(days=1)
+        last_full = cls.month_bounds(end_date)[0]
+        if end_date != cls.month_bounds(end_date)[1]:
+            last_full = (last_full - timedelta(days=1)).replace(day=1)
+        if first_full > last_full:
+            return None
+        return first_full, last_full
+
+    @classmethod
+    def count_expressions(cls, start_date, end_date, student_ref='student_id'):
+        """
+        total_days and present_days for [start_date, end_date] as subquery
+        expressions correlated on `student_ref`. Whole months are read from the
+        rollup; only the partial months at either end touch raw attendance.
+        """
+        def total(queryset, expression):
+            return Coalesce(
+                Subquery(
+                    queryset.filter(student_id=OuterRef(student_ref)).order_by().values(
+                        'student_id'
+                    ).annotate(total=expression).values('total')
+                ),
+                Value(0),
+                output_field=IntegerField()
+            )
+
+        present = Q(status=Attendance.AttendanceStatus.PRESENT)
+        full_months = cls.full_months(start_date, end_date)
+        if not full_months:
+            days = Attendance.objects.filter(attendance_date__range=[start_date, end_date])
+            return {
+                'total_days': total(days, Count('id')),
+                'present_days': total(days, Count('id', filter=present)),
+            }
+
+        first_full, last_full = full_months
+        months = cls.objects.filter(month__range=[first_full, last_full])
+        edges = Attendance.objects.filter(
+            Q(attendance_date__gte=start_date, attendance_date__lt=first_full) |
+            Q(attendance_date__gt=cls.month_bounds(last_full)[1], attendance_date__lte=end_date)
+        )
+
+        return {
+            'total_days': total(months, Sum('total_days')) + total(edges, Count('id')),
+            'present_days': total(months, Sum('present_days')) + total(edges, Count('id', filter=present)),
+        }
@@ -39,6 +39,10 @@ class BulkAttendanceSerializer(serializers.Serializer):
                 raise serializers.ValidationError(
                     "Each attendance record must have 'student_id' and 'status'"
                 )
+            try:
+                record['student_id'] = int(record['student_id'])
+            except (TypeError, ValueError):
+                raise serializers.ValidationError("'student_id' must be an integer")
         return value
 
 
@@ -1,3 +1,283 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
 from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Enrollment
+from apps.students.models import Student
+from .models import Attendance, StudentAttendanceMonthly
 
-# Create your tests here.
+
+class AttendanceTestData:
+    """A class of four enrolled students and an administrator to mark them"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='registrar', password='registrar-pass-123', role=User.Role.ADMIN
+        )
+        year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.school_class = Class.objects.create(class_name='Grade 4C', grade_level=4, academic_year=year)
+        cls.students = []
+        for number in range(1, 5):
+            student = Student.objects.create(
+                admission_number=f'ADM{number:04d}',
+                first_name='Kojo',
+                last_name=f'Appiah{number}',
+                date_of_birth=date(2015, 2, 1),
+                gender=Student.Gender.MALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=cls.school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=cls.school_class)
+            cls.students.append(student)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def bulk_mark(self, attendance_date, statuses, **params):
+        """statuses: one status per student, None to leave a student out"""
+        records = [
+            {'student_id': student.pk, 'status': status_value}
+            for student, status_value in zip(self.students, statuses)
+            if status_value is not None
+        ]
+        query = '&'.join(f'{name}={value}' for name, value in params.items())
+        return self.client.post(f'/attendance/bulk_mark/?{query}', {
+            'class_id': self.school_class.pk,
+            'attendance_date': attendance_date,
+            'attendance_records': records,
+        }, format='json')
+
+
+class BulkMarkTest(AttendanceTestData, TestCase):
+    """Roll call is validated with one query and written with one upsert"""
+
+    def test_marks_then_updates_the_same_day(self):
+        day = date(2025, 10, 6)
+        response = self.bulk_mark(day, ['present', 'absent', 'late', None])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['created_count'], response.data['updated_count']), (3, 0))
+        self.assertNotIn('created', response.data)
+
+        response = self.bulk_mark(day, ['present', 'present', None, 'excused'], include_records='true')
+        self.assertEqual((response.data['created_count'], response.data['updated_count']), (1, 2))
+        self.assertEqual(len(response.data['created']), 1)
+        self.assertEqual(len(response.data['updated']), 2)
+
+        statuses = dict(Attendance.objects.filter(attendance_date=day).values_list('student_id', 'status'))
+        self.assertEqual(statuses, {
+            self.students[0].pk: 'present',
+            self.students[1].pk: 'present',
+            self.students[2].pk: 'late',
+            self.students[3].pk: 'excused',
+        })
+        self.assertEqual(set(Attendance.objects.values_list('marked_by', flat=True)), {self.user.pk})
+
+    def test_rejects_unenrolled_students_and_unknown_statuses(self):
+        outsider = Student.objects.create(
+            admission_number='ADM0099',
+            first_name='Abena',
+            last_name='Darko',
+            date_of_birth=date(2015, 2, 1),
+            gender=Student.Gender.FEMALE,
+            admission_date=date(2025, 9, 1)
+        )
+        Enrollment.objects.filter(student=self.students[3]).update(status=Enrollment.EnrollmentStatus.WITHDRAWN)
+
+        response = self.client.post('/attendance/bulk_mark/', {
+            'class_id': self.school_class.pk,
+            'attendance_date': date(2025, 10, 6),
+            'attendance_records': [
+                {'student_id': self.students[0].pk, 'status': 'present'},
+                {'student_id': outsider.pk, 'status': 'present'},
+                {'student_id': self.students[1].pk, 'status': 'asleep'},
+                {'student_id': self.students[3].pk, 'status': 'present'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created_count'], 1)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2, 3])
+        self.assertEqual(list(Attendance.objects.values_list('student_id', flat=True)), [self.students[0].pk])
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        with self.assertNumQueries(9):
+            # enrolled students, already marked, upsert, monthly recount,
+            # monthly upsert, and two savepoint pairs
+            response = self.bulk_mark(date(2025, 10, 6), ['present', 'absent'])
+        self.assertEqual(response.data['created_count'], 2)
+
+        with self.assertNumQueries(9):
+            response = self.bulk_mark(date(2025, 10, 7), ['present', 'absent', 'late', 'present'])
+        self.assertEqual(response.data['created_count'], 4)
+
+
+class StudentAttendanceMonthlyTest(AttendanceTestData, TestCase):
+    """The monthly rollup must always equal the counts over raw attendance"""
+
+    def raw_counts(self):
+        rows = Attendance.objects.annotate(
+            month=TruncMonth('attendance_date')
+        ).order_by().values('student_id', 'month').annotate(**Attendance.status_counts())
+        return {(row.pop('student_id'), row.pop('month')): row for row in rows}
+
+    def rollup_counts(self):
+        rows = StudentAttendanceMonthly.objects.values(
+            'student_id', 'month', 'total_days', 'present_days', 'absent_days', 'late_days', 'excused_days'
+        )
+        return {(row.pop('student_id'), row.pop('month')): row for row in rows}
+
+    def assertRollupMatchesRaw(self):
+        self.assertEqual(self.rollup_counts(), self.raw_counts())
+
+    def test_bulk_mark_refreshes_rollup(self):
+        self.bulk_mark(date(2025, 10, 6), ['present', 'absent', 'late', 'excused'])
+        self.bulk_mark(date(2025, 10, 7), ['present', 'present', None, 'absent'])
+        self.assertRollupMatchesRaw()
+
+        # Re-marking a day replaces its counts instead of adding to them
+        self.bulk_mark(date(2025, 10, 6), ['absent', 'absent', 'absent', 'absent'])
+        self.assertRollupMatchesRaw()
+        self.assertEqual(self.rollup_counts()[(self.students[0].pk, date(2025, 10, 1))]['absent_days'], 1)
+
+    def test_single_marks_refresh_rollup(self):
+        first, second = self.students[:2]
+        record = Attendance.objects.create(
+            student=first, class_obj=self.school_class,
+            attendance_date=date(2025, 10, 31), status=Attendance.AttendanceStatus.PRESENT
+        )
+        Attendance.objects.create(
+            student=second, class_obj=self.school_class,
+            attendance_date=date(2025, 10, 31), status=Attendance.AttendanceStatus.LATE
+        )
+        self.assertRollupMatchesRaw()
+
+        # Moving a record to the next month recounts both months
+        record.attendance_date = date(2025, 11, 3)
+        record.status = Attendance.AttendanceStatus.ABSENT
+        record.save()
+        self.assertRollupMatchesRaw()
+        self.assertNotIn((first.pk, date(2025, 10, 1)), self.rollup_counts())
+
+        record.delete()
+        self.assertRollupMatchesRaw()
+        self.assertEqual(list(self.rollup_counts()), [(second.pk, date(2025, 10, 1))])
+
+    def test_rebuild_command_matches_raw_counts(self):
+        self.bulk_mark(date(2025, 9, 30), ['present', 'absent', 'late', 'excused'])
+        self.bulk_mark(date(2025, 10, 1), ['present', 'present', 'present', 'absent'])
+        StudentAttendanceMonthly.objects.update(total_days=40)
+
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        self.assertRollupMatchesRaw()
+
+    def test_defaulters_over_long_range_match_raw_records(self):
+        # Mid-September to early December: October and November come from the rollup
+        statuses = ['present', 'absent', 'late', 'excused']
+        day = date(2025, 9, 15)
+        while day <= date(2025, 12, 5):
+            self.bulk_mark(day, [statuses[(day.day + offset) % 4] for offset in range(4)])
+            day += timedelta(days=1)
+
+        start_date, end_date = date(2025, 9, 20), date(2025, 12, 2)
+        self.assertIsNotNone(StudentAttendanceMonthly.full_months(start_date, end_date))
+        response = self.client.get('/attendance/defaulters/', {
+            'start_date': start_date, 'end_date': end_date, 'threshold': 100
+        })
+        self.assertEqual(response.status_code, 200)
+
+        in_range = Q(attendance_date__range=[start_date, end_date])
+        expected = {
+            row['student_id']: (row['total_days'], row['present_days'])
+            for row in Attendance.objects.filter(in_range).order_by().values('student_id').annotate(
+                total_days=Count('id'),
+                present_days=Count('id', filter=Q(status=Attendance.AttendanceStatus.PRESENT))
+            )
+        }
+        self.assertEqual(
+            {row['student_id']: (row['total_days'], row['present_days']) for row in response.data['defaulters']},
+            expected
+        )
+
+    def test_defaulters_rejects_bad_parameters(self):
+        for params in [{'threshold': 'most'}, {'class_id': 'A'}]:
+            with self.subTest(**params):
+                response = self.client.get('/attendance/defaulters/', params)
+                self.assertEqual(response.status_code, 400)
+
+
+class AttendanceReportTest(AttendanceTestData, TestCase):
+    """Report endpoints count every status in one pass and reject bad parameters"""
+
+    def setUp(self):
+        super().setUp()
+        self.bulk_mark(date(2025, 10, 6), ['present', 'absent', 'present', 'late'])
+        self.bulk_mark(date(2025, 10, 7), ['present', 'present', 'excused', None])
+        self.bulk_mark(date(2025, 10, 8), ['late', 'absent', None, None])
+        self.october = {'start_date': '2025-10-01', 'end_date': '2025-10-31'}
+
+    def report(self, action, **params):
+        return self.client.get(f'/attendance/{action}/', params)
+
+    def test_student_report(self):
+        with self.assertNumQueries(1):
+            response = self.report('student_report', student_id=self.students[0].pk, **self.october)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_days'], 3)
+        self.assertEqual(response.data['present_days'], 2)
+        self.assertEqual(response.data['late_days'], 1)
+        self.assertEqual(response.data['attendance_percentage'], '66.67')
+        self.assertEqual(response.data['student']['admission_number'], 'ADM0001')
+
+        response = self.report('student_report', student_id=self.students[0].pk,
+                               start_date='2025-10-07', end_date='2025-10-07')
+        self.assertEqual(response.data['total_days'], 1)
+
+    def test_class_summary(self):
+        with self.assertNumQueries(1):
+            response = self.report('class_summary', class_id=self.school_class.pk, **self.october)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_days'], 3)
+        self.assertEqual(response.data['total_records'], 9)
+        self.assertEqual(
+            {item['status']: item['count'] for item in response.data['status_breakdown']},
+            {'present': 4, 'absent': 2, 'late': 2, 'excused': 1}
+        )
+
+    def test_batch_report(self):
+        first, second, third, fourth = self.students
+        with self.assertNumQueries(1):
+            response = self.report('batch_report', class_id=self.school_class.pk, **self.october)
+        self.assertEqual(response.status_code, 200)
+        reports = {report['student_id']: report for report in response.data['reports']}
+        self.assertEqual(len(reports), 4)
+        self.assertEqual(reports[second.pk]['absent_days'], 2)
+        self.assertEqual(reports[third.pk]['excused_days'], 1)
+        self.assertEqual(reports[fourth.pk]['total_days'], 1)
+
+        response = self.report('batch_report', student_ids=f'{first.pk},{third.pk}', **self.october)
+        self.assertEqual([report['student_id'] for report in response.data['reports']], [first.pk, third.pk])
+        self.assertEqual(response.data['reports'][0]['attendance_percentage'], 66.67)
+
+    def test_reports_reject_bad_parameters(self):
+        student_id, class_id = self.students[0].pk, self.school_class.pk
+        bad_requests = [
+            ('student_report', {'student_id': student_id, 'start_date': 'october', 'end_date': '2025-10-31'}),
+            ('student_report', {'student_id': student_id, 'start_date': '2025-02-30', 'end_date': '2025-10-31'}),
+            ('student_report', {'student_id': 'first'}),
+            ('class_summary', {'class_id': class_id, 'start_date': '2025-10-01', 'end_date': '31/10/2025'}),
+            ('class_summary', {'class_id': 'all'}),
+            ('batch_report', {'class_id': class_id, 'start_date': '2025-10-01', 'end_date': 'today'}),
+            ('batch_report', {'student_ids': '1,two'}),
+            ('batch_report', {'class_id': '4C'}),
+            ('batch_report', {}),
+        ]
+        for action, params in bad_requests:
+            with self.subTest(action=action, params=params):
+                self.assertEqual(self.report(action, **params).status_code, 400)
@@ -2,19 +2,41 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
+from django.db import connection, transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+from django.db.models.functions import Cast
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
-from .models import Attendance
+from .models import Attendance, StudentAttendanceMonthly
+from apps.students.models import Student
 from .serializers import AttendanceSerializer, BulkAttendanceSerializer, AttendanceReportSerializer
-from apps.accounts.permissions import CanManageStudents
+from apps.academic.models import Enrollment
+from apps.accounts.permissions import CanManageStudents, ClassScopedMixin
+from config.exports import stream_csv
+from config.pagination import KeysetPagination
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ClassScopedMixin, viewsets.ModelViewSet):
     """ViewSet for Attendance management"""
     
     queryset = Attendance.objects.select_related('student', 'class_obj', 'marked_by').all()
     serializer_class = AttendanceSerializer
     permission_classes = [IsAuthenticated, CanManageStudents]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-attendance_date', '-id')
+
+    EXPORT_COLUMNS = [
+        ('Date', 'attendance_date'),
+        ('Admission Number', 'student__admission_number'),
+        ('First Name', 'student__first_name'),
+        ('Last Name', 'student__last_name'),
+        ('Class', 'class_obj__class_name'),
+        ('Status', 'status'),
+        ('Remarks', 'remarks'),
+        ('Marked By', 'marked_by__username'),
+    ]
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -47,8 +69,30 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @staticmethod
+    def get_report_range(start_date, end_date):
+        """
+        Parse a report's start_date and end_date query parameters, defaulting
+        to the current month when either is missing. A date that does not
+        parse comes back as None.
+        """
+        if not start_date or not end_date:
+            today = datetime.now().date()
+            return today.replace(day=1), today
+        try:
+            return parse_date(start_date), parse_date(end_date)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2025-02-30
+            return None, None
+    
     def perform_create(self, serializer):
+        self.check_class_scope(serializer.validated_data.get('class_obj'))
         serializer.save(marked_by=self.request.user)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered attendance records as CSV"""
+        return stream_csv(self.get_queryset(), self.EXPORT_COLUMNS, f'attendance-{timezone.localdate()}.csv')
     
     @action(detail=False, methods=['post'])
     def bulk_mark(self, request):
@@ -60,38 +104,92 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         class_id = serializer.validated_data['class_id']
         attendance_date = serializer.validated_data['attendance_date']
         attendance_records = serializer.validated_data['attendance_records']
+        self.check_class_scope(class_id)
+        
+        # One query to check every student actually belongs to the class
+        student_ids = {record['student_id'] for record in attendance_records}
+        enrolled = set(
+            Enrollment.objects.filter(
+                class_obj_id=class_id,
+                student_id__in=student_ids,
+                status='active'
+            ).values_list('student_id', flat=True)
+        )
         
-        created_records = []
-        updated_records = []
+        valid_statuses = set(Attendance.AttendanceStatus.values)
+        records = {}
         errors = []
         
-        for record in attendance_records:
+        for index, record in enumerate(attendance_records):
             student_id = record['student_id']
             status_value = record['status']
-            remarks = record.get('remarks', '')
-            
-            # Check if attendance already exists
-            attendance, created = Attendance.objects.update_or_create(
-                student_id=student_id,
-                attendance_date=attendance_date,
-                defaults={
-                    'class_obj_id': class_id,
-                    'status': status_value,
-                    'remarks': remarks,
-                    'marked_by': request.user
-                }
-            )
             
-            if created:
-                created_records.append(attendance)
+            if student_id not in enrolled:
+                errors.append({'row': index, 'student_id': student_id, 'error': "Student is not enrolled in this class"})
+            elif status_value not in valid_statuses:
+                errors.append({'row': index, 'student_id': student_id, 'error': f"Invalid status '{status_value}'"})
             else:
-                updated_records.append(attendance)
-        
-        return Response({
-            'created': AttendanceSerializer(created_records, many=True).data,
-            'updated': AttendanceSerializer(updated_records, many=True).data,
+                # A student listed twice keeps the last mark, as with update_or_create
+                records[student_id] = Attendance(
+                    student_id=student_id,
+                    class_obj_id=class_id,
+                    attendance_date=attendance_date,
+                    status=status_value,
+                    remarks=record.get('remarks', ''),
+                    marked_by=request.user
+                )
+        
+        existing = set(
+            Attendance.objects.filter(
+                attendance_date=attendance_date,
+                student_id__in=records.keys()
+            ).values_list('student_id', flat=True)
+        ) if records else set()
+        
+        if records:
+            with transaction.atomic():
+                Attendance.objects.bulk_create(
+                    records.values(),
+                    batch_size=500,
+                    update_conflicts=True,
+                    # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target
+                    unique_fields=(
+                        ['student', 'attendance_date']
+                        if connection.features.supports_update_conflicts_with_target else None
+                    ),
+                    update_fields=['class_obj', 'status', 'remarks', 'marked_by']
+                )
+                # bulk_create skips Attendance.save(), so refresh the monthly counts here
+                StudentAttendanceMonthly.refresh(records.keys(), attendance_date)
+        
+        response_data = {
+            'class_id': class_id,
+            'attendance_date': attendance_date,
+            'created_count': len(records) - len(existing),
+            'updated_count': len(existing),
             'errors': errors
-        }, status=status.HTTP_201_CREATED)
+        }
+        
+        # Full rows only when asked for; serializing them costs far more than the write
+        if request.query_params.get('include_records', '').lower() in ('1', 'true', 'yes'):
+            saved = Attendance.objects.filter(
+                attendance_date=attendance_date,
+                student_id__in=records.keys()
+            ).select_related(
+                'student__class_obj__academic_year',
+                'student__class_obj__class_teacher',
+                'class_obj__academic_year',
+                'class_obj__class_teacher',
+                'marked_by'
+            )
+            response_data['created'] = AttendanceSerializer(
+                [attendance for attendance in saved if attendance.student_id not in existing], many=True
+            ).data
+            response_data['updated'] = AttendanceSerializer(
+                [attendance for attendance in saved if attendance.student_id in existing], many=True
+            ).data
+        
+        return Response(response_data, status=status.HTTP_201_CREATED)
     
     @action(detail=False, methods=['get'])
     def class_attendance(self, request):
@@ -153,44 +251,35 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        if not student_id:
+        if not student_id or not student_id.isdigit():
             return Response(
-                {'error': 'student_id is required'},
+                {'error': 'student_id is required and must be an integer'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Default to current month if dates not provided
+        start_date, end_date = self.get_report_range(start_date, end_date)
         if not start_date or not end_date:
-            today = datetime.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
+            return Response(
+                {'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get attendance records
-        attendance_records = Attendance.objects.filter(
-            student_id=student_id,
-            attendance_date__range=[start_date, end_date]
+        # Student and every status count in one query
+        student = get_object_or_404(
+            Student.objects.select_related(
+                'class_obj__academic_year', 'class_obj__class_teacher'
+            ).annotate(
+                **Attendance.status_counts(
+                    'attendance_records__',
+                    Q(attendance_records__attendance_date__range=[start_date, end_date])
+                )
+            ),
+            id=student_id
         )
         
-        # Calculate statistics
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(status='present').count()
-        absent_days = attendance_records.filter(status='absent').count()
-        late_days = attendance_records.filter(status='late').count()
-        excused_days = attendance_records.filter(status='excused').count()
-        
-        attendance_percentage = (present_days / total_days * 100) if total_days > 0 else 0
-        
-        from apps.students.models import Student
-        student = Student.objects.get(id=student_id)
-        
         report_data = {
             'student': student,
-            'total_days': total_days,
-            'present_days': present_days,
-            'absent_days': absent_days,
-            'late_days': late_days,
-            'excused_days': excused_days,
-            'attendance_percentage': round(attendance_percentage, 2)
+            **Attendance.report_breakdown(student)
         }
         
         serializer = AttendanceReportSerializer(report_data)
@@ -203,89 +292,169 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        if not class_id:
+        if not class_id or not class_id.isdigit():
             return Response(
-                {'error': 'class_id is required'},
+                {'error': 'class_id is required and must be an integer'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Default to current month if dates not provided
+        start_date, end_date = self.get_report_range(start_date, end_date)
         if not start_date or not end_date:
-            today = datetime.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
+            return Response(
+                {'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get all attendance records for the class in date range
-        attendance_records = Attendance.objects.filter(
+        # Record, day and per-status counts in one aggregate
+        totals = Attendance.objects.filter(
             class_obj_id=class_id,
             attendance_date__range=[start_date, end_date]
+        ).aggregate(
+            unique_dates=Count('attendance_date', distinct=True),
+            **Attendance.status_counts()
         )
         
-        # Calculate statistics
-        total_records = attendance_records.count()
-        status_breakdown = attendance_records.values('status').annotate(count=Count('id'))
-        
-        # Get unique dates
-        unique_dates = attendance_records.values('attendance_date').distinct().count()
+        status_breakdown = [
+            {'status': status_value, 'count': totals[f'{status_value}_days']}
+            for status_value in Attendance.AttendanceStatus.values
+            if totals[f'{status_value}_days']
+        ]
         
         return Response({
             'class_id': class_id,
             'start_date': start_date,
             'end_date': end_date,
-            'total_days': unique_dates,
-            'total_records': total_records,
-            'status_breakdown': list(status_breakdown)
+            'total_days': totals['unique_dates'],
+            'total_records': totals['total_days'],
+            'status_breakdown': status_breakdown
+        })
+    
+    @action(detail=False, methods=['get'])
+    def batch_report(self, request):
+        """Get attendance breakdowns for a list of students or a whole class in one query"""
+        student_ids = request.query_params.get('student_ids')
+        class_id = request.query_params.get('class_id')
+        start_date = request.query_params.get('start_date')
+        end_date = request.query_params.get('end_date')
+        
+        if not student_ids and not class_id:
+            return Response(
+                {'error': 'student_ids or class_id is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        start_date, end_date = self.get_report_range(start_date, end_date)
+        if not start_date or not end_date:
+            return Response(
+                {'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        students = Student.objects.all()
+        if student_ids:
+            try:
+                students = students.filter(id__in=[int(pk) for pk in student_ids.split(',') if pk.strip()])
+            except ValueError:
+                return Response(
+                    {'error': 'student_ids must be a comma-separated list of integers'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        if class_id:
+            if not class_id.isdigit():
+                return Response(
+                    {'error': 'class_id must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            students = students.filter(enrollments__class_obj_id=class_id, enrollments__status='active')
+        
+        students = students.annotate(
+            **Attendance.status_counts(
+                'attendance_records__',
+                Q(attendance_records__attendance_date__range=[start_date, end_date])
+            )
+        ).order_by('last_name', 'first_name')
+        
+        reports = [
+            {
+                'student_id': student.id,
+                'student_name': student.full_name,
+                'admission_number': student.admission_number,
+                **Attendance.report_breakdown(student)
+            }
+            for student in students
+        ]
+        
+        return Response({
+            'start_date': start_date,
+            'end_date': end_date,
+            'total_students': len(reports),
+            'reports': reports
         })
     
     @action(detail=False, methods=['get'])
     def defaulters(self, request):
         """Get list of students with low attendance"""
         class_id = request.query_params.get('class_id')
-        threshold = float(request.query_params.get('threshold', 75))  # Default 75%
+        try:
+            threshold = float(request.query_params.get('threshold', 75))  # Default 75%
+        except ValueError:
+            return Response({'error': 'threshold must be a number'}, status=status.HTTP_400_BAD_REQUEST)
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
         
-        # Default to current month if dates not provided
+        start_date, end_date = self.get_report_range(start_date, end_date)
         if not start_date or not end_date:
-            today = datetime.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
+            return Response(
+                {'error': 'start_date and end_date must be dates (YYYY-MM-DD)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Get all students
-        from apps.academic.models import Enrollment
-        query = Enrollment.objects.filter(status='active').select_related('student')
+        query = Enrollment.objects.filter(status='active')
         
         if class_id:
+            if not class_id.isdigit():
+                return Response(
+                    {'error': 'class_id must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
             query = query.filter(class_obj_id=class_id)
         
-        defaulters = []
+        if StudentAttendanceMonthly.full_months(start_date, end_date):
+            # Long ranges: whole months come from the monthly rollup
+            query = query.annotate(
+                **StudentAttendanceMonthly.count_expressions(start_date, end_date)
+            )
+        else:
+            # One grouped conditional aggregation over the raw records
+            in_range = Q(student__attendance_records__attendance_date__range=[start_date, end_date])
+            query = query.annotate(
+                total_days=Count('student__attendance_records', filter=in_range),
+                present_days=Count(
+                    'student__attendance_records',
+                    filter=in_range & Q(student__attendance_records__status=Attendance.AttendanceStatus.PRESENT)
+                )
+            )
         
-        for enrollment in query:
-            student = enrollment.student
-            
-            # Get attendance records
-            attendance_records = Attendance.objects.filter(
-                student=student,
-                attendance_date__range=[start_date, end_date]
+        # Threshold is applied in the database (HAVING for the grouped query)
+        query = query.filter(total_days__gt=0).annotate(
+            attendance_percentage=ExpressionWrapper(
+                Cast('present_days', FloatField()) * 100 / F('total_days'),
+                output_field=FloatField()
             )
-            
-            total_days = attendance_records.count()
-            if total_days == 0:
-                continue
-            
-            present_days = attendance_records.filter(status='present').count()
-            attendance_percentage = (present_days / total_days * 100)
-            
-            if attendance_percentage < threshold:
-                defaulters.append({
-                    'student_id': student.id,
-                    'student_name': student.full_name,
-                    'admission_number': student.admission_number,
-                    'class': enrollment.class_obj.class_name,
-                    'total_days': total_days,
-                    'present_days': present_days,
-                    'attendance_percentage': round(attendance_percentage, 2)
-                })
+        ).filter(attendance_percentage__lt=threshold)
+        
+        defaulters = [
+            {
+                'student_id': enrollment.student_id,
+                'student_name': enrollment.student.full_name,
+                'admission_number': enrollment.student.admission_number,
+                'class': enrollment.class_obj.class_name,
+                'total_days': enrollment.total_days,
+                'present_days': enrollment.present_days,
+                'attendance_percentage': round(enrollment.attendance_percentage, 2)
+            }
+            for enrollment in query.select_related('student', 'class_obj')
+        ]
         
         return Response({
             'threshold': threshold,
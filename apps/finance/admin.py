@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import FeeStructure, Invoice, InvoiceItem, Payment, Expenditure
+from .models import DocumentSequence, FeeStructure, FinanceMonthlyRollup, Invoice, InvoiceItem, Payment, Expenditure
 
 
 @admin.register(FeeStructure)
@@ -41,4 +41,17 @@ class ExpenditureAdmin(admin.ModelAdmin):
     list_filter = ('category', 'transaction_date')
     search_fields = ('expenditure_number', 'item_name', 'vendor_name')
     ordering = ('-transaction_date',)
-    readonly_fields = ('expenditure_number',)
\ No newline at end of file
+    readonly_fields = ('expenditure_number',)
+
+
+@admin.register(DocumentSequence)
+class DocumentSequenceAdmin(admin.ModelAdmin):
+    list_display = ('prefix', 'last_value', 'updated_at')
+    search_fields = ('prefix',)
+    readonly_fields = ('prefix', 'last_value', 'updated_at')
+
+@admin.register(FinanceMonthlyRollup)
+class FinanceMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ('month', 'revenue', 'expenditure', 'invoice_count', 'outstanding_balance', 'updated_at')
+    date_hierarchy = 'month'
+    readonly_fields = ('month', 'revenue', 'expenditure', 'invoice_count', 'outstanding_balance', 'updated_at')
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+SUMMARY_VERSION_KEY = 'finance:summary:version'
+
+
+def get_summary_version():
+    """Current version of the cached financial summaries"""
+    version = cache.get(SUMMARY_VERSION_KEY)
+    if version is None:
+        # A fresh timestamp cannot collide with entries written under an evicted version
+        cache.add(SUMMARY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SUMMARY_VERSION_KEY)
+    return version
+
+
+def summary_cache_key(start_date, end_date):
+    return f'finance:summary:v{get_summary_version()}:{start_date}:{end_date}'
+
+
+def summary_cache_timeout():
+    return getattr(settings, 'FINANCE_SUMMARY_CACHE_TIMEOUT', 900)
+
+
+def invalidate_financial_summary():
+    """
+    Retire every cached financial summary once the current transaction commits.
+    Bumping on commit keeps a concurrent request from caching pre-commit totals
+    under the new version.
+    """
+    transaction.on_commit(lambda: cache.set(SUMMARY_VERSION_KEY, time.time_ns(), None))
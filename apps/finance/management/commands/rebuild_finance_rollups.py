@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.finance.models import FinanceMonthlyRollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the monthly finance rollups from payments, invoices and expenditures'
+
+    def handle(self, *args, **kwargs):
+        months = FinanceMonthlyRollup.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt finance rollups for {months} month(s)."))
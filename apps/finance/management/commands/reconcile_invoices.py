@@ -0,0 +1,66 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from apps.finance.cache import invalidate_financial_summary
+from apps.finance.models import FinanceMonthlyRollup, Invoice, Payment
+
+
+class Command(BaseCommand):
+    help = 'Recomputes invoice amount_paid, balance and status from payments and reports any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Write the recomputed values back to the invoices')
+        parser.add_argument('--limit', type=int, default=20, help='Number of drifted invoices to list')
+
+    def handle(self, *args, **options):
+        paid_total = Payment.objects.filter(
+            invoice=OuterRef('pk')
+        ).values('invoice').annotate(total=Sum('amount_paid')).values('total')
+
+        actual_paid = Coalesce(
+            Subquery(paid_total),
+            Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+
+        drifted = Invoice.objects.annotate(actual_paid=actual_paid).filter(
+            ~Q(amount_paid=F('actual_paid')) |
+            ~Q(balance=F('total_amount') - F('actual_paid')) |
+            ~Q(status=Invoice.status_expression(F('actual_paid')))
+        )
+
+        rows = list(drifted.values('id', 'invoice_number', 'amount_paid', 'balance', 'status', 'actual_paid'))
+
+        if not rows:
+            self.stdout.write(self.style.SUCCESS("All invoice balances match their payments."))
+            return
+
+        total_drift = sum(row['actual_paid'] - row['amount_paid'] for row in rows)
+        self.stdout.write(self.style.WARNING(
+            f"{len(rows)} invoice(s) drifted from their payments (net amount_paid drift: {total_drift})"
+        ))
+
+        for row in rows[:options['limit']]:
+            self.stdout.write(
+                f"  {row['invoice_number']}: recorded paid={row['amount_paid']} "
+                f"balance={row['balance']} status={row['status']}, actual paid={row['actual_paid']}"
+            )
+
+        if not options['fix']:
+            self.stdout.write("Run with --fix to correct them.")
+            return
+
+        with transaction.atomic():
+            # amount_paid goes last: MySQL evaluates SET assignments left to right
+            fixed = Invoice.objects.filter(pk__in=[row['id'] for row in rows]).update(
+                status=Invoice.status_expression(actual_paid),
+                balance=F('total_amount') - actual_paid,
+                amount_paid=actual_paid,
+            )
+            # Outstanding balances in the monthly rollups derive from invoice balances
+            FinanceMonthlyRollup.rebuild()
+            invalidate_financial_summary()
+
+        self.stdout.write(self.style.SUCCESS(f"Corrected {fixed} invoice(s) and rebuilt monthly rollups."))
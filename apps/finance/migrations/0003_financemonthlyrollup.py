@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_documentsequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinanceMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month', unique=True)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('expenditure', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('outstanding_balance', models.DecimalField(decimal_places=2, default=0, help_text='Balance still owed on invoices issued this month', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'finance_monthly_rollups',
+                'ordering': ['month'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0003_financemonthlyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='expenditure',
+            name='expenditure_transac_a2575f_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='payment',
+            name='payments_payment_aebcb7_idx',
+        ),
+        migrations.AddIndex(
+            model_name='expenditure',
+            index=models.Index(fields=['transaction_date', 'id'], name='expenditure_transac_e4f0c6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['payment_date', 'id'], name='payments_payment_97aa56_idx'),
+        ),
+    ]
@@ -1,8 +1,29 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Case, When, Value, Sum, Count
+from django.db.models.functions import TruncMonth
+from django.db.models.lookups import GreaterThan, LessThanOrEqual
+from django.utils import timezone
+from datetime import datetime
 from decimal import Decimal
 from apps.students.models import Student
 from apps.academic.models import AcademicYear, Class
 from apps.accounts.models import User
+from .cache import invalidate_financial_summary
+
+
+class DocumentSequence(models.Model):
+    """Counter row per document number prefix (e.g. PAY-20250114, INV-2025-1)"""
+    
+    prefix = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'document_sequences'
+        ordering = ['prefix']
+    
+    def __str__(self):
+        return f"{self.prefix} ({self.last_value})"
 
 
 class FeeStructure(models.Model):
@@ -106,7 +127,66 @@ class Invoice(models.Model):
         elif self.amount_paid > 0:
             self.status = self.InvoiceStatus.PARTIAL
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            adding = self._state.adding
+            previous_balance = None
+            if not adding:
+                previous_balance = Invoice.objects.filter(pk=self.pk).values_list('balance', flat=True).first()
+
+            super().save(*args, **kwargs)
+
+            FinanceMonthlyRollup.apply(
+                self.created_at,
+                invoice_count=1 if adding else 0,
+                outstanding_balance=Decimal(self.balance) - (previous_balance or Decimal('0.00'))
+            )
+            invalidate_financial_summary()
+
+    @classmethod
+    def status_expression(cls, amount_paid):
+        """SQL equivalent of the status rules in save() for a new amount_paid expression"""
+        return Case(
+            When(LessThanOrEqual(F('total_amount'), amount_paid), then=Value(cls.InvoiceStatus.PAID)),
+            When(GreaterThan(amount_paid, 0), then=Value(cls.InvoiceStatus.PARTIAL)),
+            When(
+                status__in=[cls.InvoiceStatus.PAID, cls.InvoiceStatus.PARTIAL],
+                then=Value(cls.InvoiceStatus.UNPAID)
+            ),
+            default=F('status'),
+        )
+
+    @classmethod
+    def apply_payment_deltas(cls, deltas):
+        """
+        Adjust amount_paid, balance and status by per-invoice payment deltas.
+
+        Args:
+            deltas: dict of {invoice_id: Decimal amount}, negative to reverse a payment
+
+        All invoices are updated in one statement; the UPDATE holds the row
+        locks, so concurrent payments on the same invoice cannot lose updates.
+        """
+        deltas = {invoice_id: amount for invoice_id, amount in deltas.items() if amount}
+        if not deltas:
+            return 0
+
+        amount_field = models.DecimalField(max_digits=10, decimal_places=2)
+        if len(deltas) == 1:
+            delta = Value(next(iter(deltas.values())), output_field=amount_field)
+        else:
+            delta = Case(
+                *[When(pk=invoice_id, then=Value(amount)) for invoice_id, amount in deltas.items()],
+                output_field=amount_field
+            )
+        new_amount_paid = F('amount_paid') + delta
+
+        # amount_paid goes last: MySQL evaluates SET assignments left to right
+        return cls.objects.filter(pk__in=deltas.keys()).update(
+            status=cls.status_expression(new_amount_paid),
+            balance=F('total_amount') - new_amount_paid,
+            updated_at=timezone.now(),
+            amount_paid=new_amount_paid,
+        )
 
 class InvoiceItem(models.Model):
     """Line items in an invoice"""
@@ -163,20 +243,27 @@ class Payment(models.Model):
         indexes = [
             models.Index(fields=['payment_number']),
             models.Index(fields=['invoice']),
-            models.Index(fields=['payment_date']),
+            # Keyset pagination walks (payment_date, id)
+            models.Index(fields=['payment_date', 'id']),
         ]
 
     def __str__(self):
         return f"Payment {self.payment_number} - {self.amount_paid}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            # Apply the change in amount to the invoice instead of re-summing its payments
+            deltas = {}
+            if not self._state.adding:
+                previous = Payment.objects.filter(pk=self.pk).values('invoice_id', 'amount_paid').first()
+                if previous:
+                    deltas[previous['invoice_id']] = -previous['amount_paid']
+            deltas[self.invoice_id] = deltas.get(self.invoice_id, Decimal('0.00')) + Decimal(self.amount_paid)
 
-        # Update invoice amount_paid
-        self.invoice.amount_paid = self.invoice.payments.aggregate(
-            total=models.Sum('amount_paid')
-        )['total'] or Decimal('0.00')
-        self.invoice.save()
+            super().save(*args, **kwargs)
+            Invoice.apply_payment_deltas(deltas)
+            FinanceMonthlyRollup.apply_payment_deltas(self.payment_date, deltas)
+            invalidate_financial_summary()
 
 
 class Expenditure(models.Model):
@@ -225,8 +312,140 @@ class Expenditure(models.Model):
         indexes = [
             models.Index(fields=['expenditure_number']),
             models.Index(fields=['category']),
-            models.Index(fields=['transaction_date']),
+            # Keyset pagination walks (transaction_date, id)
+            models.Index(fields=['transaction_date', 'id']),
         ]
     
     def __str__(self):
-        return f"{self.expenditure_number} - {self.item_name} ({self.amount})"
\ No newline at end of file
+        return f"{self.expenditure_number} - {self.item_name} ({self.amount})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Expenditure.objects.filter(pk=self.pk).values('transaction_date', 'amount').first()
+
+            super().save(*args, **kwargs)
+
+            if previous:
+                FinanceMonthlyRollup.apply(previous['transaction_date'], expenditure=-previous['amount'])
+            FinanceMonthlyRollup.apply(self.transaction_date, expenditure=Decimal(self.amount))
+            invalidate_financial_summary()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            FinanceMonthlyRollup.apply(self.transaction_date, expenditure=-Decimal(self.amount))
+            invalidate_financial_summary()
+        return result
+
+
+class FinanceMonthlyRollup(models.Model):
+    """
+    Monthly finance totals, kept current as payments, invoices and
+    expenditures are written so trend reports read one row per month.
+    """
+
+    month = models.DateField(unique=True, help_text="First day of the month")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    expenditure = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    invoice_count = models.IntegerField(default=0)
+    outstanding_balance = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+        help_text="Balance still owed on invoices issued this month"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'finance_monthly_rollups'
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.month:%B %Y} - revenue {self.revenue}, expenditure {self.expenditure}"
+
+    @staticmethod
+    def month_start(value):
+        """First day of the month containing a date or datetime"""
+        if isinstance(value, datetime):
+            value = timezone.localdate(value) if timezone.is_aware(value) else value.date()
+        return value.replace(day=1)
+
+    @classmethod
+    def apply(cls, day, **deltas):
+        """Add deltas (e.g. revenue=Decimal('50.00')) to the row for the month containing `day`"""
+        deltas = {field: value for field, value in deltas.items() if value}
+        if day is None or not deltas:
+            return
+
+        month = cls.month_start(day)
+        rows = cls.objects.filter(month=month)
+        changes = {field: F(field) + value for field, value in deltas.items()}
+
+        if rows.update(updated_at=timezone.now(), **changes):
+            return
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(month=month, **deltas)
+        except IntegrityError:
+            # Another writer created the month first
+            rows.update(updated_at=timezone.now(), **changes)
+
+    @classmethod
+    def apply_payment_deltas(cls, payment_date, deltas):
+        """
+        Record payment deltas ({invoice_id: amount}) taken on payment_date:
+        revenue for the payment month, outstanding balance for each invoice's issue month.
+        """
+        deltas = {invoice_id: amount for invoice_id, amount in deltas.items() if amount}
+        if not deltas:
+            return
+
+        cls.apply(payment_date, revenue=sum(deltas.values()))
+
+        outstanding = {}
+        for invoice_id, created_at in Invoice.objects.filter(pk__in=deltas.keys()).values_list('id', 'created_at'):
+            month = cls.month_start(created_at)
+            outstanding[month] = outstanding.get(month, Decimal('0.00')) - deltas[invoice_id]
+
+        for month, amount in outstanding.items():
+            cls.apply(month, outstanding_balance=amount)
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """Recompute every month from payments, invoices and expenditures"""
+        months = {}
+
+        def row(month):
+            month = cls.month_start(month)
+            return months.setdefault(month, cls(month=month))
+
+        revenue = Payment.objects.annotate(
+            month=TruncMonth('payment_date')
+        ).values('month').annotate(total=Sum('amount_paid')).order_by()
+        for item in revenue:
+            row(item['month']).revenue = item['total']
+
+        expenditure = Expenditure.objects.filter(
+            transaction_date__isnull=False
+        ).annotate(
+            month=TruncMonth('transaction_date')
+        ).values('month').annotate(total=Sum('amount')).order_by()
+        for item in expenditure:
+            row(item['month']).expenditure = item['total']
+
+        invoices = Invoice.objects.annotate(
+            month=TruncMonth('created_at')
+        ).values('month').annotate(count=Count('id'), outstanding=Sum('balance')).order_by()
+        for item in invoices:
+            rollup = row(item['month'])
+            rollup.invoice_count = item['count']
+            rollup.outstanding_balance = item['outstanding']
+
+        cls.objects.all().delete()
+        cls.objects.bulk_create(months.values())
+
+        return len(months)
\ No newline at end of file
@@ -97,6 +97,12 @@ class PaymentCreateSerializer(serializers.Serializer):
     remarks = serializers.CharField(required=False, allow_blank=True)
 
 
+class BulkPaymentSerializer(serializers.Serializer):
+    """Serializer for recording a batch of payments (e.g. an imported bank statement)"""
+    
+    payments = PaymentCreateSerializer(many=True, allow_empty=False)
+
+
 class ExpenditureSerializer(serializers.ModelSerializer):
     """Serializer for Expenditure model"""
     
@@ -121,7 +127,11 @@ class FinancialSummarySerializer(serializers.Serializer):
     
     total_revenue = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
     total_expenditure = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
+    net_income = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
     outstanding_fees = serializers.DecimalField(max_digits=15, decimal_places=2, read_only=True)
     paid_invoices = serializers.IntegerField(read_only=True)
     unpaid_invoices = serializers.IntegerField(read_only=True)
-    partial_invoices = serializers.IntegerField(read_only=True)
\ No newline at end of file
+    partial_invoices = serializers.IntegerField(read_only=True)
+    cached = serializers.BooleanField(read_only=True)
+    generated_at = serializers.DateTimeField(read_only=True)
+    cache_age_seconds = serializers.IntegerField(read_only=True)
@@ -1,12 +1,80 @@
-from django.db import transaction
+from django.db import transaction, connection, IntegrityError
+from django.db.models import Q, F, Exists, OuterRef, Sum, Count
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from decimal import Decimal
-from .models import Invoice, InvoiceItem, Payment, FeeStructure
+from .models import (
+    DocumentSequence, Invoice, InvoiceItem, Payment, FeeStructure, Expenditure, FinanceMonthlyRollup
+)
 from apps.students.models import Student
-from apps.academic.models import AcademicYear, Class
+from apps.academic.models import AcademicYear, Class, Enrollment
+from .cache import invalidate_financial_summary, summary_cache_key, summary_cache_timeout
+from apps.search.models import SearchEntry
+from apps.search.services import SearchService
 from datetime import datetime, timedelta
 
 
+class SequenceService:
+    """Allocates document numbers from one counter row per prefix"""
+    
+    @staticmethod
+    def reserve(prefix, count=1, model=None, field=None):
+        """
+        Atomically reserve a block of consecutive numbers for a prefix.
+        
+        The counter row is bumped with a single UPDATE, which holds the row
+        lock until the surrounding transaction ends, so concurrent callers
+        never receive the same number.
+        
+        Args:
+            prefix: Counter key, e.g. 'PAY-20250114' or 'INV-2025-1'
+            count: How many numbers to reserve
+            model: Document model used to seed a new counter (optional)
+            field: Number field on that model, e.g. 'payment_number'
+        
+        Returns:
+            range of reserved numbers
+        """
+        if count < 1:
+            raise ValidationError("count must be at least 1")
+        
+        with transaction.atomic():
+            counter = DocumentSequence.objects.filter(prefix=prefix)
+            
+            if not counter.update(last_value=F('last_value') + count):
+                # First use of this prefix: continue after any numbers already issued
+                seed = SequenceService._last_issued_number(prefix, model, field)
+                try:
+                    with transaction.atomic():
+                        DocumentSequence.objects.create(prefix=prefix, last_value=seed + count)
+                except IntegrityError:
+                    # Another caller created the counter first
+                    counter.update(last_value=F('last_value') + count)
+            
+            last_value = counter.values_list('last_value', flat=True).get()
+        
+        return range(last_value - count + 1, last_value + 1)
+    
+    @staticmethod
+    def next_number(prefix, width, model=None, field=None):
+        """Allocate a single formatted number, e.g. PAY-20250114-0007"""
+        number = SequenceService.reserve(prefix, 1, model, field)[0]
+        return f"{prefix}-{number:0{width}d}"
+    
+    @staticmethod
+    def _last_issued_number(prefix, model, field):
+        """Highest number already issued under a prefix, 0 if none"""
+        if model is None:
+            return 0
+        
+        last_number = model.objects.filter(
+            **{f"{field}__startswith": f"{prefix}-"}
+        ).order_by(f"-{field}").values_list(field, flat=True).first()
+        
+        return int(last_number.split('-')[-1]) if last_number else 0
+
+
 class InvoiceService:
     """Service layer for Invoice operations"""
     
@@ -55,9 +123,9 @@ class InvoiceService:
             academic_year=academic_year,
             is_mandatory=True
         ).filter(
-            models.Q(class_obj=enrollment.class_obj) | models.Q(class_obj__isnull=True)
+            Q(class_obj=enrollment.class_obj) | Q(class_obj__isnull=True)
         ).filter(
-            models.Q(term=term) | models.Q(term='all')
+            Q(term=term) | Q(term='all')
         )
         
         if not fee_structures.exists():
@@ -96,50 +164,174 @@ class InvoiceService:
     
     def _generate_invoice_number(self, academic_year, term):
         """Generate unique invoice number"""
+        return self._reserve_invoice_numbers(academic_year, term, 1)[0]
+    
+    def _reserve_invoice_numbers(self, academic_year, term, count):
+        """Reserve a contiguous block of invoice numbers for a period"""
         year_code = academic_year.year_name.replace('/', '')[:4]
         term_code = term.upper()
+        prefix = f"INV-{year_code}-{term_code}"
         
-        # Get last invoice number for this period
-        last_invoice = Invoice.objects.filter(
-            invoice_number__startswith=f"INV-{year_code}-{term_code}"
-        ).order_by('-invoice_number').first()
-        
-        if last_invoice:
-            last_number = int(last_invoice.invoice_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        numbers = SequenceService.reserve(prefix, count, Invoice, 'invoice_number')
         
-        return f"INV-{year_code}-{term_code}-{new_number:05d}"
+        return [f"{prefix}-{number:05d}" for number in numbers]
     
     @transaction.atomic
-    def generate_bulk_invoices(self, class_id, academic_year_id, term, generated_by):
+    def generate_bulk_invoices(self, class_id, academic_year_id, term, generated_by, due_days=30):
         """Generate invoices for all students in a class"""
         try:
             class_obj = Class.objects.get(id=class_id)
         except Class.DoesNotExist:
             raise ValidationError("Class not found")
         
-        # Get all active enrollments in this class
-        enrollments = class_obj.enrollments.filter(status='active').select_related('student')
+        try:
+            academic_year = AcademicYear.objects.get(id=academic_year_id)
+        except AcademicYear.DoesNotExist:
+            raise ValidationError("Academic year not found")
         
-        invoices = []
+        return self._generate_invoices_for_classes(
+            [class_obj.id], academic_year, term, generated_by, due_days
+        )
+    
+    @transaction.atomic
+    def generate_term_invoices(self, academic_year_id, term, generated_by, due_days=30):
+        """Generate invoices for every class in an academic year and term"""
+        try:
+            academic_year = AcademicYear.objects.get(id=academic_year_id)
+        except AcademicYear.DoesNotExist:
+            raise ValidationError("Academic year not found")
+        
+        class_ids = list(
+            Class.objects.filter(academic_year=academic_year).values_list('id', flat=True)
+        )
+        
+        return self._generate_invoices_for_classes(
+            class_ids, academic_year, term, generated_by, due_days
+        )
+    
+    def _generate_invoices_for_classes(self, class_ids, academic_year, term, generated_by, due_days):
+        """
+        Set-based invoice generation for the active enrollments of the given classes.
+        
+        Fee structures are resolved once per class, students who already hold an
+        invoice for the period are found with a single anti-join, invoice numbers
+        are reserved as one block, and invoices and items are written with bulk_create.
+        
+        Returns:
+            dict with created invoices and per-student errors
+        """
+        # Applicable fee structures for every class, in one query
+        fee_structures = FeeStructure.objects.filter(
+            academic_year=academic_year,
+            is_mandatory=True
+        ).filter(
+            Q(class_obj_id__in=class_ids) | Q(class_obj__isnull=True)
+        ).filter(
+            Q(term=term) | Q(term='all')
+        )
+        
+        shared_fees = []
+        class_fees = {class_id: [] for class_id in class_ids}
+        for fee in fee_structures:
+            if fee.class_obj_id is None:
+                shared_fees.append(fee)
+            else:
+                class_fees[fee.class_obj_id].append(fee)
+        
+        # Active enrollments flagged with whether an invoice already exists
+        enrollments = Enrollment.objects.filter(
+            class_obj_id__in=class_ids,
+            status=Enrollment.EnrollmentStatus.ACTIVE
+        ).annotate(
+            has_invoice=Exists(
+                Invoice.objects.filter(
+                    student_id=OuterRef('student_id'),
+                    academic_year=academic_year,
+                    term=term
+                )
+            )
+        ).select_related('student').order_by('class_obj_id', 'roll_number', 'id')
+        
+        pending = []
         errors = []
+        seen_students = set()
         
         for enrollment in enrollments:
-            try:
-                invoice = self.generate_invoice_for_student(
-                    enrollment.student.id,
-                    academic_year_id,
-                    term,
-                    generated_by
-                )
-                invoices.append(invoice)
-            except ValidationError as e:
+            student = enrollment.student
+            if student.id in seen_students:
+                continue
+            seen_students.add(student.id)
+            
+            if enrollment.has_invoice:
                 errors.append({
-                    'student': enrollment.student.full_name,
-                    'error': str(e)
+                    'student': student.full_name,
+                    'error': "Invoice already exists for this student and term"
                 })
+                continue
+            
+            fees = shared_fees + class_fees[enrollment.class_obj_id]
+            if not fees:
+                errors.append({
+                    'student': student.full_name,
+                    'error': "No fee structures found for this student"
+                })
+                continue
+            
+            pending.append((student, fees))
+        
+        if not pending:
+            return {'invoices': [], 'errors': errors}
+        
+        invoice_numbers = self._reserve_invoice_numbers(academic_year, term, len(pending))
+        due_date = datetime.now().date() + timedelta(days=int(due_days))
+        
+        invoices = []
+        for invoice_number, (student, fees) in zip(invoice_numbers, pending):
+            total_amount = sum(fee.amount for fee in fees)
+            invoices.append(Invoice(
+                invoice_number=invoice_number,
+                student=student,
+                academic_year=academic_year,
+                term=term,
+                total_amount=total_amount,
+                amount_paid=Decimal('0.00'),
+                balance=total_amount,
+                due_date=due_date,
+                status=Invoice.InvoiceStatus.UNPAID,
+                generated_by=generated_by
+            ))
+        
+        Invoice.objects.bulk_create(invoices, batch_size=500)
+        
+        # Backends without RETURNING (MySQL) leave the primary keys unset
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids_by_number = dict(
+                Invoice.objects.filter(
+                    invoice_number__in=invoice_numbers
+                ).values_list('invoice_number', 'id')
+            )
+            for invoice in invoices:
+                invoice.id = ids_by_number[invoice.invoice_number]
+        
+        items = [
+            InvoiceItem(
+                invoice=invoice,
+                fee_structure=fee,
+                description=fee.category_name,
+                amount=fee.amount
+            )
+            for invoice, (student, fees) in zip(invoices, pending)
+            for fee in fees
+        ]
+        InvoiceItem.objects.bulk_create(items, batch_size=1000)
+        SearchService.index(SearchEntry.EntityType.INVOICE, invoices)
+        
+        FinanceMonthlyRollup.apply(
+            invoices[0].created_at,
+            invoice_count=len(invoices),
+            outstanding_balance=sum(invoice.balance for invoice in invoices)
+        )
+        invalidate_financial_summary()
         
         return {
             'invoices': invoices,
@@ -166,7 +358,8 @@ class PaymentService:
             Payment object
         """
         try:
-            invoice = Invoice.objects.get(id=invoice_id)
+            # Lock the invoice so concurrent payments validate against the current balance
+            invoice = Invoice.objects.select_for_update().get(id=invoice_id)
         except Invoice.DoesNotExist:
             raise ValidationError("Invoice not found")
         
@@ -194,23 +387,97 @@ class PaymentService:
         
         return payment
     
-    def _generate_payment_number(self):
-        """Generate unique payment number"""
-        today = datetime.now()
-        date_code = today.strftime('%Y%m%d')
+    @transaction.atomic
+    def record_bulk_payments(self, payments_data, received_by=None):
+        """
+        Record a batch of payments, e.g. an imported bank statement.
+        
+        Args:
+            payments_data: list of dicts with invoice_id, amount_paid, payment_method,
+                and optional transaction_reference and remarks
+            received_by: User who received the payments
+        
+        Returns:
+            dict with created payments and per-row errors
+        """
+        invoice_ids = {row['invoice_id'] for row in payments_data}
+        invoices = Invoice.objects.select_for_update().in_bulk(invoice_ids)
+        
+        remaining = {invoice_id: invoice.balance for invoice_id, invoice in invoices.items()}
+        accepted = []
+        errors = []
+        
+        for index, row in enumerate(payments_data):
+            invoice_id = row['invoice_id']
+            amount_paid = Decimal(row['amount_paid'])
+            
+            if invoice_id not in invoices:
+                errors.append({'row': index, 'invoice_id': invoice_id, 'error': "Invoice not found"})
+            elif amount_paid <= 0:
+                errors.append({'row': index, 'invoice_id': invoice_id, 'error': "Payment amount must be greater than zero"})
+            elif amount_paid > remaining[invoice_id]:
+                errors.append({
+                    'row': index,
+                    'invoice_id': invoice_id,
+                    'error': f"Payment amount ({amount_paid}) exceeds balance ({remaining[invoice_id]})"
+                })
+            else:
+                remaining[invoice_id] -= amount_paid
+                accepted.append((row, amount_paid))
+        
+        if not accepted:
+            return {'payments': [], 'errors': errors}
+        
+        payment_numbers = self._reserve_payment_numbers(len(accepted))
+        payments = [
+            Payment(
+                payment_number=payment_number,
+                invoice_id=row['invoice_id'],
+                amount_paid=amount_paid,
+                payment_method=row['payment_method'],
+                transaction_reference=row.get('transaction_reference', ''),
+                remarks=row.get('remarks', ''),
+                received_by=received_by
+            )
+            for payment_number, (row, amount_paid) in zip(payment_numbers, accepted)
+        ]
         
-        # Get last payment number for today
-        last_payment = Payment.objects.filter(
-            payment_number__startswith=f"PAY-{date_code}"
-        ).order_by('-payment_number').first()
+        # bulk_create skips Payment.save(), so invoices are settled in one grouped UPDATE
+        Payment.objects.bulk_create(payments, batch_size=500)
         
-        if last_payment:
-            last_number = int(last_payment.payment_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
+        # Backends without RETURNING (MySQL) leave the primary keys unset
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids_by_number = dict(
+                Payment.objects.filter(
+                    payment_number__in=payment_numbers
+                ).values_list('payment_number', 'id')
+            )
+            for payment in payments:
+                payment.id = ids_by_number[payment.payment_number]
+        SearchService.index(SearchEntry.EntityType.PAYMENT, payments)
+        
+        deltas = {}
+        for payment in payments:
+            deltas[payment.invoice_id] = deltas.get(payment.invoice_id, Decimal('0.00')) + payment.amount_paid
+        Invoice.apply_payment_deltas(deltas)
+        FinanceMonthlyRollup.apply_payment_deltas(payments[0].payment_date, deltas)
+        invalidate_financial_summary()
         
-        return f"PAY-{date_code}-{new_number:04d}"
+        return {
+            'payments': payments,
+            'errors': errors
+        }
+    
+    def _generate_payment_number(self):
+        """Generate unique payment number"""
+        return self._reserve_payment_numbers(1)[0]
+    
+    def _reserve_payment_numbers(self, count):
+        """Reserve a block of payment numbers for today"""
+        prefix = f"PAY-{datetime.now().strftime('%Y%m%d')}"
+        numbers = SequenceService.reserve(prefix, count, Payment, 'payment_number')
+        
+        return [f"{prefix}-{number:04d}" for number in numbers]
     
     @staticmethod
     def get_payment_history(invoice_id):
@@ -222,4 +489,72 @@ class PaymentService:
         """Get all payments for a student across all invoices"""
         return Payment.objects.filter(
             invoice__student_id=student_id
-        ).select_related('invoice').order_by('-payment_date')
\ No newline at end of file
+        ).select_related('invoice').order_by('-payment_date')
+
+
+class ExpenditureService:
+    """Service layer for Expenditure operations"""
+    
+    @staticmethod
+    def generate_expenditure_number():
+        """Generate unique expenditure number"""
+        date_code = datetime.now().strftime('%Y%m%d')
+        return SequenceService.next_number(f"EXP-{date_code}", 4, Expenditure, 'expenditure_number')
+
+
+class FinancialSummaryService:
+    """Service layer for the financial dashboard summary"""
+    
+    @staticmethod
+    def get_summary(start_date, end_date):
+        """
+        Get the financial summary for a date range, served from cache when possible.
+        Returns the summary together with whether it was a cache hit and its age.
+        """
+        key = summary_cache_key(start_date, end_date)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached['summary'], {
+                'cached': True,
+                'generated_at': cached['generated_at'],
+                'cache_age_seconds': int((timezone.now() - cached['generated_at']).total_seconds())
+            }
+        
+        generated_at = timezone.now()
+        summary = FinancialSummaryService.calculate_summary(start_date, end_date)
+        cache.set(key, {'summary': summary, 'generated_at': generated_at}, summary_cache_timeout())
+        
+        return summary, {
+            'cached': False,
+            'generated_at': generated_at,
+            'cache_age_seconds': 0
+        }
+    
+    @staticmethod
+    def calculate_summary(start_date, end_date):
+        """Calculate the financial summary for a date range"""
+        total_revenue = Payment.objects.filter(
+            payment_date__date__range=[start_date, end_date]
+        ).aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00')
+        
+        total_expenditure = Expenditure.objects.filter(
+            transaction_date__range=[start_date, end_date]
+        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        
+        # Outstanding fees and invoice statistics in a single pass
+        invoice_stats = Invoice.objects.aggregate(
+            outstanding_fees=Sum('balance', filter=Q(status__in=['unpaid', 'partial'])),
+            paid_invoices=Count('id', filter=Q(status='paid')),
+            unpaid_invoices=Count('id', filter=Q(status='unpaid')),
+            partial_invoices=Count('id', filter=Q(status='partial')),
+        )
+        
+        return {
+            'total_revenue': total_revenue,
+            'total_expenditure': total_expenditure,
+            'net_income': total_revenue - total_expenditure,
+            'outstanding_fees': invoice_stats['outstanding_fees'] or Decimal('0.00'),
+            'paid_invoices': invoice_stats['paid_invoices'],
+            'unpaid_invoices': invoice_stats['unpaid_invoices'],
+            'partial_invoices': invoice_stats['partial_invoices'],
+        }
\ No newline at end of file
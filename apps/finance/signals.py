@@ -0,0 +1,33 @@
+from decimal import Decimal
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .cache import invalidate_financial_summary
+from .models import FinanceMonthlyRollup, Invoice, Payment
+
+
+@receiver(post_delete, sender=Payment)
+def reverse_deleted_payment(sender, instance, **kwargs):
+    """
+    Take a deleted payment off its invoice and the monthly rollups. Being a
+    signal, this also covers queryset deletes and payments cascaded from an
+    invoice or a student, which never call Payment.delete().
+    """
+    deltas = {instance.invoice_id: -Decimal(instance.amount_paid)}
+    Invoice.apply_payment_deltas(deltas)
+    FinanceMonthlyRollup.apply_payment_deltas(instance.payment_date, deltas)
+    invalidate_financial_summary()
+
+
+@receiver(post_delete, sender=Invoice)
+def remove_deleted_invoice(sender, instance, **kwargs):
+    """
+    Take a deleted invoice out of its month's rollup. Its payments are
+    deleted before it and hand what they paid back to the outstanding
+    balance, so the whole total_amount comes off here.
+    """
+    FinanceMonthlyRollup.apply(
+        instance.created_at,
+        invoice_count=-1,
+        outstanding_balance=-Decimal(instance.total_amount)
+    )
+    invalidate_financial_summary()
@@ -1,3 +1,682 @@
-from django.test import TestCase
+import csv
+import threading
+from io import StringIO
+from datetime import date
+from unittest import mock
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Sum
+from django.http import StreamingHttpResponse
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import urlencode
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Enrollment
+from apps.students.models import Student
+from config.exports import iterate_values
+from apps.search.models import SearchEntry
+from .models import DocumentSequence, Expenditure, FeeStructure, FinanceMonthlyRollup, Invoice, Payment
+from .services import InvoiceService, SequenceService
 
-# Create your tests here.
+
+class SequenceServiceTest(TestCase):
+    """Tests for the document number allocator"""
+    
+    def test_reserve_returns_consecutive_numbers(self):
+        self.assertEqual(list(SequenceService.reserve('INV-2025-1')), [1])
+        self.assertEqual(list(SequenceService.reserve('INV-2025-1', 3)), [2, 3, 4])
+        self.assertEqual(list(SequenceService.reserve('INV-2025-2')), [1])
+        self.assertEqual(DocumentSequence.objects.get(prefix='INV-2025-1').last_value, 4)
+    
+    def test_next_number_formats_with_prefix(self):
+        self.assertEqual(SequenceService.next_number('PAY-20250114', 4), 'PAY-20250114-0001')
+        self.assertEqual(SequenceService.next_number('PAY-20250114', 4), 'PAY-20250114-0002')
+    
+    def test_new_counter_continues_after_existing_documents(self):
+        Expenditure.objects.create(
+            expenditure_number='EXP-20250114-0041',
+            item_name='Chalk',
+            category=Expenditure.Category.SUPPLIES,
+            amount=10
+        )
+        number = SequenceService.next_number('EXP-20250114', 4, Expenditure, 'expenditure_number')
+        self.assertEqual(number, 'EXP-20250114-0042')
+    
+    def test_losing_the_race_to_create_a_counter_retries_the_update(self):
+        # Another caller creates the counter (reserving 1..5) between our UPDATE and our INSERT
+        def racing_seed(prefix, model, field):
+            DocumentSequence.objects.create(prefix=prefix, last_value=5)
+            return 0
+        
+        with mock.patch.object(SequenceService, '_last_issued_number', side_effect=racing_seed) as seed:
+            numbers = SequenceService.reserve('PAY-RACE', 2)
+        
+        seed.assert_called_once_with('PAY-RACE', None, None)
+        self.assertEqual(list(numbers), [6, 7])
+        self.assertEqual(DocumentSequence.objects.get(prefix='PAY-RACE').last_value, 7)
+        # The failed INSERT only rolled back its savepoint
+        self.assertEqual(list(SequenceService.reserve('PAY-RACE')), [8])
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class SequenceConcurrencyTest(TransactionTestCase):
+    """Stress test: concurrent callers must never receive the same number"""
+    
+    THREADS = 8
+    ITERATIONS = 25
+    
+    def test_concurrent_reservations_are_unique_and_gapless(self):
+        results = []
+        failures = []
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.THREADS)
+        
+        def worker(index):
+            try:
+                barrier.wait()
+                for i in range(self.ITERATIONS):
+                    # Mix single numbers with small batch reservations
+                    count = 3 if (index + i) % 5 == 0 else 1
+                    numbers = list(SequenceService.reserve('PAY-STRESS', count))
+                    with lock:
+                        results.extend(numbers)
+            except Exception as e:
+                with lock:
+                    failures.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(failures, [])
+        self.assertEqual(len(results), len(set(results)))
+        self.assertEqual(sorted(results), list(range(1, len(results) + 1)))
+        self.assertEqual(DocumentSequence.objects.get(prefix='PAY-STRESS').last_value, len(results))
+
+
+class FinanceTestData:
+    """Accountant, student and invoice fixtures shared by the finance tests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='bursar', password='bursar-pass-123', role=User.Role.ADMIN
+        )
+        cls.year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        school_class = Class.objects.create(class_name='Grade 5A', grade_level=5, academic_year=cls.year)
+        cls.student = Student.objects.create(
+            admission_number='ADM0001',
+            first_name='Ama',
+            last_name='Mensah',
+            date_of_birth=date(2014, 3, 1),
+            gender=Student.Gender.FEMALE,
+            admission_date=date(2025, 9, 1),
+            class_obj=school_class
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_invoice(self, total_amount='300.00'):
+        number = Invoice.objects.count() + 1
+        return Invoice.objects.create(
+            invoice_number=f'INV-TEST-{number:04d}',
+            student=self.student,
+            academic_year=self.year,
+            term=Invoice.Term.TERM_1,
+            total_amount=Decimal(total_amount),
+            due_date=date(2025, 10, 1),
+            generated_by=self.user
+        )
+
+    def make_payment(self, invoice, amount_paid):
+        number = Payment.objects.count() + 1
+        return Payment.objects.create(
+            payment_number=f'PAY-TEST-{number:04d}',
+            invoice=invoice,
+            amount_paid=Decimal(amount_paid),
+            payment_method=Payment.PaymentMethod.CASH,
+            received_by=self.user
+        )
+
+
+class InvoiceGenerationTest(FinanceTestData, TestCase):
+    """Set-based invoice generation for a class or a whole term"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = InvoiceService()
+        self.class_a = Class.objects.create(class_name='Grade 4A', grade_level=4, academic_year=self.year)
+        self.class_b = Class.objects.create(class_name='Grade 4B', grade_level=4, academic_year=self.year)
+        FeeStructure.objects.create(
+            academic_year=self.year, category_name='Tuition', amount=Decimal('200.00'), term=FeeStructure.Term.ALL
+        )
+        FeeStructure.objects.create(
+            academic_year=self.year, class_obj=self.class_a, category_name='Lab Fee',
+            amount=Decimal('50.00'), term=FeeStructure.Term.TERM_1
+        )
+        # Other terms and optional fees are not invoiced
+        FeeStructure.objects.create(
+            academic_year=self.year, category_name='Excursion', amount=Decimal('80.00'),
+            term=FeeStructure.Term.TERM_2
+        )
+        FeeStructure.objects.create(
+            academic_year=self.year, category_name='Swimming', amount=Decimal('40.00'), is_mandatory=False
+        )
+
+    def add_students(self, school_class, count, status=Enrollment.EnrollmentStatus.ACTIVE):
+        students = []
+        for _ in range(count):
+            number = Student.objects.count() + 1
+            student = Student.objects.create(
+                admission_number=f'GEN{number:04d}',
+                first_name='Kofi',
+                last_name=f'Asare{number}',
+                date_of_birth=date(2015, 2, 1),
+                gender=Student.Gender.MALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=school_class, status=status, roll_number=number)
+            students.append(student)
+        return students
+
+    def generate(self, school_class):
+        return self.service.generate_bulk_invoices(school_class.pk, self.year.pk, '1', self.user)
+
+    def test_query_count_does_not_grow_with_class_size(self):
+        # The first run creates the invoice counter and this month's rollup row
+        warm_up = Class.objects.create(class_name='Grade 4C', grade_level=4, academic_year=self.year)
+        self.add_students(warm_up, 1)
+        self.generate(warm_up)
+
+        self.add_students(self.class_a, 2)
+        self.add_students(self.class_b, 6)
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(len(self.generate(self.class_a)['invoices']), 2)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(len(self.generate(self.class_b)['invoices']), 6)
+
+        self.assertEqual(len(small), len(large))
+
+    def test_students_already_invoiced_are_reported(self):
+        first, second = self.add_students(self.class_a, 2)
+        self.add_students(self.class_a, 1, status=Enrollment.EnrollmentStatus.WITHDRAWN)
+        self.service.generate_invoice_for_student(first.pk, self.year.pk, '1', self.user)
+
+        result = self.generate(self.class_a)
+
+        self.assertEqual([invoice.student_id for invoice in result['invoices']], [second.pk])
+        self.assertEqual(result['errors'], [
+            {'student': first.full_name, 'error': 'Invoice already exists for this student and term'}
+        ])
+        self.assertEqual(len(self.generate(self.class_a)['errors']), 2)
+        self.assertEqual(Invoice.objects.filter(student__in=[first, second]).count(), 2)
+
+    def test_invoice_numbers_are_reserved_as_a_block(self):
+        # A counter created after numbers were issued by hand continues after them
+        Invoice.objects.create(
+            invoice_number='INV-2025-1-00007', student=self.student, academic_year=self.year,
+            term=Invoice.Term.TERM_1, total_amount=Decimal('10.00'), due_date=date(2025, 10, 1)
+        )
+        self.add_students(self.class_a, 3)
+
+        result = self.generate(self.class_a)
+
+        self.assertEqual(
+            [invoice.invoice_number for invoice in result['invoices']],
+            ['INV-2025-1-00008', 'INV-2025-1-00009', 'INV-2025-1-00010']
+        )
+        self.assertEqual(DocumentSequence.objects.get(prefix='INV-2025-1').last_value, 10)
+        late, = self.add_students(self.class_b, 1)
+        invoice = self.service.generate_invoice_for_student(late.pk, self.year.pk, '1', self.user)
+        self.assertEqual(invoice.invoice_number, 'INV-2025-1-00011')
+
+    def test_items_search_entries_and_rollup_are_written(self):
+        self.add_students(self.class_a, 2)
+        self.add_students(self.class_b, 1)
+        month = timezone.localdate().replace(day=1)
+
+        result = self.service.generate_term_invoices(self.year.pk, '1', self.user)
+
+        invoices = {invoice.student.class_obj_id: invoice for invoice in result['invoices']}
+        self.assertEqual(len(result['invoices']), 3)
+        for invoice in result['invoices']:
+            items = sorted(invoice.items.values_list('description', 'amount'))
+            expected = [('Lab Fee', Decimal('50.00')), ('Tuition', Decimal('200.00'))]
+            if invoice.student.class_obj_id == self.class_b.pk:
+                expected = [('Tuition', Decimal('200.00'))]
+            self.assertEqual(items, expected)
+            total = sum(amount for _, amount in items)
+            invoice.refresh_from_db()
+            self.assertEqual((invoice.total_amount, invoice.balance), (total, total))
+        self.assertEqual(invoices[self.class_b.pk].status, Invoice.InvoiceStatus.UNPAID)
+
+        indexed = SearchEntry.objects.filter(entity_type=SearchEntry.EntityType.INVOICE)
+        self.assertEqual(
+            set(indexed.values_list('object_id', flat=True)), {invoice.pk for invoice in result['invoices']}
+        )
+        rollup = FinanceMonthlyRollup.objects.get(month=month)
+        self.assertEqual((rollup.invoice_count, rollup.outstanding_balance), (3, Decimal('700.00')))
+
+    def test_generate_term_endpoint(self):
+        self.add_students(self.class_a, 2)
+        self.add_students(self.class_b, 2)
+
+        response = self.client.post(
+            '/invoices/generate_term/', {'academic_year_id': self.year.pk, 'term': '1'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['success'], response.data['errors']), (4, 0))
+        self.assertEqual(response.data['total_amount'], Decimal('900.00'))
+        self.assertEqual(len(set(response.data['invoice_numbers'])), 4)
+
+        response = self.client.post('/invoices/generate_term/', {'term': '1'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class InvoiceBalanceTest(FinanceTestData, TestCase):
+    """Payments adjust their invoice by the change in amount instead of re-summing"""
+
+    def assertInvoice(self, invoice, amount_paid, balance, status):
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.amount_paid, Decimal(amount_paid))
+        self.assertEqual(invoice.balance, Decimal(balance))
+        self.assertEqual(invoice.status, status)
+
+    def test_create_edit_and_delete_payment(self):
+        invoice = self.make_invoice()
+        first = self.make_payment(invoice, '100.00')
+        self.assertInvoice(invoice, '100.00', '200.00', Invoice.InvoiceStatus.PARTIAL)
+
+        second = self.make_payment(invoice, '50.00')
+        self.assertInvoice(invoice, '150.00', '150.00', Invoice.InvoiceStatus.PARTIAL)
+
+        first.amount_paid = Decimal('250.00')
+        first.save()
+        self.assertInvoice(invoice, '300.00', '0.00', Invoice.InvoiceStatus.PAID)
+
+        second.delete()
+        self.assertInvoice(invoice, '250.00', '50.00', Invoice.InvoiceStatus.PARTIAL)
+
+        first.delete()
+        self.assertInvoice(invoice, '0.00', '300.00', Invoice.InvoiceStatus.UNPAID)
+
+    def test_moving_payment_to_another_invoice(self):
+        source, target = self.make_invoice(), self.make_invoice('100.00')
+        payment = self.make_payment(source, '100.00')
+
+        payment.invoice = target
+        payment.save()
+        self.assertInvoice(source, '0.00', '300.00', Invoice.InvoiceStatus.UNPAID)
+        self.assertInvoice(target, '100.00', '0.00', Invoice.InvoiceStatus.PAID)
+
+    def bulk_record(self, rows):
+        return self.client.post('/payments/bulk_record/', {'payments': rows}, format='json')
+
+    def test_bulk_record_settles_invoices(self):
+        first, second = self.make_invoice(), self.make_invoice('100.00')
+        response = self.bulk_record([
+            {'invoice_id': first.pk, 'amount_paid': '120.00', 'payment_method': 'cash'},
+            {'invoice_id': first.pk, 'amount_paid': '80.00', 'payment_method': 'card'},
+            {'invoice_id': second.pk, 'amount_paid': '100.00', 'payment_method': 'cash'},
+            # Exceeds what is left on the second invoice after the row above
+            {'invoice_id': second.pk, 'amount_paid': '1.00', 'payment_method': 'cash'},
+            {'invoice_id': 999999, 'amount_paid': '10.00', 'payment_method': 'cash'},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['success'], 3)
+        self.assertEqual([error['row'] for error in response.data['error_details']], [3, 4])
+        self.assertEqual(response.data['total_amount'], Decimal('300.00'))
+
+        self.assertInvoice(first, '200.00', '100.00', Invoice.InvoiceStatus.PARTIAL)
+        self.assertInvoice(second, '100.00', '0.00', Invoice.InvoiceStatus.PAID)
+        self.assertEqual(Payment.objects.count(), 3)
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        underpaid = self.make_invoice()
+        self.make_payment(underpaid, '100.00')
+        settled = self.make_invoice()
+        self.make_payment(settled, '300.00')
+        untouched = self.make_invoice()
+        # Writes that bypassed Payment.save()
+        Invoice.objects.filter(pk=underpaid.pk).update(amount_paid=Decimal('0.00'), balance=Decimal('300.00'))
+        Invoice.objects.filter(pk=settled.pk).update(status=Invoice.InvoiceStatus.UNPAID)
+
+        out = StringIO()
+        call_command('reconcile_invoices', stdout=out)
+
+        report = out.getvalue()
+        self.assertIn('2 invoice(s) drifted from their payments (net amount_paid drift: 100.00)', report)
+        self.assertIn(f'{underpaid.invoice_number}: recorded paid=0.00 balance=300.00', report)
+        self.assertIn(f'{settled.invoice_number}: recorded paid=300.00 balance=0.00 status=unpaid', report)
+        self.assertNotIn(untouched.invoice_number, report)
+        self.assertIn('Run with --fix', report)
+        self.assertInvoice(underpaid, '0.00', '300.00', Invoice.InvoiceStatus.PARTIAL)
+
+        out = StringIO()
+        call_command('reconcile_invoices', '--fix', stdout=out)
+
+        self.assertIn('Corrected 2 invoice(s)', out.getvalue())
+        self.assertInvoice(underpaid, '100.00', '200.00', Invoice.InvoiceStatus.PARTIAL)
+        self.assertInvoice(settled, '300.00', '0.00', Invoice.InvoiceStatus.PAID)
+        self.assertInvoice(untouched, '0.00', '300.00', Invoice.InvoiceStatus.UNPAID)
+        self.assertEqual(
+            FinanceMonthlyRollup.objects.aggregate(total=Sum('outstanding_balance'))['total'], Decimal('500.00')
+        )
+
+        out = StringIO()
+        call_command('reconcile_invoices', stdout=out)
+        self.assertIn('All invoice balances match their payments.', out.getvalue())
+
+    def test_bulk_record_query_count_does_not_grow_with_rows(self):
+        def record(invoices):
+            rows = [
+                {'invoice_id': invoice.pk, 'amount_paid': '10.00', 'payment_method': 'cash'}
+                for invoice in invoices
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.bulk_record(rows)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.data['success'], len(rows))
+            return len(queries)
+
+        invoices = [self.make_invoice() for _ in range(7)]
+        # The first batch of the day also creates the sequence and rollup rows
+        record(invoices[:1])
+        self.assertEqual(record(invoices[1:3]), record(invoices[3:]))
+
+
+class FinanceMonthlyRollupTest(FinanceTestData, TestCase):
+    """The monthly rollup must always equal the aggregates over the raw rows"""
+
+    def raw_totals(self):
+        invoices = Invoice.objects.aggregate(count=Count('id'), outstanding=Sum('balance'))
+        return {
+            'revenue': Payment.objects.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00'),
+            'expenditure': Expenditure.objects.aggregate(total=Sum('amount'))['total'] or Decimal('0.00'),
+            'invoice_count': invoices['count'],
+            'outstanding_balance': invoices['outstanding'] or Decimal('0.00'),
+        }
+
+    def rollup_totals(self):
+        # Every fixture falls in the current month
+        self.assertLessEqual(FinanceMonthlyRollup.objects.count(), 1)
+        rollup = FinanceMonthlyRollup.objects.first() or FinanceMonthlyRollup()
+        return {
+            'revenue': rollup.revenue,
+            'expenditure': rollup.expenditure,
+            'invoice_count': rollup.invoice_count,
+            'outstanding_balance': rollup.outstanding_balance,
+        }
+
+    def assertRollupMatchesRaw(self):
+        self.assertEqual(self.rollup_totals(), self.raw_totals())
+
+    def test_rollup_follows_payment_changes(self):
+        invoice = self.make_invoice()
+        self.assertRollupMatchesRaw()
+
+        payment = self.make_payment(invoice, '120.00')
+        self.assertRollupMatchesRaw()
+
+        payment.amount_paid = Decimal('75.50')
+        payment.save()
+        self.assertRollupMatchesRaw()
+
+        self.make_payment(self.make_invoice('90.00'), '90.00')
+        payment.delete()
+        self.assertRollupMatchesRaw()
+        self.assertEqual(self.rollup_totals()['revenue'], Decimal('90.00'))
+
+        expenditure = Expenditure.objects.create(
+            expenditure_number='EXP-TEST-0001',
+            item_name='Chalk',
+            category=Expenditure.Category.SUPPLIES,
+            amount=Decimal('40.00'),
+            transaction_date=date.today()
+        )
+        self.assertRollupMatchesRaw()
+        expenditure.delete()
+        self.assertRollupMatchesRaw()
+
+    def test_rollup_follows_invoice_deletes_with_payments(self):
+        kept = self.make_invoice()
+        self.make_payment(kept, '50.00')
+        invoice = self.make_invoice()
+        self.make_payment(invoice, '100.00')
+        self.make_payment(invoice, '20.00')
+
+        response = self.client.delete(f'/invoices/{invoice.pk}/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertRollupMatchesRaw()
+        self.assertEqual(self.rollup_totals()['revenue'], Decimal('50.00'))
+
+        # Queryset deletes and cascades from the student skip Model.delete()
+        Payment.objects.filter(invoice=kept).delete()
+        self.assertRollupMatchesRaw()
+        self.make_payment(kept, '30.00')
+        self.make_payment(self.make_invoice('90.00'), '90.00')
+        self.student.delete()
+        self.assertRollupMatchesRaw()
+        self.assertEqual(self.rollup_totals(), {
+            'revenue': Decimal('0.00'), 'expenditure': Decimal('0.00'),
+            'invoice_count': 0, 'outstanding_balance': Decimal('0.00'),
+        })
+
+    def test_rebuild_command_matches_raw_aggregates(self):
+        invoice = self.make_invoice()
+        self.make_payment(invoice, '100.00')
+        self.make_payment(invoice, '25.00')
+        FinanceMonthlyRollup.objects.update(revenue=Decimal('1.00'), invoice_count=7)
+
+        call_command('rebuild_finance_rollups', stdout=StringIO())
+        self.assertRollupMatchesRaw()
+
+    def trends(self, **params):
+        return self.client.get('/financial-dashboard/multi_year_trends/', params)
+
+    def test_multi_year_trends_reads_rollups(self):
+        self.make_payment(self.make_invoice(), '100.00')
+        year = date.today().year
+
+        with self.assertNumQueries(1):
+            response = self.trends(start_year=year - 1, end_year=year)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['year'] for item in response.data['years']], [year - 1, year])
+        month = response.data['years'][1]['monthly_data'][date.today().month - 1]
+        self.assertEqual(month['revenue'], 100.0)
+        self.assertEqual(month['outstanding_balance'], 200.0)
+
+    def test_multi_year_trends_limits_the_range(self):
+        response = self.trends(start_year=1990, end_year=2025)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['start_year'], 2016)
+        self.assertEqual(len(response.data['years']), 10)
+
+        for params in ({'end_year': 'soon'}, {'start_year': '2020.5'}, {'start_year': 2026, 'end_year': 2025}):
+            with self.subTest(params=params):
+                self.assertEqual(self.trends(**params).status_code, 400)
+
+    def test_monthly_trends_validates_the_year(self):
+        self.make_payment(self.make_invoice(), '60.00')
+        today = date.today()
+
+        response = self.client.get('/financial-dashboard/monthly_trends/', {'year': today.year})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['monthly_data'][today.month - 1]['revenue'], 60.0)
+
+        for year in ('0', '10000', '-1', 'next'):
+            with self.subTest(year=year):
+                response = self.client.get('/financial-dashboard/monthly_trends/', {'year': year})
+                self.assertEqual(response.status_code, 400)
+
+
+class FinancialSummaryCacheTest(FinanceTestData, TestCase):
+    """The dashboard summary is cached until a finance write retires it"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def summary(self):
+        today = date.today()
+        response = self.client.get('/financial-dashboard/summary/', {
+            'start_date': today.replace(day=1), 'end_date': today
+        })
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_summary_is_served_from_cache(self):
+        self.make_payment(self.make_invoice(), '100.00')
+
+        with self.assertNumQueries(3):
+            # revenue, expenditure, invoice statistics
+            data = self.summary()
+        self.assertFalse(data['cached'])
+        self.assertEqual(Decimal(data['total_revenue']), Decimal('100.00'))
+        self.assertEqual(Decimal(data['outstanding_fees']), Decimal('200.00'))
+        self.assertEqual(data['partial_invoices'], 1)
+
+        with self.assertNumQueries(0):
+            data = self.summary()
+        self.assertTrue(data['cached'])
+
+    def test_payment_invalidates_cached_summary_on_commit(self):
+        invoice = self.make_invoice()
+        self.summary()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_payment(invoice, '300.00')
+
+        data = self.summary()
+        self.assertFalse(data['cached'])
+        self.assertEqual(Decimal(data['total_revenue']), Decimal('300.00'))
+        self.assertEqual(data['paid_invoices'], 1)
+        self.assertEqual(data['partial_invoices'], 0)
+
+    def test_summary_is_kept_until_the_write_commits(self):
+        invoice = self.make_invoice()
+        self.summary()
+
+        with self.captureOnCommitCallbacks(execute=False):
+            self.make_payment(invoice, '50.00')
+            self.assertTrue(self.summary()['cached'])
+
+
+class KeysetPaginationTest(FinanceTestData, TestCase):
+    """Cursor pages seek past the last row seen instead of using OFFSET"""
+
+    def setUp(self):
+        super().setUp()
+        # Ties on the date and missing dates, which sort last
+        days = [date(2025, 10, 3), date(2025, 10, 1), None, date(2025, 10, 3),
+                date(2025, 9, 30), None, date(2025, 10, 2)]
+        for number, day in enumerate(days, start=1):
+            Expenditure.objects.create(
+                expenditure_number=f'EXP-TEST-{number:04d}',
+                item_name='Chalk',
+                category=Expenditure.Category.SUPPLIES,
+                amount=Decimal('10.00'),
+                transaction_date=day
+            )
+        ids = dict(Expenditure.objects.values_list('expenditure_number', 'id'))
+        # Newest date first, ties broken by the newer id
+        self.expected = [ids[f'EXP-TEST-{number:04d}'] for number in (4, 1, 7, 2, 5, 6, 3)]
+
+    def page(self, url):
+        with self.assertNumQueries(1):
+            # one seek query; no COUNT(*) unless asked for
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_walks_every_row_once_in_both_directions(self):
+        data = self.page('/expenditures/?' + urlencode({'cursor': '', 'page_size': 3}))
+        self.assertIsNone(data['previous'])
+        self.assertNotIn('count', data)
+
+        pages = [data]
+        while data['next']:
+            data = self.page(data['next'])
+            pages.append(data)
+        walked = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(walked, self.expected)
+        self.assertEqual([len(page['results']) for page in pages], [3, 3, 1])
+
+        data = self.page(pages[-1]['previous'])
+        self.assertEqual(data['results'], pages[1]['results'])
+        data = self.page(data['previous'])
+        self.assertEqual(data['results'], pages[0]['results'])
+        self.assertIsNone(data['previous'])
+
+    def test_counts_only_on_request(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/expenditures/', {'cursor': '', 'page_size': 3, 'count': 'exact'})
+        self.assertEqual((response.data['count'], response.data['count_is_exact']), (7, True))
+
+    def test_page_numbers_still_work_without_cursor(self):
+        response = self.client.get('/expenditures/', {'page_size': 3, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+        self.assertEqual(len(response.data['results']), 3)
+
+    def test_rejects_tampered_cursor(self):
+        self.assertEqual(self.client.get('/expenditures/', {'cursor': 'not-a-cursor'}).status_code, 404)
+
+
+class StreamingExportTest(FinanceTestData, TestCase):
+    """Exports stream CSV in bounded keyset chunks instead of loading every row"""
+
+    def read_csv(self, response):
+        self.assertIsInstance(response, StreamingHttpResponse)
+        content = b''.join(response.streaming_content).decode()
+        return list(csv.reader(StringIO(content)))
+
+    def test_payment_export(self):
+        invoice = self.make_invoice()
+        payment = self.make_payment(invoice, '120.00')
+        payment.transaction_reference = '=HYPERLINK("http://example.com")'
+        payment.save()
+        self.make_payment(invoice, '30.00')
+
+        response = self.client.get('/payments/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="payments-', response['Content-Disposition'])
+
+        rows = self.read_csv(response)
+        self.assertEqual(rows[0][:3], ['Payment Number', 'Payment Date', 'Invoice Number'])
+        self.assertEqual([row[0] for row in rows[1:]], ['PAY-TEST-0001', 'PAY-TEST-0002'])
+        self.assertEqual(rows[1][3:7], ['ADM0001', 'Ama', 'Mensah', '120.00'])
+        # Cells that a spreadsheet would evaluate are quoted
+        self.assertEqual(rows[1][8], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[2][9], 'bursar')
+
+    def test_invoice_export_honours_filters(self):
+        self.make_invoice()
+        paid = self.make_invoice('50.00')
+        self.make_payment(paid, '50.00')
+
+        rows = self.read_csv(self.client.get('/invoices/export/', {'status': 'paid'}))
+        self.assertEqual([row[0] for row in rows[1:]], [paid.invoice_number])
+
+    def test_rows_are_read_in_bounded_chunks(self):
+        invoices = [self.make_invoice() for _ in range(5)]
+        with self.assertNumQueries(3):
+            # chunks of 2, 2 and 1 rows
+            rows = list(iterate_values(Invoice.objects.all(), ['invoice_number'], chunk_size=2))
+        self.assertEqual(rows, [(invoice.invoice_number,) for invoice in invoices])
@@ -4,16 +4,22 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.filters import SearchFilter
 from django.db.models import Sum, Q, Count
+from django.db.models.functions import TruncMonth
 from decimal import Decimal
-from datetime import datetime, timedelta
-from .models import FeeStructure, Invoice, InvoiceItem, Payment, Expenditure
+from datetime import date, datetime
+import calendar
+from .models import FeeStructure, Invoice, InvoiceItem, Payment, Expenditure, FinanceMonthlyRollup
 from .serializers import (
     FeeStructureSerializer, InvoiceSerializer, InvoiceItemSerializer,
-    PaymentSerializer, PaymentCreateSerializer, ExpenditureSerializer,
-    FinancialSummarySerializer
+    PaymentSerializer, PaymentCreateSerializer, BulkPaymentSerializer,
+    ExpenditureSerializer, FinancialSummarySerializer
 )
-from .services import InvoiceService, PaymentService
+from .services import InvoiceService, PaymentService, ExpenditureService, FinancialSummaryService
 from apps.accounts.permissions import CanManageFinance
+from apps.search.models import SearchEntry
+from apps.search.services import SearchService
+from config.exports import stream_csv
+from config.pagination import KeysetPagination
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
 
@@ -56,6 +62,21 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     queryset = Invoice.objects.select_related('student', 'academic_year', 'generated_by').prefetch_related('items').all()
     serializer_class = InvoiceSerializer
     permission_classes = [IsAuthenticated, CanManageFinance]
+
+    EXPORT_COLUMNS = [
+        ('Invoice Number', 'invoice_number'),
+        ('Admission Number', 'student__admission_number'),
+        ('First Name', 'student__first_name'),
+        ('Last Name', 'student__last_name'),
+        ('Academic Year', 'academic_year__year_name'),
+        ('Term', 'term'),
+        ('Total Amount', 'total_amount'),
+        ('Amount Paid', 'amount_paid'),
+        ('Balance', 'balance'),
+        ('Status', 'status'),
+        ('Due Date', 'due_date'),
+        ('Created At', 'created_at'),
+    ]
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -88,8 +109,21 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                 status__in=['unpaid', 'partial']
             )
         
+        # Search by invoice number or student name / admission number
+        search = self.request.query_params.get('search', None)
+        if search:
+            queryset = queryset.filter(
+                Q(pk__in=SearchService.matching_ids(SearchEntry.EntityType.INVOICE, search)) |
+                Q(student__in=SearchService.matching_ids(SearchEntry.EntityType.STUDENT, search))
+            )
+        
         return queryset
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered invoices as CSV"""
+        return stream_csv(self.get_queryset(), self.EXPORT_COLUMNS, f'invoices-{date.today()}.csv')
+    
     @action(detail=False, methods=['post'])
     def generate(self, request):
         """Generate invoice for a student"""
@@ -138,13 +172,51 @@ class InvoiceViewSet(viewsets.ModelViewSet):
                 class_id=class_id,
                 academic_year_id=academic_year_id,
                 term=term,
-                generated_by=request.user
+                generated_by=request.user,
+                due_days=request.data.get('due_days', 30)
+            )
+            
+            invoices = Invoice.objects.filter(
+                id__in=[invoice.id for invoice in result['invoices']]
+            ).select_related(
+                'student__class_obj', 'academic_year', 'generated_by'
+            ).prefetch_related('items')
+            
+            return Response({
+                'success': len(result['invoices']),
+                'errors': len(result['errors']),
+                'invoices': InvoiceSerializer(invoices, many=True).data,
+                'error_details': result['errors']
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def generate_term(self, request):
+        """Generate invoices for every class in an academic year and term"""
+        academic_year_id = request.data.get('academic_year_id')
+        term = request.data.get('term')
+        
+        if not all([academic_year_id, term]):
+            return Response(
+                {'error': 'academic_year_id and term are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        service = InvoiceService()
+        try:
+            result = service.generate_term_invoices(
+                academic_year_id=academic_year_id,
+                term=term,
+                generated_by=request.user,
+                due_days=request.data.get('due_days', 30)
             )
             
             return Response({
                 'success': len(result['invoices']),
                 'errors': len(result['errors']),
-                'invoices': InvoiceSerializer(result['invoices'], many=True).data,
+                'total_amount': sum(invoice.total_amount for invoice in result['invoices']),
+                'invoice_numbers': [invoice.invoice_number for invoice in result['invoices']],
                 'error_details': result['errors']
             }, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -165,6 +237,21 @@ class PaymentViewSet(viewsets.ModelViewSet):
     
     queryset = Payment.objects.select_related('invoice', 'received_by').all()
     permission_classes = [IsAuthenticated, CanManageFinance]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-payment_date', '-id')
+
+    EXPORT_COLUMNS = [
+        ('Payment Number', 'payment_number'),
+        ('Payment Date', 'payment_date'),
+        ('Invoice Number', 'invoice__invoice_number'),
+        ('Admission Number', 'invoice__student__admission_number'),
+        ('First Name', 'invoice__student__first_name'),
+        ('Last Name', 'invoice__student__last_name'),
+        ('Amount Paid', 'amount_paid'),
+        ('Payment Method', 'payment_method'),
+        ('Transaction Reference', 'transaction_reference'),
+        ('Received By', 'received_by__username'),
+    ]
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -179,12 +266,10 @@ class PaymentViewSet(viewsets.ModelViewSet):
         # 🔍 Search (student name, invoice number, payment number)
         search = params.get("search")
         if search:
-            
             queryset = queryset.filter(
-                Q(invoice__student__first_name__icontains=search) |
-                Q(invoice__student__last_name__icontains=search) |
-                Q(invoice__invoice_number__icontains=search) |
-                Q(payment_number__icontains=search)
+                Q(pk__in=SearchService.matching_ids(SearchEntry.EntityType.PAYMENT, search)) |
+                Q(invoice__in=SearchService.matching_ids(SearchEntry.EntityType.INVOICE, search)) |
+                Q(invoice__student__in=SearchService.matching_ids(SearchEntry.EntityType.STUDENT, search))
             )
 
         # 🎓 Filter by student
@@ -234,6 +319,34 @@ class PaymentViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered payments as CSV"""
+        return stream_csv(self.get_queryset(), self.EXPORT_COLUMNS, f'payments-{date.today()}.csv')
+    
+    @action(detail=False, methods=['post'])
+    def bulk_record(self, request):
+        """Record a batch of payments, e.g. from an imported bank statement"""
+        serializer = BulkPaymentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = PaymentService()
+        try:
+            result = service.record_bulk_payments(
+                payments_data=serializer.validated_data['payments'],
+                received_by=request.user
+            )
+            
+            return Response({
+                'success': len(result['payments']),
+                'errors': len(result['errors']),
+                'total_amount': sum(payment.amount_paid for payment in result['payments']),
+                'payment_numbers': [payment.payment_number for payment in result['payments']],
+                'error_details': result['errors']
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
     @action(detail=False, methods=['get'])
     def daily_collection(self, request):
         """Get daily collection summary"""
@@ -263,6 +376,8 @@ class ExpenditureViewSet(viewsets.ModelViewSet):
     queryset = Expenditure.objects.select_related('approved_by', 'processed_by').all()
     serializer_class = ExpenditureSerializer
     permission_classes = [IsAuthenticated, CanManageFinance]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-transaction_date', '-id')
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -281,21 +396,7 @@ class ExpenditureViewSet(viewsets.ModelViewSet):
         return queryset
     
     def perform_create(self, serializer):
-        # Generate expenditure number
-        today = datetime.now()
-        date_code = today.strftime('%Y%m%d')
-        
-        last_expenditure = Expenditure.objects.filter(
-            expenditure_number__startswith=f"EXP-{date_code}"
-        ).order_by('-expenditure_number').first()
-        
-        if last_expenditure:
-            last_number = int(last_expenditure.expenditure_number.split('-')[-1])
-            new_number = last_number + 1
-        else:
-            new_number = 1
-    
-        expenditure_number = f"EXP-{date_code}-{new_number:04d}"
+        expenditure_number = ExpenditureService.generate_expenditure_number()
 
         serializer.save(
             expenditure_number=expenditure_number,
@@ -333,6 +434,9 @@ class FinancialDashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated, CanManageFinance]
     serializer_class = FinancialSummarySerializer  # Add this line
     
+    # Years returned by multi_year_trends at most
+    MAX_TREND_YEARS = 10
+    
     @extend_schema(
         responses={200: FinancialSummarySerializer},
         parameters=[
@@ -353,75 +457,126 @@ class FinancialDashboardViewSet(viewsets.ViewSet):
             start_date = today.replace(day=1)
             end_date = today
         
-        # Revenue (payments received)
-        payments = Payment.objects.filter(
-            payment_date__range=[start_date, end_date]
-        )
-        total_revenue = payments.aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00')
-        
-        # Expenditure
-        expenditures = Expenditure.objects.filter(
-            transaction_date__range=[start_date, end_date]
-        )
-        total_expenditure = expenditures.aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
+        summary_data, cache_info = FinancialSummaryService.get_summary(start_date, end_date)
         
-        # Outstanding fees
-        outstanding_invoices = Invoice.objects.filter(
-            status__in=['unpaid', 'partial']
-        )
-        outstanding_fees = outstanding_invoices.aggregate(total=Sum('balance'))['total'] or Decimal('0.00')
+        serializer = FinancialSummarySerializer({**summary_data, **cache_info})
+        return Response(serializer.data)
+    
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='year', type=int, description='Calendar year (defaults to the current year)'),
+        ],
+        description="Get monthly revenue and expenditure for a year"
+    )
+    @action(detail=False, methods=['get'])
+    def monthly_trends(self, request):
+        """Get monthly financial trends for the year"""
+        try:
+            year = int(request.query_params.get('year', datetime.now().year))
+            if not 1 <= year <= 9999:
+                raise ValueError
+        except ValueError:
+            return Response(
+                {'error': 'year must be a whole year between 1 and 9999'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        # Invoice statistics
-        paid_invoices = Invoice.objects.filter(status='paid').count()
-        unpaid_invoices = Invoice.objects.filter(status='unpaid').count()
-        partial_invoices = Invoice.objects.filter(status='partial').count()
+        # One grouped query per table instead of two aggregates per month
+        revenue_by_month = {
+            row['month'].month: row['total']
+            for row in Payment.objects.filter(
+                payment_date__year=year
+            ).annotate(
+                month=TruncMonth('payment_date')
+            ).values('month').annotate(total=Sum('amount_paid')).order_by()
+        }
         
-        summary_data = {
-            'total_revenue': total_revenue,
-            'total_expenditure': total_expenditure,
-            'net_income': total_revenue - total_expenditure,
-            'outstanding_fees': outstanding_fees,
-            'paid_invoices': paid_invoices,
-            'unpaid_invoices': unpaid_invoices,
-            'partial_invoices': partial_invoices,
+        expenditure_by_month = {
+            row['month'].month: row['total']
+            for row in Expenditure.objects.filter(
+                transaction_date__year=year
+            ).annotate(
+                month=TruncMonth('transaction_date')
+            ).values('month').annotate(total=Sum('amount')).order_by()
         }
         
-        serializer = FinancialSummarySerializer(summary_data)
-        return Response(serializer.data)
-    
-@action(detail=False, methods=['get'])
-def monthly_trends(self, request):
-    """Get monthly financial trends for the year"""
-    year = int(request.query_params.get('year', datetime.now().year))
-    
-    monthly_data = []
-    
-    for month in range(1, 13):
-        month_start = datetime(year, month, 1).date()
-        if month == 12:
-            month_end = datetime(year, 12, 31).date()
-        else:
-            month_end = datetime(year, month + 1, 1).date() - timedelta(days=1)
-        
-        # Revenue
-        revenue = Payment.objects.filter(
-            payment_date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount_paid'))['total'] or Decimal('0.00')
-        
-        # Expenditure
-        expenditure = Expenditure.objects.filter(
-            transaction_date__range=[month_start, month_end]
-        ).aggregate(total=Sum('amount'))['total'] or Decimal('0.00')
-        
-        monthly_data.append({
-            'month': month,
-            'month_name': month_start.strftime('%B'),
-            'revenue': float(revenue),
-            'expenditure': float(expenditure),
-            'net': float(revenue - expenditure)
+        monthly_data = []
+        for month in range(1, 13):
+            revenue = revenue_by_month.get(month) or Decimal('0.00')
+            expenditure = expenditure_by_month.get(month) or Decimal('0.00')
+            
+            monthly_data.append({
+                'month': month,
+                'month_name': calendar.month_name[month],
+                'revenue': float(revenue),
+                'expenditure': float(expenditure),
+                'net': float(revenue - expenditure)
+            })
+        
+        return Response({
+            'year': year,
+            'monthly_data': monthly_data
         })
     
-    return Response({
-        'year': year,
-        'monthly_data': monthly_data
-    })
\ No newline at end of file
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='start_year', type=int,
+                description='First calendar year (defaults to end_year - 2; at most 10 years are returned)'
+            ),
+            OpenApiParameter(name='end_year', type=int, description='Last calendar year (defaults to the current year)'),
+        ],
+        description="Get monthly trends across several years from the precomputed monthly rollups"
+    )
+    @action(detail=False, methods=['get'])
+    def multi_year_trends(self, request):
+        """Get monthly financial trends across several years"""
+        try:
+            end_year = int(request.query_params.get('end_year', datetime.now().year))
+            start_year = int(request.query_params.get('start_year', end_year - 2))
+        except ValueError:
+            return Response(
+                {'error': 'start_year and end_year must be whole years'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not 1 <= end_year <= 9999 or not 1 <= start_year <= end_year:
+            return Response(
+                {'error': 'start_year must be a valid year no later than end_year'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Keep the response to at most MAX_TREND_YEARS years, ending at end_year
+        start_year = max(start_year, end_year - self.MAX_TREND_YEARS + 1)
+        
+        rollups = {
+            rollup.month: rollup
+            for rollup in FinanceMonthlyRollup.objects.filter(
+                month__year__gte=start_year,
+                month__year__lte=end_year
+            )
+        }
+        
+        years = []
+        for year in range(start_year, end_year + 1):
+            monthly_data = []
+            for month in range(1, 13):
+                rollup = rollups.get(date(year, month, 1)) or FinanceMonthlyRollup()
+                
+                monthly_data.append({
+                    'month': month,
+                    'month_name': calendar.month_name[month],
+                    'revenue': float(rollup.revenue),
+                    'expenditure': float(rollup.expenditure),
+                    'net': float(rollup.revenue - rollup.expenditure),
+                    'invoice_count': rollup.invoice_count,
+                    'outstanding_balance': float(rollup.outstanding_balance)
+                })
+            
+            years.append({'year': year, 'monthly_data': monthly_data})
+        
+        return Response({
+            'start_year': start_year,
+            'end_year': end_year,
+            'years': years
+        })
@@ -1,9 +1,10 @@
 from decimal import Decimal
 from typing import Dict, List, Tuple
-from django.db.models import Avg, Count, Q
-from apps.grades.models import Grade
-from django.db.models import F, Window
-from django.db.models.functions import Rank
+from django.db import connection, transaction
+from django.db.models import Avg, Count, F, FilteredRelation, Q, Case, When, Value, DecimalField, Window
+from django.db.models.functions import Coalesce, DenseRank
+from apps.academic.models import Enrollment
+from apps.grades.models import Grade, GradeStanding
 
 
 
@@ -93,6 +94,18 @@ class GradeCalculator:
         
         return round(total_points / len(grades), 2)
     
+    @classmethod
+    def grade_points_expression(cls, field: str = 'grade_letter') -> Case:
+        """SQL equivalent of GRADE_POINTS for a grade letter field"""
+        return Case(
+            *[
+                When(**{field: letter}, then=Value(Decimal(str(points))))
+                for letter, points in cls.GRADE_POINTS.items()
+            ],
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        )
+
     @classmethod
     def get_grade_distribution(cls, grades: List[Grade]) -> Dict[str, int]:
         """Get count of each grade letter"""
@@ -229,52 +242,60 @@ class AcademicReportGenerator:
         """
         Returns a dictionary {(subject_id, term): average_score}
         """
-        from django.db.models import Avg
-        
-        averages = Grade.objects.filter(
+        standings = GradeStanding.objects.filter(
             class_obj_id=class_id,
             academic_year=academic_year
-        ).values('subject_id', 'term').annotate(
-            avg_score=Avg('total_score')
-        )
+        ).values_list('term', 'subject_standings')
 
         return {
-            (a['subject_id'], a['term']): round(a['avg_score'], 2) 
-            for a in averages
+            (int(subject_id), term): subject['average']
+            for term, subjects in standings
+            for subject_id, subject in subjects.items()
         }
     
     @staticmethod
     def generate_class_ranking(class_obj, academic_year: str, term: str) -> List[Dict]:
         """
-        Generate ranking of students in a class for a specific term
+        Generate ranking of students in a class for a specific term.
+        Every enrolled student is ranked from the precomputed grade standings;
+        students with no grades for the term rank last with 0.
         """
-        students = class_obj.enrollments.select_related('student').values_list('student_id', flat=True)
-        
-        rankings = []
-        for student_id in students:
-            grades = Grade.objects.filter(
-                student_id=student_id,
-                academic_year=academic_year,
-                term=term
+        standing = FilteredRelation(
+            'student__grade_standings',
+            condition=Q(
+                student__grade_standings__class_obj_id=F('class_obj_id'),
+                student__grade_standings__academic_year=academic_year,
+                student__grade_standings__term=term
             )
-            
-            avg_score = grades.aggregate(Avg('total_score'))['total_score__avg'] or 0
-            gpa = GradeCalculator.calculate_gpa(list(grades))
-            
-            rankings.append({
-                'student_id': student_id,
-                'average_score': round(avg_score, 2),
-                'gpa': gpa
-            })
-        
-        # Sort by average score (descending)
-        rankings.sort(key=lambda x: x['average_score'], reverse=True)
-        
-        # Add rank
-        for idx, ranking in enumerate(rankings, 1):
-            ranking['rank'] = idx
-        
-        return rankings
+        )
+        average_score = Coalesce(
+            F('standing__average_score'), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=5, decimal_places=2)
+        )
+
+        rows = Enrollment.objects.filter(
+            class_obj_id=getattr(class_obj, 'pk', class_obj)
+        ).annotate(standing=standing).values('student_id').annotate(
+            average_score=average_score,
+            gpa=Coalesce(
+                F('standing__gpa'), Value(Decimal('0')),
+                output_field=DecimalField(max_digits=3, decimal_places=2)
+            ),
+            overall_rank=Window(expression=DenseRank(), order_by=average_score.desc()),
+            total_students=Window(expression=Count('*'))
+        ).order_by('overall_rank', 'student_id')
+
+        return [AcademicReportGenerator._ranking_entry(row) for row in rows]
+
+    @staticmethod
+    def _ranking_entry(standing) -> Dict:
+        return {
+            'student_id': standing['student_id'],
+            'average_score': standing['average_score'],
+            'gpa': float(standing['gpa']),
+            'rank': standing['overall_rank'],
+            'total_students': standing['total_students']
+        }
 
 
     @staticmethod
@@ -283,20 +304,15 @@ class AcademicReportGenerator:
             Returns a dictionary {(student_id, subject_id, term): rank}
             to be injected into Serializer context.
             """
-            grades = Grade.objects.filter(
-                class_obj_id=class_id, 
+            standings = GradeStanding.objects.filter(
+                class_obj_id=class_id,
                 academic_year=academic_year
-            ).annotate(
-                rank=Window(
-                    expression=Rank(), 
-                    partition_by=[F('subject_id'), F('term')], 
-                    order_by=F('total_score').desc()
-                )
-            )
+            ).values_list('student_id', 'term', 'subject_standings')
 
             return {
-                (g.student_id, g.subject_id, g.term): g.rank 
-                for g in grades
+                (student_id, int(subject_id), term): subject['rank']
+                for student_id, term, subjects in standings
+                for subject_id, subject in subjects.items()
             }
     
     
@@ -305,17 +321,15 @@ class AcademicReportGenerator:
             """
             Retrieves the rank, average, and GPA for a specific student in a class.
             """
-            # 1. Get the full list of rankings for the class
             all_rankings = AcademicReportGenerator.generate_class_ranking(
                 class_obj, academic_year, term
             )
-            
-            # 2. Find the dictionary belonging to our student
+
             student_rank_data = next(
-                (item for item in all_rankings if item['student_id'] == student_id), 
+                (item for item in all_rankings if item['student_id'] == student_id),
                 None
             )
-            
+
             if not student_rank_data:
                 return {
                     'rank': 'N/A',
@@ -323,33 +337,110 @@ class AcademicReportGenerator:
                     'gpa': 0.0,
                     'total_students': len(all_rankings)
                 }
-                
-            student_rank_data['total_students'] = len(all_rankings)
-            
+
             return student_rank_data
 
+
+class MarkSheetProcessor:
+    """Validate and save a whole mark sheet (one class, subject and term) at once"""
+
+    SCORE_FIELDS = [
+        'assessment_score', 'assessment_total',
+        'test_score', 'test_total',
+        'exam_score', 'exam_total'
+    ]
+
     @staticmethod
-    def generate_class_ranking_optimized(class_obj, academic_year: str, term: str) -> List[Dict]:
-            """
-            Optimized version using Window functions to rank everyone in one database hit.
-            """
-            from django.db.models import Avg, Window, F
-            from django.db.models.functions import Rank
+    def upsert(class_obj, subject, academic_year: str, term: str, rows: List[Dict], entered_by=None) -> Dict:
+        """
+        Create or update the grades on a mark sheet.
+
+        Rows are validated with validate_grade_data; weighted scores, totals and
+        letters are computed in memory and every valid row is written with one
+        upsert. Standings for the subject are refreshed once for the whole sheet.
 
-            # Calculate average per student for this class/term
-            rankings = Grade.objects.filter(
+        Returns dict with saved grades, created/updated counts and per-row errors
+        """
+        student_ids = {row['student_id'] for row in rows}
+        enrollments = dict(
+            Enrollment.objects.filter(
+                class_obj=class_obj,
+                student_id__in=student_ids,
+                status=Enrollment.EnrollmentStatus.ACTIVE
+            ).values_list('student_id', 'id')
+        )
+        existing = set(
+            Grade.objects.filter(
                 class_obj=class_obj,
+                subject=subject,
                 academic_year=academic_year,
-                term=term
-            ).values('student_id').annotate(
-                average_score=Avg('total_score'),
-                rank=Window(
-                    expression=Rank(),
-                    order_by=F('average_score').desc()
-                )
-            ).order_by('rank')
-
-            return list(rankings)
+                term=term,
+                student_id__in=student_ids
+            ).values_list('student_id', flat=True)
+        )
+
+        grades = []
+        errors = []
+        seen = set()
+        for index, row in enumerate(rows):
+            student_id = row['student_id']
+
+            if student_id in seen:
+                errors.append({'row': index, 'student_id': student_id, 'error': "Student appears more than once on the sheet"})
+                continue
+            if student_id not in enrollments:
+                errors.append({'row': index, 'student_id': student_id, 'error': "Student is not enrolled in this class"})
+                continue
+
+            is_valid, messages = validate_grade_data(row)
+            if not is_valid:
+                errors.append({'row': index, 'student_id': student_id, 'error': "; ".join(messages)})
+                continue
+
+            seen.add(student_id)
+            grade = Grade(
+                student_id=student_id,
+                class_obj=class_obj,
+                subject=subject,
+                enrollment_id=enrollments[student_id],
+                entered_by=entered_by,
+                academic_year=academic_year,
+                term=term,
+                **{field: row[field] for field in MarkSheetProcessor.SCORE_FIELDS}
+            )
+
+            # Same rules as Grade.save(), which bulk_create bypasses
+            for field, value in GradeCalculator.calculate_weighted_scores(grade).items():
+                setattr(grade, field, Decimal(value).quantize(Decimal('0.01')))
+            grade.total_score = grade.weighted_assessment + grade.weighted_test + grade.weighted_exam
+            grade.grade_letter = grade.calculate_letter_grade(grade.total_score)
+            grades.append(grade)
+
+        if not grades:
+            return {'grades': [], 'created': 0, 'updated': 0, 'errors': errors}
+
+        unique_fields = ['student', 'class_obj', 'subject', 'academic_year', 'term']
+        with transaction.atomic():
+            Grade.objects.bulk_create(
+                grades,
+                batch_size=500,
+                update_conflicts=True,
+                # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target
+                unique_fields=unique_fields if connection.features.supports_update_conflicts_with_target else None,
+                update_fields=MarkSheetProcessor.SCORE_FIELDS + [
+                    'weighted_assessment', 'weighted_test', 'weighted_exam',
+                    'total_score', 'grade_letter', 'enrollment', 'entered_by'
+                ]
+            )
+            GradeStanding.refresh(class_obj.pk, academic_year, term, subject.pk)
+
+        updated = sum(1 for grade in grades if grade.student_id in existing)
+        return {
+            'grades': grades,
+            'created': len(grades) - updated,
+            'updated': updated,
+            'errors': errors
+        }
 
 
 def validate_grade_data(grade_data: Dict) -> Tuple[bool, List[str]]:
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from apps.grades.models import GradeStanding
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed grade standings (ranks, averages and GPA) from the grades table'
+
+    def handle(self, *args, **kwargs):
+        partitions = GradeStanding.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt grade standings for {partitions} class term(s)."))
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academic', '0002_initial'),
+        ('grades', '0001_initial'),
+        ('students', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9)),
+                ('term', models.CharField(choices=[('first', 'First Term'), ('second', 'Second Term'), ('third', 'Third Term')], max_length=10)),
+                ('average_score', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('gpa', models.DecimalField(decimal_places=2, default=0, max_digits=3)),
+                ('overall_rank', models.PositiveIntegerField(default=1)),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('subject_standings', models.JSONField(default=dict, help_text="Per subject id: {'rank': ..., 'average': ...}")),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('class_obj', models.ForeignKey(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, related_name='grade_standings', to='academic.class')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_standings', to='students.student')),
+            ],
+            options={
+                'db_table': 'grade_standings',
+                'ordering': ['overall_rank'],
+                'indexes': [models.Index(fields=['class_obj', 'academic_year', 'term'], name='grade_stand_class_i_afe075_idx')],
+                'unique_together': {('student', 'class_obj', 'academic_year', 'term')},
+            },
+        ),
+    ]
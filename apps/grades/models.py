@@ -1,4 +1,9 @@
-from django.db import models
+from collections import defaultdict
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Avg, Count, F, Window
+from django.db.models.functions import DenseRank, Rank
+from django.utils import timezone
 from apps.students.models import Student
 from apps.academic.models import Subject, Enrollment, Class
 from apps.accounts.models import User
@@ -70,6 +75,8 @@ class Grade(models.Model):
         indexes = [
             models.Index(fields=['student', 'subject']),
             models.Index(fields=['term', 'academic_year']),
+            # Keyset pagination walks (grade_date, id)
+            models.Index(fields=['grade_date', 'id']),
         ]
 
     def __str__(self):
@@ -79,7 +86,34 @@ class Grade(models.Model):
         # Automatically calculate total_score before saving
         self.total_score = self.weighted_assessment + self.weighted_test + self.weighted_exam
         self.grade_letter = self.calculate_letter_grade(self.total_score)
-        super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            previous = None
+            if not self._state.adding:
+                previous = Grade.objects.filter(pk=self.pk).values(
+                    'class_obj_id', 'academic_year', 'term', 'subject_id'
+                ).first()
+
+            super().save(*args, **kwargs)
+
+            current = self.standing_partition()
+            if previous and previous != current:
+                GradeStanding.refresh(**previous)
+            GradeStanding.refresh(**current)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            GradeStanding.refresh(**self.standing_partition())
+        return result
+
+    def standing_partition(self):
+        return {
+            'class_obj_id': self.class_obj_id,
+            'academic_year': self.academic_year,
+            'term': self.term,
+            'subject_id': self.subject_id,
+        }
 
     def calculate_letter_grade(self, score):
         if score >= 90: return 'A+'
@@ -87,4 +121,147 @@ class Grade(models.Model):
         elif score >= 70: return 'B'
         elif score >= 60: return 'C'
         elif score >= 50: return 'D'
-        return 'F'
\ No newline at end of file
+        return 'F'
+
+
+class GradeStanding(models.Model):
+    """
+    Precomputed standing of a student in a class for one term: overall average,
+    GPA and rank, plus rank and class average for each subject taken.
+    Kept current by Grade.save()/delete(); rebuild with `rebuild_grade_standings`.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='grade_standings')
+    class_obj = models.ForeignKey(
+        Class,
+        on_delete=models.CASCADE,
+        related_name="grade_standings",
+        db_column="class_id"
+    )
+    academic_year = models.CharField(max_length=9)
+    term = models.CharField(max_length=10, choices=Grade.Term.choices)
+    average_score = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    gpa = models.DecimalField(max_digits=3, decimal_places=2, default=0)
+    overall_rank = models.PositiveIntegerField(default=1)
+    total_students = models.PositiveIntegerField(default=0)
+    subject_standings = models.JSONField(
+        default=dict,
+        help_text="Per subject id: {'rank': ..., 'average': ...}"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "grade_standings"
+        unique_together = ["student", "class_obj", "academic_year", "term"]
+        ordering = ['overall_rank']
+        indexes = [
+            models.Index(fields=['class_obj', 'academic_year', 'term']),
+        ]
+
+    def __str__(self):
+        return f"{self.student} | {self.class_obj} | {self.term}: #{self.overall_rank}"
+
+    @classmethod
+    def refresh(cls, class_obj_id, academic_year, term, subject_id=None):
+        """
+        Recompute standings for one class and term.
+        Subject ranks and averages are recomputed only for subject_id (all subjects
+        when omitted); overall averages, GPA and ranks always cover the whole class,
+        since one changed score can move every other student's rank. That costs two
+        grouped reads of the class's grades per Grade save; only standings whose
+        values actually changed are written back.
+        """
+        from .Utils import GradeCalculator
+
+        with transaction.atomic():
+            # Serialize refreshes of the same class so concurrent grade writes cannot race
+            list(Class.objects.select_for_update().filter(pk=class_obj_id).values_list('pk', flat=True))
+
+            grades = Grade.objects.filter(
+                class_obj_id=class_obj_id,
+                academic_year=academic_year,
+                term=term
+            ).order_by()
+            subject_grades = grades.filter(subject_id=subject_id) if subject_id else grades
+
+            subjects = defaultdict(dict)
+            for row in subject_grades.annotate(
+                subject_rank=Window(
+                    expression=Rank(),
+                    partition_by=[F('subject_id')],
+                    order_by=F('total_score').desc()
+                ),
+                subject_average=Window(
+                    expression=Avg('total_score'),
+                    partition_by=[F('subject_id')]
+                )
+            ).values('student_id', 'subject_id', 'subject_rank', 'subject_average'):
+                subjects[row['student_id']][str(row['subject_id'])] = {
+                    'rank': row['subject_rank'],
+                    'average': round(float(row['subject_average']), 2)
+                }
+
+            overall = grades.values('student_id').annotate(
+                average_score=Avg('total_score'),
+                gpa=Avg(GradeCalculator.grade_points_expression()),
+                overall_rank=Window(expression=DenseRank(), order_by=Avg('total_score').desc()),
+                total_students=Window(expression=Count('*'))
+            )
+
+            existing = {
+                standing.student_id: standing
+                for standing in cls.objects.filter(
+                    class_obj_id=class_obj_id,
+                    academic_year=academic_year,
+                    term=term
+                )
+            }
+
+            now = timezone.now()
+            to_create, to_update = [], []
+            for row in overall:
+                standing = existing.pop(row['student_id'], None) or cls(
+                    student_id=row['student_id'],
+                    class_obj_id=class_obj_id,
+                    academic_year=academic_year,
+                    term=term
+                )
+                if subject_id:
+                    standing_subjects = dict(standing.subject_standings)
+                    standing_subjects.pop(str(subject_id), None)
+                    standing_subjects.update(subjects.get(row['student_id'], {}))
+                else:
+                    standing_subjects = subjects.get(row['student_id'], {})
+                values = {
+                    'average_score': Decimal(row['average_score']).quantize(Decimal('0.01')),
+                    'gpa': Decimal(row['gpa']).quantize(Decimal('0.01')),
+                    'overall_rank': row['overall_rank'],
+                    'total_students': row['total_students'],
+                    'subject_standings': standing_subjects,
+                }
+                if standing.pk and all(getattr(standing, field) == value for field, value in values.items()):
+                    continue
+                for field, value in values.items():
+                    setattr(standing, field, value)
+                standing.updated_at = now
+                (to_update if standing.pk else to_create).append(standing)
+
+            # Students left without any grade in this class and term
+            if existing:
+                cls.objects.filter(pk__in=[standing.pk for standing in existing.values()]).delete()
+
+            cls.objects.bulk_create(to_create)
+            cls.objects.bulk_update(to_update, [
+                'average_score', 'gpa', 'overall_rank', 'total_students',
+                'subject_standings', 'updated_at'
+            ])
+
+    @classmethod
+    @transaction.atomic
+    def rebuild(cls):
+        """Recompute every standing from the grades table"""
+        cls.objects.all().delete()
+        partitions = Grade.objects.order_by().values_list('class_obj_id', 'academic_year', 'term').distinct()
+        for class_obj_id, academic_year, term in partitions:
+            cls.refresh(class_obj_id, academic_year, term)
+        return len(partitions)
@@ -103,6 +103,26 @@ class GradeSerializer(serializers.ModelSerializer):
 
         return data
 
+class MarkSheetRowSerializer(serializers.Serializer):
+    """One student's marks on a mark sheet"""
+    student_id = serializers.IntegerField()
+    assessment_score = serializers.DecimalField(max_digits=5, decimal_places=2, default=0)
+    assessment_total = serializers.DecimalField(max_digits=5, decimal_places=2, default=100)
+    test_score = serializers.DecimalField(max_digits=5, decimal_places=2, default=0)
+    test_total = serializers.DecimalField(max_digits=5, decimal_places=2, default=100)
+    exam_score = serializers.DecimalField(max_digits=5, decimal_places=2, default=0)
+    exam_total = serializers.DecimalField(max_digits=5, decimal_places=2, default=100)
+
+
+class MarkSheetSerializer(serializers.Serializer):
+    """Marks for a whole class in one subject and term"""
+    class_id = serializers.PrimaryKeyRelatedField(queryset=Class.objects.all(), source='class_obj')
+    subject_id = serializers.PrimaryKeyRelatedField(queryset=Subject.objects.all(), source='subject')
+    academic_year = serializers.CharField(max_length=9)
+    term = serializers.ChoiceField(choices=Grade.Term.choices)
+    grades = MarkSheetRowSerializer(many=True, allow_empty=False)
+
+
 class StudentTranscriptSerializer(serializers.ModelSerializer):
     grades = serializers.SerializerMethodField()
     summary = serializers.SerializerMethodField()
@@ -182,12 +202,14 @@ class ClassStudentListSerializer(serializers.ModelSerializer):
         Tries to use the academic_year from context if provided in query params.
         """
         academic_year = self.context.get('academic_year')
-        enrollment = obj.enrollments.all()
-        
+        # Filtered in memory so the list view's enrollment prefetch is reused
+        enrollments = obj.enrollments.all()
         if academic_year:
-            enrollment = enrollment.filter(class_obj__academic_year=academic_year)
-        
-        enrollment = enrollment.select_related('class_obj').first()
+            enrollments = [
+                enrollment for enrollment in enrollments
+                if str(enrollment.class_obj.academic_year_id) == str(academic_year)
+            ]
+        enrollment = next(iter(enrollments), None)
         
         if enrollment:
             return enrollment.class_obj.class_name
@@ -1,3 +1,365 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Enrollment, Subject
+from apps.students.models import Student
+from config.profiling import QueryBudgetExceeded, store
+from .models import Grade, GradeStanding
+from .Utils import AcademicReportGenerator, GradeCalculator, MarkSheetProcessor
+from .views import TranscriptViewSet
 
-# Create your tests here.
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_ENFORCE_BUDGETS=True)
+class TranscriptListQueryBudgetTest(TestCase):
+    """The transcript roster must stay within its declared query budget"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='examiner', password='examiner-pass-123', role=User.Role.ADMIN
+        )
+        cls.year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.school_class = Class.objects.create(class_name='Grade 6B', grade_level=6, academic_year=cls.year)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        store.reset()
+
+    def add_students(self, count):
+        for _ in range(count):
+            number = Student.objects.count() + 1
+            student = Student.objects.create(
+                admission_number=f'ADM{number:04d}',
+                first_name='Yaw',
+                last_name=f'Boateng{number}',
+                date_of_birth=date(2013, 5, 1),
+                gender=Student.Gender.MALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=self.school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=self.school_class)
+
+    def test_list_stays_within_budget_as_roster_grows(self):
+        self.add_students(2)
+        response = self.client.get('/transcripts/')
+        self.assertEqual(response.status_code, 200)
+
+        self.add_students(8)
+        response = self.client.get('/transcripts/', {'academic_year': self.year.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['current_class'], 'Grade 6B')
+
+        stats = store.snapshot()['endpoints']['transcript.list']
+        self.assertEqual(stats['requests'], 2)
+        self.assertLessEqual(stats['max_queries'], TranscriptViewSet.query_budgets['list'])
+
+    def test_exceeding_budget_fails(self):
+        self.add_students(2)
+        with mock.patch.object(TranscriptViewSet, 'query_budgets', {'list': 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/transcripts/')
+
+    def test_profiling_summary_is_admin_only(self):
+        self.client.get('/transcripts/')
+        response = self.client.get('/api/profiling/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('transcript.list', response.data['endpoints'])
+
+        teacher = User.objects.create_user(
+            username='tutor', password='tutor-pass-123', role=User.Role.TEACHER
+        )
+        self.client.force_authenticate(teacher)
+        self.assertEqual(self.client.get('/api/profiling/').status_code, 403)
+
+
+class GradeTestData:
+    """A class of three students taking two subjects"""
+
+    ACADEMIC_YEAR = '2025-2026'
+    TERM = Grade.Term.FIRST
+
+    @classmethod
+    def setUpTestData(cls):
+        year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.school_class = Class.objects.create(class_name='Grade 6B', grade_level=6, academic_year=year)
+        cls.maths = Subject.objects.create(subject_name='Mathematics', subject_code='MATH6', grade_level=6)
+        cls.english = Subject.objects.create(subject_name='English', subject_code='ENG6', grade_level=6)
+        cls.students = []
+        for number in range(1, 4):
+            student = Student.objects.create(
+                admission_number=f'ADM{number:04d}',
+                first_name='Esi',
+                last_name=f'Owusu{number}',
+                date_of_birth=date(2013, 5, 1),
+                gender=Student.Gender.FEMALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=cls.school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=cls.school_class)
+            cls.students.append(student)
+
+    def add_grade(self, student, subject, score):
+        # Grade.save() totals the weighted components, so the whole score goes on the exam
+        return Grade.objects.create(
+            student=student,
+            class_obj=self.school_class,
+            subject=subject,
+            academic_year=self.ACADEMIC_YEAR,
+            term=self.TERM,
+            weighted_exam=Decimal(score)
+        )
+
+    def add_grades(self, scores):
+        """scores: one (maths, english) pair per student"""
+        for student, (maths, english) in zip(self.students, scores):
+            self.add_grade(student, self.maths, maths)
+            self.add_grade(student, self.english, english)
+
+    def ranking(self):
+        return AcademicReportGenerator.generate_class_ranking(self.school_class, self.ACADEMIC_YEAR, self.TERM)
+
+
+class ClassRankingTest(GradeTestData, TestCase):
+    """Class ranking comes from one window-function pass over the grades"""
+
+    def test_ranking_uses_dense_ranks_and_sql_gpa(self):
+        self.add_grades([(90, 80), (80, 90), (60, 50)])
+
+        with self.assertNumQueries(1):
+            ranking = self.ranking()
+
+        first, second, third = self.students
+        self.assertEqual(
+            [(entry['student_id'], entry['rank']) for entry in ranking],
+            [(first.pk, 1), (second.pk, 1), (third.pk, 2)]
+        )
+        self.assertEqual([entry['total_students'] for entry in ranking], [3, 3, 3])
+        self.assertEqual(ranking[0]['average_score'], Decimal('85.00'))
+        for entry, student in zip(ranking, self.students):
+            grades = list(Grade.objects.filter(student=student))
+            self.assertEqual(entry['gpa'], GradeCalculator.calculate_gpa(grades))
+        self.assertEqual(ranking[2]['gpa'], 1.5)
+
+    def test_grade_points_expression_matches_python_table(self):
+        self.add_grades([(95, 85), (72, 64), (55, 10)])
+        points = dict(
+            Grade.objects.annotate(
+                points=GradeCalculator.grade_points_expression()
+            ).values_list('pk', 'points')
+        )
+        for grade in Grade.objects.all():
+            self.assertEqual(float(points[grade.pk]), GradeCalculator.GRADE_POINTS.get(grade.grade_letter, 0))
+
+    def test_specific_student_rank(self):
+        self.add_grades([(90, 80), (80, 70), (60, 50)])
+        with self.assertNumQueries(1):
+            standing = AcademicReportGenerator.get_specific_student_rank(
+                self.students[1].pk, self.school_class, self.ACADEMIC_YEAR, self.TERM
+            )
+        self.assertEqual(standing['rank'], 2)
+        self.assertEqual(standing['total_students'], 3)
+
+        # Still enrolled, so ranked with 0 for a term without grades
+        other_term = AcademicReportGenerator.get_specific_student_rank(
+            self.students[1].pk, self.school_class, self.ACADEMIC_YEAR, Grade.Term.SECOND
+        )
+        self.assertEqual((other_term['rank'], other_term['average_score'], other_term['total_students']), (1, 0, 3))
+
+        Enrollment.objects.filter(student=self.students[1]).delete()
+        not_enrolled = AcademicReportGenerator.get_specific_student_rank(
+            self.students[1].pk, self.school_class, self.ACADEMIC_YEAR, self.TERM
+        )
+        self.assertEqual((not_enrolled['rank'], not_enrolled['total_students']), ('N/A', 2))
+
+    def test_enrolled_students_without_grades_rank_last(self):
+        first, second, third = self.students
+        self.add_grade(first, self.maths, 70)
+        self.add_grade(second, self.maths, 85)
+
+        ranking = self.ranking()
+
+        self.assertEqual(
+            [(entry['student_id'], entry['rank'], entry['average_score'], entry['gpa']) for entry in ranking],
+            [(second.pk, 1, Decimal('85.00'), 4.0), (first.pk, 2, Decimal('70.00'), 3.0), (third.pk, 3, 0, 0.0)]
+        )
+        self.assertEqual([entry['total_students'] for entry in ranking], [3, 3, 3])
+
+
+class GradeStandingTest(GradeTestData, TestCase):
+    """Standings are kept current as grades are written"""
+
+    def standings(self):
+        return {
+            standing.student_id: standing
+            for standing in GradeStanding.objects.filter(class_obj=self.school_class, term=self.TERM)
+        }
+
+    def subject_standing(self, student, subject):
+        return self.standings()[student.pk].subject_standings[str(subject.pk)]
+
+    def test_subject_ranks_and_averages(self):
+        self.add_grades([(90, 80), (80, 90), (60, 50)])
+        first, second, third = self.students
+
+        self.assertEqual(self.subject_standing(first, self.maths), {'rank': 1, 'average': 76.67})
+        self.assertEqual(self.subject_standing(third, self.maths)['rank'], 3)
+        self.assertEqual(self.subject_standing(second, self.english)['rank'], 1)
+
+        ranks = AcademicReportGenerator.get_subject_ranks_dict(self.school_class.pk, self.ACADEMIC_YEAR)
+        self.assertEqual(ranks[(third.pk, self.maths.pk, self.TERM)], 3)
+        averages = AcademicReportGenerator.get_subject_averages(self.school_class.pk, self.ACADEMIC_YEAR)
+        self.assertEqual(averages[(self.english.pk, self.TERM)], 73.33)
+
+    def test_grade_changes_refresh_standings(self):
+        self.add_grades([(90, 80), (80, 90), (60, 50)])
+        third = self.students[2]
+
+        grade = Grade.objects.get(student=third, subject=self.maths)
+        grade.weighted_exam = Decimal('99')
+        grade.save()
+        self.assertEqual(self.subject_standing(third, self.maths)['rank'], 1)
+        self.assertEqual(self.subject_standing(self.students[0], self.maths)['rank'], 2)
+        # English is untouched by a maths change
+        self.assertEqual(self.subject_standing(third, self.english)['rank'], 3)
+        self.assertEqual(self.standings()[third.pk].average_score, Decimal('74.50'))
+
+        for grade in Grade.objects.filter(student=third):
+            grade.delete()
+        standings = self.standings()
+        self.assertNotIn(third.pk, standings)
+        self.assertEqual({standing.total_students for standing in standings.values()}, {2})
+        # The ranking still counts the enrolled student, now last with 0
+        self.assertEqual(
+            [(entry['student_id'], entry['rank'], entry['total_students']) for entry in self.ranking()][-1],
+            (third.pk, 2, 3)
+        )
+
+    def test_unchanged_standings_are_not_rewritten(self):
+        self.add_grades([(90, 80), (80, 90), (60, 50)])
+        standings = GradeStanding.objects.filter(class_obj=self.school_class)
+        before = dict(standings.values_list('student_id', 'updated_at'))
+
+        # A remark leaves every score, average and rank where it was
+        grade = Grade.objects.get(student=self.students[0], subject=self.maths)
+        grade.remarks = 'Checked'
+        grade.save()
+        self.assertEqual(dict(standings.values_list('student_id', 'updated_at')), before)
+
+        grade.weighted_exam = Decimal('95')
+        grade.save()
+        after = dict(standings.values_list('student_id', 'updated_at'))
+        self.assertTrue(all(after[student_id] > updated_at for student_id, updated_at in before.items()))
+
+    def test_rebuild_matches_incremental_standings(self):
+        self.add_grades([(90, 80), (80, 90), (60, 50)])
+        expected = self.ranking()
+
+        GradeStanding.objects.all().delete()
+        call_command('rebuild_grade_standings', stdout=StringIO())
+        self.assertEqual(self.ranking(), expected)
+
+
+class MarkSheetUpsertTest(GradeTestData, TestCase):
+    """A whole mark sheet is validated in memory and written with one upsert"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.user = User.objects.create_user(
+            username='examiner', password='examiner-pass-123', role=User.Role.ADMIN
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def row(self, student, assessment, test, exam):
+        return {
+            'student_id': student.pk,
+            'assessment_score': assessment,
+            'test_score': test,
+            'exam_score': exam,
+        }
+
+    def upsert(self, rows):
+        return self.client.post('/grades/bulk-upsert/', {
+            'class_id': self.school_class.pk,
+            'subject_id': self.maths.pk,
+            'academic_year': self.ACADEMIC_YEAR,
+            'term': self.TERM,
+            'grades': rows,
+        }, format='json')
+
+    def test_insert_then_update(self):
+        first, second, third = self.students
+        response = self.upsert([self.row(first, 90, 80, 70), self.row(second, 50, 50, 50)])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (2, 0))
+
+        grade = Grade.objects.get(student=first, subject=self.maths)
+        # 30% of 90 + 20% of 80 + 50% of 70
+        self.assertEqual(grade.weighted_assessment, Decimal('27.00'))
+        self.assertEqual(grade.weighted_test, Decimal('16.00'))
+        self.assertEqual(grade.weighted_exam, Decimal('35.00'))
+        self.assertEqual(grade.total_score, Decimal('78.00'))
+        self.assertEqual(grade.grade_letter, 'B')
+        self.assertEqual(grade.entered_by, self.user)
+
+        response = self.upsert([self.row(first, 100, 100, 90), self.row(third, 10, 10, 10)])
+        self.assertEqual((response.data['created'], response.data['updated']), (1, 1))
+        self.assertEqual(Grade.objects.count(), 3)
+
+        grade.refresh_from_db()
+        self.assertEqual(grade.total_score, Decimal('95.00'))
+        self.assertEqual(grade.grade_letter, 'A+')
+        self.assertEqual(Grade.objects.get(student=third).grade_letter, 'F')
+
+        ranking = self.ranking()
+        self.assertEqual([entry['student_id'] for entry in ranking], [first.pk, second.pk, third.pk])
+
+    def test_rejects_students_not_on_the_class_roster(self):
+        first, second, third = self.students
+        Enrollment.objects.filter(student=third).update(status=Enrollment.EnrollmentStatus.WITHDRAWN)
+        outsider = Student.objects.create(
+            admission_number='ADM0099',
+            first_name='Kwame',
+            last_name='Asante',
+            date_of_birth=date(2013, 5, 1),
+            gender=Student.Gender.MALE,
+            admission_date=date(2025, 9, 1)
+        )
+
+        response = self.upsert([
+            self.row(first, 90, 80, 70),
+            self.row(outsider, 90, 80, 70),
+            self.row(third, 90, 80, 70),
+            {'student_id': 999999, 'exam_score': 50},
+            self.row(first, 10, 10, 10),
+            {'student_id': second.pk, 'exam_score': 120},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['success'], 1)
+        self.assertEqual([error['row'] for error in response.data['error_details']], [1, 2, 3, 4, 5])
+        self.assertEqual(list(Grade.objects.values_list('student_id', flat=True)), [first.pk])
+
+    def test_sheet_uses_fixed_query_count(self):
+        rows = [
+            {field: Decimal(60) for field in MarkSheetProcessor.SCORE_FIELDS} | {'student_id': student.pk}
+            for student in self.students
+        ]
+        with self.assertNumQueries(12):
+            # enrollments, existing grades, one upsert, then the standings refresh:
+            # class lock, subject ranks, existing standings, overall ranks, one insert;
+            # plus two savepoint pairs
+            MarkSheetProcessor.upsert(self.school_class, self.maths, self.ACADEMIC_YEAR, self.TERM, rows)
@@ -2,23 +2,47 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from .models import Grade,Student,Class
-from .serializers import GradeSerializer, ClassStudentListSerializer,StudentTranscriptSerializer
-from apps.accounts.permissions import CanManageGrades
-from .Utils import AcademicReportGenerator
+from apps.academic.models import Enrollment
+from .serializers import GradeSerializer, ClassStudentListSerializer,StudentTranscriptSerializer, MarkSheetSerializer
+from apps.accounts.permissions import CanManageGrades, ClassScopedMixin
+from .Utils import AcademicReportGenerator, MarkSheetProcessor
+from config.exports import stream_csv
+from config.pagination import KeysetPagination
 # --------------------------
 # Grade ViewSet
 # --------------------------
-class GradeViewSet(viewsets.ModelViewSet):
+class GradeViewSet(ClassScopedMixin, viewsets.ModelViewSet):
     queryset = Grade.objects.select_related('student', 'subject', 'class_obj').all()
     serializer_class = GradeSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, CanManageGrades]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-grade_date', '-id')
+
+    EXPORT_COLUMNS = [
+        ('Admission Number', 'student__admission_number'),
+        ('First Name', 'student__first_name'),
+        ('Last Name', 'student__last_name'),
+        ('Class', 'class_obj__class_name'),
+        ('Subject', 'subject__subject_name'),
+        ('Academic Year', 'academic_year'),
+        ('Term', 'term'),
+        ('Assessment Score', 'assessment_score'),
+        ('Test Score', 'test_score'),
+        ('Exam Score', 'exam_score'),
+        ('Weighted Assessment', 'weighted_assessment'),
+        ('Weighted Test', 'weighted_test'),
+        ('Weighted Exam', 'weighted_exam'),
+        ('Total Score', 'total_score'),
+        ('Grade', 'grade_letter'),
+    ]
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        if self.action == 'list':
+        if self.action in ('list', 'export'):
             class_id = self.request.query_params.get("class")
             subject_id = self.request.query_params.get("subject")
             academic_year = self.request.query_params.get("academic_year")
@@ -34,6 +58,36 @@ class GradeViewSet(viewsets.ModelViewSet):
                 queryset = queryset.filter(term=term)
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream the filtered grades (mark sheet) as CSV"""
+        return stream_csv(self.get_queryset(), self.EXPORT_COLUMNS, f'grades-{timezone.localdate()}.csv')
+
+    @action(detail=False, methods=['post'], url_path='bulk-upsert', permission_classes=[IsAuthenticated, CanManageGrades])
+    def bulk_upsert(self, request):
+        """Create or update the grades for a whole class from one mark sheet"""
+        serializer = MarkSheetSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        self.check_class_scope(data['class_obj'])
+
+        result = MarkSheetProcessor.upsert(
+            class_obj=data['class_obj'],
+            subject=data['subject'],
+            academic_year=data['academic_year'],
+            term=data['term'],
+            rows=data['grades'],
+            entered_by=request.user
+        )
+
+        return Response({
+            'success': len(result['grades']),
+            'created': result['created'],
+            'updated': result['updated'],
+            'errors': len(result['errors']),
+            'error_details': result['errors']
+        }, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get', 'patch'], url_path='by-params')
     @action(detail=False, methods=['get', 'patch'], url_path='by-params')
     def get_by_params(self, request):
@@ -65,9 +119,10 @@ class GradeViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
             
         elif request.method == 'PATCH':
+            self.check_class_scope(grade.class_obj_id)
             serializer = self.get_serializer(grade, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            self.perform_update(serializer)
             return Response(serializer.data)
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -88,6 +143,8 @@ class GradeViewSet(viewsets.ModelViewSet):
 # --------------------------
 class TranscriptViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('admission_number',)
+    query_budgets = {'list': 4}
 
     def get_serializer_context(self):
         return {
@@ -116,7 +173,16 @@ class TranscriptViewSet(viewsets.ViewSet):
         if status_filter:
             students = students.filter(status=status_filter)
 
-        students = students.distinct()
+        students = students.distinct().prefetch_related(
+            Prefetch('enrollments', queryset=Enrollment.objects.select_related('class_obj'))
+        )
+
+        # `?cursor=` walks the roster by admission number instead of OFFSET pages
+        paginator = KeysetPagination()
+        if paginator.is_keyset_request(request):
+            students_page = paginator.paginate_queryset(students, request, view=self)
+            serializer = ClassStudentListSerializer(students_page, many=True)
+            return paginator.get_paginated_response(serializer.data)
 
         page = int(request.query_params.get('page', 1))
         page_size = int(request.query_params.get('page_size', 10))
@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import SearchEntry
+
+
+@admin.register(SearchEntry)
+class SearchEntryAdmin(admin.ModelAdmin):
+    list_display = ('entity_type', 'object_id', 'token', 'weight')
+    list_filter = ('entity_type',)
+    search_fields = ('token',)
+    ordering = ('entity_type', 'object_id', 'token')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from apps.search.models import SearchEntry
+from apps.search.services import SearchService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index for students, parents, invoices and payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--type', action='append', dest='types', choices=SearchEntry.EntityType.values,
+            help='Only rebuild this entity type (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        written = SearchService.rebuild(options['types'])
+        for entity_type, count in written.items():
+            self.stdout.write(f"  {entity_type}: {count} token(s)")
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt search index for {len(written)} entity type(s)."))
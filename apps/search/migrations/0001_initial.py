@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('student', 'Student'), ('parent', 'Parent'), ('invoice', 'Invoice'), ('payment', 'Payment')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('token', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1, help_text='Relevance of the source field')),
+            ],
+            options={
+                'db_table': 'search_entries',
+                'indexes': [models.Index(fields=['entity_type', 'token'], name='search_entr_entity__b90f2b_idx')],
+                'unique_together': {('entity_type', 'object_id', 'token')},
+            },
+        ),
+    ]
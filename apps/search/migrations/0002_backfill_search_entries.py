@@ -0,0 +1,92 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:41
+
+import re
+
+from django.db import migrations
+
+
+# Frozen copies of apps.search.services as of this migration, so later changes
+# to the live tokenizer or field map cannot change what this backfill writes
+TOKEN_PATTERN = re.compile(r'[a-z]+|[0-9]+')
+TOKEN_MAX_LENGTH = 64
+PHONE_SUBSCRIBER_DIGITS = 9
+IDENTIFIER_FIELDS = {'admission_number', 'invoice_number', 'payment_number', 'transaction_reference'}
+PHONE_FIELDS = {'phone_number'}
+
+# entity type -> (model label, [(field, weight)])
+SEARCH_FIELDS = {
+    'student': ('students.Student', [
+        ('admission_number', 4),
+        ('first_name', 3),
+        ('last_name', 3),
+        ('middle_name', 2),
+    ]),
+    'parent': ('students.Parent', [
+        ('first_name', 3),
+        ('last_name', 3),
+        ('phone_number', 2),
+        ('email', 2),
+    ]),
+    'invoice': ('finance.Invoice', [
+        ('invoice_number', 4),
+    ]),
+    'payment': ('finance.Payment', [
+        ('payment_number', 4),
+        ('transaction_reference', 2),
+    ]),
+}
+
+
+def field_tokens(field, value):
+    value = str(value or '')
+    tokens = {word[:TOKEN_MAX_LENGTH] for word in TOKEN_PATTERN.findall(value.lower())}
+    if field not in IDENTIFIER_FIELDS and field not in PHONE_FIELDS:
+        return tokens
+    digits = ''.join(word for word in TOKEN_PATTERN.findall(value) if word.isdigit())
+    if digits:
+        tokens.add(digits[:TOKEN_MAX_LENGTH])
+    if field in PHONE_FIELDS and len(digits) >= PHONE_SUBSCRIBER_DIGITS:
+        subscriber = digits[-PHONE_SUBSCRIBER_DIGITS:]
+        tokens.update([subscriber, digits[-PHONE_SUBSCRIBER_DIGITS - 1:], f'0{subscriber}'])
+    return tokens
+
+
+def token_weights(fields, obj):
+    weights = {}
+    for field, weight in fields:
+        for token in field_tokens(field, getattr(obj, field)):
+            weights[token] = max(weights.get(token, 0), weight)
+    return weights
+
+
+def backfill_search_entries(apps, schema_editor):
+    """Index the records that existed before the search index, as SearchService.rebuild() does"""
+    SearchEntry = apps.get_model('search', 'SearchEntry')
+    chunk_size = 2000
+    for entity_type, (model_label, fields) in SEARCH_FIELDS.items():
+        source = apps.get_model(model_label)
+        SearchEntry.objects.filter(entity_type=entity_type).delete()
+        entries = []
+        records = source.objects.only(*[field for field, weight in fields]).order_by('pk')
+        for obj in records.iterator(chunk_size=chunk_size):
+            entries.extend(
+                SearchEntry(entity_type=entity_type, object_id=obj.pk, token=token, weight=weight)
+                for token, weight in token_weights(fields, obj).items()
+            )
+            if len(entries) >= chunk_size:
+                SearchEntry.objects.bulk_create(entries, batch_size=1000)
+                entries = []
+        SearchEntry.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('students', '0001_initial'),
+        ('finance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_entries, migrations.RunPython.noop),
+    ]
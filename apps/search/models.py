@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class SearchEntry(models.Model):
+    """
+    Token index for prefix search. Each searchable record contributes one row
+    per normalized word (plus compacted identifier and phone forms), so lookups are indexed
+    `token LIKE 'abc%'` range scans on any database backend.
+    """
+
+    class EntityType(models.TextChoices):
+        STUDENT = 'student', 'Student'
+        PARENT = 'parent', 'Parent'
+        INVOICE = 'invoice', 'Invoice'
+        PAYMENT = 'payment', 'Payment'
+
+    entity_type = models.CharField(max_length=20, choices=EntityType.choices)
+    object_id = models.PositiveBigIntegerField()
+    token = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1, help_text="Relevance of the source field")
+
+    class Meta:
+        db_table = 'search_entries'
+        unique_together = ['entity_type', 'object_id', 'token']
+        indexes = [
+            models.Index(fields=['entity_type', 'token']),
+        ]
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.object_id} {self.token}"
@@ -0,0 +1,237 @@
+import re
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Max, OuterRef, Q, Subquery, Value, When
+from apps.students.models import Student, Parent
+from apps.finance.models import Invoice, Payment
+from .models import SearchEntry
+
+
+# Letter and digit runs are separate words, so "ADM-0012", "adm0012" and "0012"
+# all reach the same tokens
+TOKEN_PATTERN = re.compile(r'[a-z]+|[0-9]+')
+TOKEN_MAX_LENGTH = SearchEntry._meta.get_field('token').max_length
+MAX_QUERY_TERMS = 5
+# Digits of a phone number after the country code or trunk 0
+PHONE_SUBSCRIBER_DIGITS = 9
+# Separators between digits in a query, so "020 123 4567" and "2025-1" search as one number
+DIGIT_SEPARATOR_PATTERN = re.compile(r'(?<=[0-9])[^a-z0-9]+(?=[0-9])')
+
+
+class SearchService:
+    """Service layer for the search index"""
+
+    # entity type -> (model, [(field, weight)])
+    SEARCH_FIELDS = {
+        SearchEntry.EntityType.STUDENT: (Student, [
+            ('admission_number', 4),
+            ('first_name', 3),
+            ('last_name', 3),
+            ('middle_name', 2),
+        ]),
+        SearchEntry.EntityType.PARENT: (Parent, [
+            ('first_name', 3),
+            ('last_name', 3),
+            ('phone_number', 2),
+            ('email', 2),
+        ]),
+        SearchEntry.EntityType.INVOICE: (Invoice, [
+            ('invoice_number', 4),
+        ]),
+        SearchEntry.EntityType.PAYMENT: (Payment, [
+            ('payment_number', 4),
+            ('transaction_reference', 2),
+        ]),
+    }
+    # Identifiers are also indexed with their digit runs joined, so "2025100008" finds
+    # INV-2025-1-00008; phone numbers also by their last 9 and 10 digits and the local
+    # 0-prefixed form, so "0201234567" and "201234567" find +233201234567
+    IDENTIFIER_FIELDS = {'admission_number', 'invoice_number', 'payment_number', 'transaction_reference'}
+    PHONE_FIELDS = {'phone_number'}
+
+    @staticmethod
+    def tokenize(value):
+        """Lowercased letter and digit runs of a value"""
+        return {word[:TOKEN_MAX_LENGTH] for word in TOKEN_PATTERN.findall(str(value or '').lower())}
+
+    @classmethod
+    def field_tokens(cls, field, value):
+        """Tokens of one field's value, with the compacted and phone forms it calls for"""
+        tokens = cls.tokenize(value)
+        if field not in cls.IDENTIFIER_FIELDS and field not in cls.PHONE_FIELDS:
+            return tokens
+        digits = ''.join(word for word in TOKEN_PATTERN.findall(str(value or '')) if word.isdigit())
+        if digits:
+            tokens.add(digits[:TOKEN_MAX_LENGTH])
+        if field in cls.PHONE_FIELDS and len(digits) >= PHONE_SUBSCRIBER_DIGITS:
+            subscriber = digits[-PHONE_SUBSCRIBER_DIGITS:]
+            tokens.update([subscriber, digits[-PHONE_SUBSCRIBER_DIGITS - 1:], f'0{subscriber}'])
+        return tokens
+
+    @classmethod
+    def query_terms(cls, query):
+        """Search terms of a user query; every term must prefix-match a token"""
+        words = TOKEN_PATTERN.findall(DIGIT_SEPARATOR_PATTERN.sub('', str(query or '').lower()))
+        return [word[:TOKEN_MAX_LENGTH] for word in dict.fromkeys(words)][:MAX_QUERY_TERMS]
+
+    @classmethod
+    def entity_type_for(cls, model):
+        for entity_type, (entity_model, fields) in cls.SEARCH_FIELDS.items():
+            if entity_model is model:
+                return entity_type
+        return None
+
+    @classmethod
+    def token_weights(cls, entity_type, obj):
+        """{token: weight} for a record, each token weighted by its most relevant field"""
+        weights = {}
+        for field, weight in cls.SEARCH_FIELDS[entity_type][1]:
+            for token in cls.field_tokens(field, getattr(obj, field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        return weights
+
+    @classmethod
+    def build_entries(cls, entity_type, obj):
+        return [
+            SearchEntry(entity_type=entity_type, object_id=obj.pk, token=token, weight=weight)
+            for token, weight in cls.token_weights(entity_type, obj).items()
+        ]
+
+    @classmethod
+    @transaction.atomic
+    def index(cls, entity_type, objects):
+        """(Re)index saved objects of one entity type: one delete and one insert"""
+        objects = [obj for obj in objects if obj.pk is not None]
+        if not objects:
+            return 0
+        SearchEntry.objects.filter(
+            entity_type=entity_type,
+            object_id__in=[obj.pk for obj in objects]
+        ).delete()
+        entries = [entry for obj in objects for entry in cls.build_entries(entity_type, obj)]
+        SearchEntry.objects.bulk_create(entries, batch_size=1000)
+        return len(entries)
+
+    @staticmethod
+    def remove(entity_type, object_ids):
+        SearchEntry.objects.filter(entity_type=entity_type, object_id__in=list(object_ids)).delete()
+
+    @classmethod
+    def rebuild(cls, entity_types=None, chunk_size=2000):
+        """Rebuild the index from the source tables; returns entries written per type"""
+        written = {}
+        for entity_type in entity_types or cls.SEARCH_FIELDS:
+            model, fields = cls.SEARCH_FIELDS[entity_type]
+            field_names = [field for field, weight in fields]
+            with transaction.atomic():
+                SearchEntry.objects.filter(entity_type=entity_type).delete()
+                entries = []
+                count = 0
+                for obj in model.objects.only(*field_names).order_by('pk').iterator(chunk_size=chunk_size):
+                    entries.extend(cls.build_entries(entity_type, obj))
+                    if len(entries) >= chunk_size:
+                        SearchEntry.objects.bulk_create(entries, batch_size=1000)
+                        count += len(entries)
+                        entries = []
+                SearchEntry.objects.bulk_create(entries, batch_size=1000)
+                written[entity_type] = count + len(entries)
+        return written
+
+    @classmethod
+    def matches(cls, entity_type, query):
+        """
+        Grouped subquery of (object_id, rank) for records where every query term
+        prefixes one of their tokens. An exact token match scores double its
+        field weight, a prefix match scores the weight. None for empty queries.
+        """
+        terms = cls.query_terms(query)
+        if not terms:
+            return None
+
+        # Tokens are stored lowercased. istartswith compiles to a plain LIKE on MySQL,
+        # where startswith becomes LIKE BINARY and can skip the (entity_type, token) index
+        prefix_filter = Q()
+        scores = {}
+        for position, term in enumerate(terms):
+            prefix_filter |= Q(token__istartswith=term)
+            scores[f'term_{position}'] = Max(Case(
+                When(token=term, then=F('weight') * 2),
+                When(token__istartswith=term, then=F('weight')),
+                default=Value(0),
+                output_field=IntegerField()
+            ))
+
+        grouped = SearchEntry.objects.filter(
+            prefix_filter, entity_type=entity_type
+        ).values('object_id').annotate(**scores)
+        grouped = grouped.filter(**{f'{name}__gt': 0 for name in scores})
+        rank = None
+        for name in scores:
+            rank = F(name) if rank is None else rank + F(name)
+        return grouped.annotate(rank=rank).order_by()
+
+    @classmethod
+    def matching_ids(cls, entity_type, query):
+        matches = cls.matches(entity_type, query)
+        if matches is None:
+            return SearchEntry.objects.none().values('object_id')
+        return matches.values('object_id')
+
+    @classmethod
+    def filter(cls, queryset, entity_type, query, order=True):
+        """
+        Restrict a queryset to records matching the query, annotated with
+        `search_rank` and, when `order` is set, ordered best match first.
+        """
+        matches = cls.matches(entity_type, query)
+        if matches is None:
+            return queryset.none()
+        queryset = queryset.filter(pk__in=matches.values('object_id')).annotate(
+            search_rank=Subquery(matches.filter(object_id=OuterRef('pk')).values('rank')[:1])
+        )
+        if order:
+            queryset = queryset.order_by('-search_rank', 'pk')
+        return queryset
+
+    @classmethod
+    def typeahead(cls, query, entity_types, limit=10):
+        """Best matches across entity types as {'type', 'id', 'label', 'rank'} dicts"""
+        suggestions = []
+        for entity_type in entity_types:
+            matches = cls.matches(entity_type, query)
+            if matches is None:
+                return []
+            top = list(matches.order_by('-rank', 'object_id').values_list('object_id', 'rank')[:limit])
+            if not top:
+                continue
+            model = cls.SEARCH_FIELDS[entity_type][0]
+            objects = cls._label_queryset(entity_type, model).in_bulk([object_id for object_id, rank in top])
+            for object_id, rank in top:
+                obj = objects.get(object_id)
+                if obj is not None:
+                    suggestions.append({
+                        'type': entity_type,
+                        'id': object_id,
+                        'label': cls._label(entity_type, obj),
+                        'rank': rank,
+                    })
+        suggestions.sort(key=lambda suggestion: -suggestion['rank'])
+        return suggestions[:limit]
+
+    @staticmethod
+    def _label_queryset(entity_type, model):
+        if entity_type == SearchEntry.EntityType.INVOICE:
+            return model.objects.select_related('student')
+        if entity_type == SearchEntry.EntityType.PAYMENT:
+            return model.objects.select_related('invoice__student')
+        return model.objects.all()
+
+    @staticmethod
+    def _label(entity_type, obj):
+        if entity_type == SearchEntry.EntityType.STUDENT:
+            return f"{obj.first_name} {obj.last_name} ({obj.admission_number})"
+        if entity_type == SearchEntry.EntityType.PARENT:
+            return f"{obj.first_name} {obj.last_name} - {obj.phone_number}"
+        if entity_type == SearchEntry.EntityType.INVOICE:
+            return f"{obj.invoice_number} - {obj.student.first_name} {obj.student.last_name}"
+        student = obj.invoice.student
+        return f"{obj.payment_number} - {student.first_name} {student.last_name} ({obj.amount_paid})"
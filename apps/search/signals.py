@@ -0,0 +1,27 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.students.models import Student, Parent
+from apps.finance.models import Invoice, Payment
+from .services import SearchService
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Parent)
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=Payment)
+def index_search_entry(sender, instance, raw=False, **kwargs):
+    """
+    Keep the search index in step with single-record saves.
+    Bulk writers (bulk_create/update) skip signals and index explicitly.
+    """
+    if raw:
+        return
+    SearchService.index(SearchService.entity_type_for(sender), [instance])
+
+
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Parent)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=Payment)
+def remove_search_entry(sender, instance, **kwargs):
+    SearchService.remove(SearchService.entity_type_for(sender), [instance.pk])
@@ -0,0 +1,179 @@
+from datetime import date
+from importlib import import_module
+from django.apps import apps as django_apps
+from django.test import TestCase
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.students.models import Student, Parent
+from .models import SearchEntry
+from .services import SearchService
+
+
+class SearchTestData:
+    """Students indexed through the post_save signal"""
+
+    def add_student(self, admission_number, first_name, last_name):
+        return Student.objects.create(
+            admission_number=admission_number,
+            first_name=first_name,
+            last_name=last_name,
+            date_of_birth=date(2014, 3, 1),
+            gender=Student.Gender.FEMALE,
+            admission_date=date(2025, 9, 1)
+        )
+
+    def tokens(self, obj, entity_type=SearchEntry.EntityType.STUDENT):
+        return dict(
+            SearchEntry.objects.filter(entity_type=entity_type, object_id=obj.pk).values_list('token', 'weight')
+        )
+
+    def search(self, query):
+        return list(
+            SearchService.filter(Student.objects.all(), SearchEntry.EntityType.STUDENT, query).values_list(
+                'admission_number', flat=True
+            )
+        )
+
+
+class TokenizeTest(TestCase):
+    """Letter and digit runs are indexed and queried as separate lowercase words"""
+
+    def test_tokenize(self):
+        self.assertEqual(SearchService.tokenize('ADM-0012'), {'adm', '0012'})
+        self.assertEqual(SearchService.tokenize('adm0012'), {'adm', '0012'})
+        self.assertEqual(SearchService.tokenize("Ama O'Neil-Mensah"), {'ama', 'o', 'neil', 'mensah'})
+        self.assertEqual(SearchService.tokenize(None), set())
+        self.assertEqual(SearchService.tokenize('x' * 100), {'x' * 64})
+
+    def test_identifier_and_phone_forms(self):
+        self.assertEqual(SearchService.field_tokens('invoice_number', 'INV-2025-1-00008'), {
+            'inv', '2025', '1', '00008', '2025100008'
+        })
+        self.assertEqual(SearchService.field_tokens('phone_number', '+233201234567'), {
+            '233201234567', '201234567', '3201234567', '0201234567'
+        })
+        self.assertEqual(SearchService.field_tokens('phone_number', '0201234567'), {'0201234567', '201234567'})
+        self.assertEqual(SearchService.field_tokens('phone_number', '12345'), {'12345'})
+        # Names are not compacted
+        self.assertEqual(SearchService.field_tokens('last_name', 'Mensah 2'), {'mensah', '2'})
+
+    def test_query_terms_join_separated_digits(self):
+        self.assertEqual(SearchService.query_terms('020 123 4567'), ['0201234567'])
+        self.assertEqual(SearchService.query_terms('+233-20-123-4567'), ['233201234567'])
+        self.assertEqual(SearchService.query_terms('ADM 0012'), ['adm', '0012'])
+
+    def test_query_terms_keep_order_and_drop_repeats(self):
+        self.assertEqual(SearchService.query_terms('Mensah ama MENSAH'), ['mensah', 'ama'])
+        self.assertEqual(SearchService.query_terms('a b c d e f g'), ['a', 'b', 'c', 'd', 'e'])
+        self.assertEqual(SearchService.query_terms(' -- '), [])
+
+
+class SearchMatchTest(SearchTestData, TestCase):
+    """Every query word must prefix-match a token; exact words outrank prefixes"""
+
+    def setUp(self):
+        self.add_student('ADM0012', 'Ama', 'Mensah')
+        self.add_student('ADM0013', 'Kofi', 'Mensah')
+        self.add_student('ADM0014', 'Kofiana', 'Boateng')
+
+    def test_prefix_matching(self):
+        self.assertEqual(self.search('mens'), ['ADM0012', 'ADM0013'])
+        self.assertEqual(self.search('MENS'), ['ADM0012', 'ADM0013'])
+        # Tokens only match from their start
+        self.assertEqual(self.search('ensah'), [])
+        # Every word must match
+        self.assertEqual(self.search('ama mensah'), ['ADM0012'])
+        self.assertEqual(self.search('ama boateng'), [])
+        self.assertEqual(self.search('adm-0014'), ['ADM0014'])
+        self.assertEqual(self.search(''), [])
+
+    def test_exact_words_rank_above_prefixes(self):
+        self.assertEqual(self.search('kofi'), ['ADM0013', 'ADM0014'])
+        ranks = dict(
+            SearchService.filter(Student.objects.all(), SearchEntry.EntityType.STUDENT, 'kofi').values_list(
+                'admission_number', 'search_rank'
+            )
+        )
+        # first_name weighs 3: doubled for the exact word
+        self.assertEqual(ranks, {'ADM0013': 6, 'ADM0014': 3})
+
+    def test_typeahead_endpoint(self):
+        user = User.objects.create_user(username='registrar', password='registrar-pass-123', role=User.Role.ADMIN)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.get('/search/', {'q': 'kofi', 'types': 'student'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['label'] for result in response.data['results']],
+            ['Kofi Mensah (ADM0013)', 'Kofiana Boateng (ADM0014)']
+        )
+        self.assertEqual(client.get('/search/', {'q': 'kofi', 'types': 'teacher'}).status_code, 400)
+
+
+class SearchSignalTest(SearchTestData, TestCase):
+    """Saving or deleting a record keeps its index entries current"""
+
+    def test_save_and_delete_update_the_index(self):
+        student = self.add_student('ADM0012', 'Ama', 'Mensah')
+        self.assertEqual(self.tokens(student), {'adm': 4, '0012': 4, 'ama': 3, 'mensah': 3})
+
+        student.last_name = 'Owusu'
+        student.save()
+        self.assertEqual(self.search('mensah'), [])
+        self.assertEqual(self.search('owu'), ['ADM0012'])
+
+        student.delete()
+        self.assertFalse(SearchEntry.objects.exists())
+
+    def test_parent_fields_are_indexed(self):
+        parent = Parent.objects.create(
+            first_name='Kofi',
+            last_name='Mensah',
+            phone_number='+233201234567',
+            relationship=Parent.Relationship.FATHER
+        )
+        self.assertEqual(
+            self.tokens(parent, SearchEntry.EntityType.PARENT),
+            {'kofi': 3, 'mensah': 3, '233201234567': 2, '201234567': 2, '3201234567': 2, '0201234567': 2}
+        )
+
+    def test_phone_lookup(self):
+        for number, phone_number in enumerate(['+233201234567', '0244123456']):
+            Parent.objects.create(
+                first_name='Kofi',
+                last_name=f'Mensah{number}',
+                phone_number=phone_number,
+                relationship=Parent.Relationship.FATHER
+            )
+
+        def search(query):
+            return list(
+                SearchService.filter(Parent.objects.all(), SearchEntry.EntityType.PARENT, query).values_list(
+                    'phone_number', flat=True
+                )
+            )
+
+        for query in ['+233201234567', '233 20 123 4567', '0201234567', '020 123 4567', '201234567', '02012']:
+            with self.subTest(query=query):
+                self.assertEqual(search(query), ['+233201234567'])
+        for query in ['0244123456', '244 123 456', '024412']:
+            with self.subTest(query=query):
+                self.assertEqual(search(query), ['0244123456'])
+        self.assertEqual(search('kofi 020'), ['+233201234567'])
+
+
+class SearchBackfillMigrationTest(SearchTestData, TestCase):
+    """The data migration indexes records that predate the index"""
+
+    def test_backfill_matches_rebuild(self):
+        for number in range(3):
+            self.add_student(f'ADM{number:04d}', 'Esi', f'Owusu{number}')
+        expected = set(SearchEntry.objects.values_list('entity_type', 'object_id', 'token', 'weight'))
+
+        SearchEntry.objects.all().delete()
+        migration = import_module('apps.search.migrations.0002_backfill_search_entries')
+        migration.backfill_search_entries(django_apps, None)
+
+        self.assertEqual(set(SearchEntry.objects.values_list('entity_type', 'object_id', 'token', 'weight')), expected)
+        self.assertEqual(self.search('owusu1'), ['ADM0001'])
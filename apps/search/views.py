@@ -0,0 +1,56 @@
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from apps.accounts.permissions import CanManageFinance, CanManageStudents
+from .models import SearchEntry
+from .services import SearchService
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """Ranked prefix search and typeahead over students, parents, invoices and payments"""
+
+    permission_classes = [IsAuthenticated]
+
+    # Entity types are only searched for users allowed to manage them
+    TYPE_PERMISSIONS = {
+        SearchEntry.EntityType.STUDENT: CanManageStudents,
+        SearchEntry.EntityType.PARENT: CanManageStudents,
+        SearchEntry.EntityType.INVOICE: CanManageFinance,
+        SearchEntry.EntityType.PAYMENT: CanManageFinance,
+    }
+    MAX_LIMIT = 50
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(name='q', description='Search text; every word is prefix-matched', required=True, type=str),
+            OpenApiParameter(name='types', description='Comma separated entity types (student,parent,invoice,payment)', required=False, type=str),
+            OpenApiParameter(name='limit', description=f'Maximum suggestions (default 10, max {MAX_LIMIT})', required=False, type=int),
+        ]
+    )
+    def list(self, request):
+        query = request.query_params.get('q', '')
+
+        requested = request.query_params.get('types')
+        types = [t.strip() for t in requested.split(',') if t.strip()] if requested else list(self.TYPE_PERMISSIONS)
+        unknown = [t for t in types if t not in self.TYPE_PERMISSIONS]
+        if unknown:
+            return Response(
+                {'error': f"Unknown type(s): {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        allowed = [
+            entity_type for entity_type in types
+            if self.TYPE_PERMISSIONS[entity_type]().has_permission(request, self)
+        ]
+
+        return Response({
+            'query': query,
+            'results': SearchService.typeahead(query, allowed, limit=limit)
+        })
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class StaffConfig(AppConfig):
     name = 'apps.staff'
+
+    def ready(self):
+        from . import signals  # noqa: F401
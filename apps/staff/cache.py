@@ -0,0 +1,97 @@
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from .models import SalaryStructure
+
+
+SALARY_CACHE_MAX_ENTRIES = 10000
+
+SALARY_STRUCTURE_VERSION_KEY = 'staff:salary_structures:version'
+
+# staff pk -> (expires_at, version, structures newest first); per process, checked against the shared version
+_structure_cache = {}
+
+
+def get_salary_structure_version():
+    """Current version of the salary structures, shared by every worker"""
+    version = cache.get(SALARY_STRUCTURE_VERSION_KEY)
+    if version is None:
+        # A fresh timestamp cannot collide with entries cached under an evicted version
+        cache.add(SALARY_STRUCTURE_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(SALARY_STRUCTURE_VERSION_KEY)
+    return version
+
+
+def salary_structure_cache_timeout():
+    return getattr(settings, 'SALARY_STRUCTURE_CACHE_TIMEOUT', 300)
+
+
+def _covers(structure, as_of):
+    return structure.effective_from <= as_of and (
+        structure.effective_to is None or structure.effective_to >= as_of
+    )
+
+
+def get_salary_structures(staff_ids, as_of):
+    """
+    The SalaryStructure in effect on `as_of` for each staff member, as
+    {staff_id: structure}; staff without one are left out.
+
+    Each staff member's whole structure history is cached in this process,
+    so any date is answered from memory after one read of the shared
+    version, and the staff not yet cached cost a single query between them.
+    Histories cached under an older version are reloaded. The returned
+    instances are shared; do not modify them.
+    """
+    now = time.monotonic()
+    version = get_salary_structure_version()
+    histories, missing = {}, []
+    for staff_id in set(staff_ids):
+        entry = _structure_cache.get(staff_id)
+        if entry is not None and entry[0] > now and entry[1] == version:
+            histories[staff_id] = entry[2]
+        else:
+            missing.append(staff_id)
+
+    if missing:
+        loaded = {staff_id: [] for staff_id in missing}
+        structures = SalaryStructure.objects.filter(staff_id__in=missing).order_by('-effective_from', '-id')
+        for structure in structures:
+            loaded[structure.staff_id].append(structure)
+        if len(_structure_cache) + len(loaded) > SALARY_CACHE_MAX_ENTRIES:
+            _structure_cache.clear()
+        expires_at = now + salary_structure_cache_timeout()
+        for staff_id, history in loaded.items():
+            _structure_cache[staff_id] = (expires_at, version, history)
+        histories.update(loaded)
+
+    # Newest first, so an open-ended structure that was superseded without being closed loses
+    effective = {}
+    for staff_id, history in histories.items():
+        structure = next((structure for structure in history if _covers(structure, as_of)), None)
+        if structure is not None:
+            effective[staff_id] = structure
+    return effective
+
+
+def get_salary_structure(staff_id, as_of):
+    """get_salary_structures() for a single staff member, None if they have no structure then"""
+    return get_salary_structures([staff_id], as_of).get(staff_id)
+
+
+def forget_salary_structures(staff_id):
+    """
+    Drop a staff member's cached history now, and once the current
+    transaction commits drop it again and bump the shared version, so a
+    reload inside the transaction cannot linger and every worker reloads
+    on its next lookup. Structures change rarely, so retiring every
+    worker's cache is cheaper than tracking versions per staff member.
+    """
+    _structure_cache.pop(staff_id, None)
+
+    def retire():
+        _structure_cache.pop(staff_id, None)
+        cache.set(SALARY_STRUCTURE_VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(retire)
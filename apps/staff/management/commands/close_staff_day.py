@@ -0,0 +1,31 @@
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.staff.services import StaffAttendanceService
+
+
+class Command(BaseCommand):
+    help = 'Marks active staff with no attendance record for a day as absent, or on leave when approved'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to close as YYYY-MM-DD (default: today)')
+        parser.add_argument('--days', type=int, default=1, help='Number of days to close, ending on --date')
+        parser.add_argument('--include-weekends', action='store_true', help='Also close Saturdays and Sundays')
+
+    def handle(self, *args, **options):
+        try:
+            last_day = date.fromisoformat(options['date']) if options['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError(f"Invalid --date '{options['date']}', expected YYYY-MM-DD")
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1")
+
+        service = StaffAttendanceService()
+        for offset in range(options['days'] - 1, -1, -1):
+            day = last_day - timedelta(days=offset)
+            if day.weekday() >= 5 and not options['include_weekends']:
+                continue
+            result = service.close_day(day)
+            self.stdout.write(self.style.SUCCESS(
+                f"{day}: marked {result['absent']} absent and {result['on_leave']} on leave."
+            ))
@@ -3,6 +3,7 @@ from datetime import date, timedelta
 from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from apps.staff.cache import get_salary_structures
 from apps.staff.models import Staff, SalaryPayment, LeaveRequest
 from apps.accounts.models import User
 
@@ -24,11 +25,13 @@ class Command(BaseCommand):
             "November 2025", "December 2025", "January 2026"
         ]
 
+        structures = get_salary_structures([staff.id for staff in all_staff], date.today())
+
         with transaction.atomic():
             for staff in all_staff:
                 # 1. Seed Salary Payments (Last 6 Months)
                 # Get their current salary structure
-                structure = staff.salary_structures.first()
+                structure = structures.get(staff.id)
                 if structure:
                     base = structure.base_salary
                     allowances = structure.housing_allowance + structure.transport_allowance
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-17 01:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='staffattendance',
+            name='staff_atten_attenda_ad92ad_idx',
+        ),
+        migrations.AddIndex(
+            model_name='staffattendance',
+            index=models.Index(fields=['attendance_date', 'id'], name='staff_atten_attenda_f6e81c_idx'),
+        ),
+    ]
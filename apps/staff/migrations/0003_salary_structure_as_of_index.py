@@ -0,0 +1,21 @@
+# Generated by Django 6.0.1 on 2026-10-17 02:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0002_remove_staffattendance_staff_atten_attenda_ad92ad_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salarystructure',
+            index=models.Index(fields=['staff', 'effective_from', 'effective_to'], name='salary_struct_as_of_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='salarystructure',
+            name='salary_stru_staff_i_dfa32b_idx',
+        ),
+    ]
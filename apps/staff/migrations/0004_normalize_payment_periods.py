@@ -0,0 +1,49 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+from datetime import datetime
+
+from django.db import migrations
+
+
+# Frozen copy of apps.staff.services.PAYMENT_PERIOD_FORMATS as of this migration
+PAYMENT_PERIOD_FORMATS = ('%B %Y', '%b %Y', '%B, %Y', '%b, %Y', '%Y-%m', '%m/%Y', '%m-%Y')
+
+
+def parse_payment_period(payment_period):
+    """The "January 2025" form of a stored period, or None when it cannot be read"""
+    text = ' '.join(str(payment_period or '').split())
+    for period_format in PAYMENT_PERIOD_FORMATS:
+        try:
+            return datetime.strptime(text, period_format).strftime('%B %Y')
+        except ValueError:
+            continue
+    return None
+
+
+def normalize_payment_periods(apps, schema_editor):
+    """
+    Rewrite payment periods stored as "Jan 2025", "2025-01" and the like to
+    "January 2025", as parse_payment_period() in the staff services now does
+    on the way in. A row whose staff member already has the normalised period
+    is left alone, and unreadable periods are kept as they are.
+    """
+    SalaryPayment = apps.get_model('staff', 'SalaryPayment')
+    taken = set(SalaryPayment.objects.values_list('staff_id', 'payment_period'))
+    payments = SalaryPayment.objects.only('staff_id', 'payment_period').order_by('pk')
+    for payment in payments.iterator(chunk_size=2000):
+        payment_period = parse_payment_period(payment.payment_period)
+        if payment_period in (None, payment.payment_period) or (payment.staff_id, payment_period) in taken:
+            continue
+        taken.add((payment.staff_id, payment_period))
+        SalaryPayment.objects.filter(pk=payment.pk).update(payment_period=payment_period)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('staff', '0003_salary_structure_as_of_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_payment_periods, migrations.RunPython.noop),
+    ]
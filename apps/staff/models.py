@@ -1,8 +1,32 @@
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
 from apps.accounts.models import User
 
 
+class StaffQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Prefetch plan for StaffSerializer: the user with its creator and
+        teacher profile, subject assignments with their class, subject and
+        year, and the classes the teacher profile is class teacher of.
+        """
+        from apps.academic.models import Class, SubjectAssignment
+
+        return self.select_related(
+            'user__created_by', 'user__teacher_profile'
+        ).prefetch_related(
+            models.Prefetch(
+                'subject_assignments',
+                queryset=SubjectAssignment.objects.select_related('class_obj__academic_year', 'subject')
+            ),
+            models.Prefetch(
+                'user__teacher_profile__assigned_classes',
+                queryset=Class.objects.select_related('academic_year')
+            )
+        )
+
+
 class Staff(models.Model):
     """
     Staff profile for all staff members (teachers, headmaster, bursar, etc.)
@@ -59,6 +83,8 @@ class Staff(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = StaffQuerySet.as_manager()
+    
     class Meta:
         db_table = 'staff'
         verbose_name_plural = 'staff'
@@ -76,6 +102,26 @@ class Staff(models.Model):
         return f"{self.first_name} {self.last_name}"
 
 
+class SalaryStructureQuerySet(models.QuerySet):
+    def in_effect(self, as_of):
+        """Structures whose effective_from..effective_to range covers `as_of`"""
+        return self.filter(
+            models.Q(effective_to__isnull=True) | models.Q(effective_to__gte=as_of),
+            effective_from__lte=as_of
+        )
+
+    def effective_on(self, as_of):
+        """
+        The one structure per staff member in effect on `as_of`. Where an
+        open-ended structure has been superseded without being closed, the
+        latest effective_from wins.
+        """
+        latest = SalaryStructure.objects.in_effect(as_of).filter(
+            staff=models.OuterRef('staff')
+        ).order_by('-effective_from', '-id').values('id')[:1]
+        return self.in_effect(as_of).filter(id=models.Subquery(latest))
+
+
 class SalaryStructure(models.Model):
     """Salary structure for staff members"""
 
@@ -89,16 +135,42 @@ class SalaryStructure(models.Model):
     effective_from = models.DateField()
     effective_to = models.DateField(null=True, blank=True)
     
+    objects = SalaryStructureQuerySet.as_manager()
+    
     class Meta:
         db_table = 'salary_structures'
         ordering = ['-effective_from']
         indexes = [
-            models.Index(fields=['staff', 'effective_from']),
+            # Covers "structure for staff X at date D" lookups
+            models.Index(fields=['staff', 'effective_from', 'effective_to'], name='salary_struct_as_of_idx'),
         ]
     
     def __str__(self):
         return f"{self.staff.full_name} - {self.base_salary} (from {self.effective_from})"
     
+    def clean(self):
+        if self.effective_to and self.effective_to < self.effective_from:
+            raise ValidationError("Effective to date cannot be before effective from date.")
+        
+        # An open-ended structure that started earlier is superseded, not overlapped
+        overlapping = SalaryStructure.objects.filter(
+            models.Q(effective_to__isnull=True) | models.Q(effective_to__gte=self.effective_from),
+            staff_id=self.staff_id
+        ).exclude(
+            effective_to__isnull=True, effective_from__lt=self.effective_from
+        )
+        if self.effective_to:
+            overlapping = overlapping.filter(effective_from__lte=self.effective_to)
+        if self.pk:
+            overlapping = overlapping.exclude(pk=self.pk)
+        
+        clash = overlapping.order_by('effective_from').first()
+        if clash:
+            raise ValidationError(
+                f"Overlaps the salary structure effective from {clash.effective_from}"
+                f"{f' to {clash.effective_to}' if clash.effective_to else ''}."
+            )
+    
     @property
     def total_salary(self):
         return (
@@ -172,7 +244,8 @@ class StaffAttendance(models.Model):
         ordering = ['-attendance_date']
         indexes = [
             models.Index(fields=['staff', 'attendance_date']),
-            models.Index(fields=['attendance_date']),
+            # Keyset pagination walks (attendance_date, id)
+            models.Index(fields=['attendance_date', 'id']),
         ]
     
     def __str__(self):
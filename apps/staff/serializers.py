@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import Staff, SalaryStructure, SalaryPayment, StaffAttendance, LeaveRequest
 from apps.accounts.serializers import UserSerializer
@@ -24,31 +25,45 @@ class StaffSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     def get_assigned_subjects(self, obj):
-            """Returns subjects the staff is assigned to teach across different classes"""
-            assignments = obj.subject_assignments.select_related('class_obj', 'subject', 'class_obj__academic_year')
-            return [
-                {
-                    "id": a.id,
-                    "subject_name": a.subject.subject_name,
-                    "subject_code": a.subject.subject_code,
-                    "class_name": a.class_obj.class_name,
-                    "academic_year": a.class_obj.academic_year.year_name
-                } for a in assignments
-            ]
+        """Returns subjects the staff is assigned to teach across different classes"""
+        # Served from the subject_assignments prefetch in Staff.objects.with_details()
+        return [
+            {
+                "id": a.id,
+                "subject_name": a.subject.subject_name,
+                "subject_code": a.subject.subject_code,
+                "class_name": a.class_obj.class_name,
+                "academic_year": a.class_obj.academic_year.year_name
+            } for a in obj.subject_assignments.all()
+        ]
 
     def get_managed_classes(self, obj):
         """Returns classes where this staff is the main Class Teacher"""
         from apps.academic.serializers import AssignedClassSerializer
-        try:
-            
-            if hasattr(obj.user, 'teacher_profile'): # Adjust based on your Teacher model's related_name
-                classes = obj.user.teacher_profile.assigned_classes.all()
-                return AssignedClassSerializer(classes, many=True).data
-        except Exception:
-            return []
+        # Served from the teacher profile prefetch in Staff.objects.with_details()
+        if hasattr(obj.user, 'teacher_profile'):
+            classes = obj.user.teacher_profile.assigned_classes.all()
+            return AssignedClassSerializer(classes, many=True).data
         return []
 
 
+class StaffSummarySerializer(serializers.Serializer):
+    """
+    Lightweight staff payload for nesting inside timetable, attendance and
+    leave responses. Reads only name fields, so it also serializes Teacher
+    profiles and costs no queries beyond the parent's select_related.
+    """
+    
+    id = serializers.IntegerField(read_only=True)
+    first_name = serializers.CharField(read_only=True)
+    last_name = serializers.CharField(read_only=True)
+    full_name = serializers.SerializerMethodField()
+    specialization = serializers.CharField(read_only=True)
+    
+    def get_full_name(self, obj) -> str:
+        return f"{obj.first_name} {obj.last_name}"
+
+
 class StaffCreateSerializer(serializers.Serializer):
     """Serializer for creating staff with user account"""
     
@@ -105,6 +120,18 @@ class SalaryStructureSerializer(serializers.ModelSerializer):
             'total_salary', 'effective_from', 'effective_to'
         ]
         read_only_fields = ['id']
+    
+    def validate(self, data):
+        # Reject ranges that overlap another structure of the same staff member
+        structure = SalaryStructure(pk=self.instance.pk if self.instance else None)
+        for field in ('staff', 'effective_from', 'effective_to'):
+            value = data[field] if field in data else getattr(self.instance, field, None)
+            setattr(structure, field, value)
+        try:
+            structure.clean()
+        except DjangoValidationError as e:
+            raise serializers.ValidationError(e.messages)
+        return data
 
 
 class SalaryPaymentSerializer(serializers.ModelSerializer):
@@ -127,25 +154,63 @@ class SalaryPaymentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class PayrollRunSerializer(serializers.Serializer):
+    """Serializer for running the payroll of a whole period"""
+    
+    payment_period = serializers.CharField(max_length=20)
+    staff_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+
+class PayrollSettlementSerializer(serializers.Serializer):
+    """Serializer for marking a period's pending salary payments as paid"""
+    
+    payment_period = serializers.CharField(max_length=20)
+    payment_date = serializers.DateField()
+    payment_method = serializers.ChoiceField(choices=SalaryPayment.PaymentMethod.choices)
+    staff_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+
 class StaffAttendanceSerializer(serializers.ModelSerializer):
     """Serializer for StaffAttendance model"""
     
     staff_name = serializers.CharField(source='staff.full_name', read_only=True)
+    staff_details = StaffSummarySerializer(source='staff', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     
     class Meta:
         model = StaffAttendance
         fields = [
-            'id', 'staff', 'staff_name', 'attendance_date',
+            'id', 'staff', 'staff_name', 'staff_details', 'attendance_date',
             'check_in', 'check_out', 'status', 'status_display', 'remarks'
         ]
         read_only_fields = ['id']
 
 
+class StaffClockRecordSerializer(serializers.Serializer):
+    """One staff member's clock event in a bulk check-in/check-out"""
+    
+    staff_id = serializers.IntegerField()
+    time = serializers.DateTimeField(required=False)
+    status = serializers.ChoiceField(
+        choices=[StaffAttendance.AttendanceStatus.PRESENT, StaffAttendance.AttendanceStatus.HALF_DAY],
+        required=False
+    )
+    remarks = serializers.CharField(required=False, allow_blank=True)
+
+
+class BulkStaffClockSerializer(serializers.Serializer):
+    """Serializer for clocking many staff in or out at once"""
+    
+    action = serializers.ChoiceField(choices=['check_in', 'check_out'])
+    attendance_date = serializers.DateField(required=False)
+    records = StaffClockRecordSerializer(many=True, allow_empty=False)
+
+
 class LeaveRequestSerializer(serializers.ModelSerializer):
     """Serializer for LeaveRequest model"""
     
     staff_name = serializers.CharField(source='staff.full_name', read_only=True)
+    staff_details = StaffSummarySerializer(source='staff', read_only=True)
     leave_type_display = serializers.CharField(source='get_leave_type_display', read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     approved_by_username = serializers.CharField(source='approved_by.username', read_only=True, allow_null=True)
@@ -153,7 +218,7 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = LeaveRequest
         fields = [
-            'id', 'staff', 'staff_name', 'leave_type', 'leave_type_display',
+            'id', 'staff', 'staff_name', 'staff_details', 'leave_type', 'leave_type_display',
             'start_date', 'end_date', 'total_days', 'reason',
             'status', 'status_display', 'approved_by', 'approved_by_username',
             'created_at'
@@ -1,9 +1,42 @@
-from django.db import transaction
+import calendar
+from django.db import connection, transaction, IntegrityError
+from django.db.models import Count, Exists, F, OuterRef, Q
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from apps.accounts.models import User
 from apps.accounts.services import UserService
-from .models import Staff, SalaryStructure, SalaryPayment
-from datetime import datetime
+from .cache import get_salary_structure, get_salary_structures
+from .models import Staff, SalaryStructure, SalaryPayment, StaffAttendance, LeaveRequest
+from datetime import datetime, date
+from decimal import Decimal, ROUND_HALF_UP
+
+
+# Spellings accepted for a payment period; before periods were normalised any of these could be stored
+PAYMENT_PERIOD_FORMATS = ('%B %Y', '%b %Y', '%B, %Y', '%b, %Y', '%Y-%m', '%m/%Y', '%m-%Y')
+
+
+def parse_payment_period(payment_period):
+    """Normalise a period like "jan 2025" or "2025-01" to "January 2025" and return it with its last day"""
+    text = ' '.join(str(payment_period or '').split())
+    for period_format in PAYMENT_PERIOD_FORMATS:
+        try:
+            month_start = datetime.strptime(text, period_format).date()
+        except ValueError:
+            continue
+        last_day = calendar.monthrange(month_start.year, month_start.month)[1]
+        return month_start.strftime('%B %Y'), date(month_start.year, month_start.month, last_day)
+    raise ValidationError(f"Invalid payment period '{payment_period}', expected e.g. 'January 2025'")
+
+
+def payment_period_spellings(payment_period):
+    """
+    Every stored spelling of a normalised period, so duplicate checks also
+    find payments recorded as "Jan 2025" or "2025-01"
+    """
+    month_start = datetime.strptime(payment_period, '%B %Y').date()
+    spellings = {month_start.strftime(period_format) for period_format in PAYMENT_PERIOD_FORMATS}
+    spellings |= {f"{month_start.month}/{month_start.year}", f"{month_start.month}-{month_start.year}"}
+    return sorted(spellings | {spelling.upper() for spelling in spellings} | {spelling.lower() for spelling in spellings})
 
 
 class StaffService:
@@ -156,15 +189,26 @@ class StaffService:
     @staticmethod
     def get_active_teachers():
         """Get all active teachers"""
-        return Staff.objects.filter(
+        return Staff.objects.with_details().filter(
             staff_type='teacher',
             user__is_active=True
-        ).select_related('user')
+        )
 
 
 class SalaryService:
     """Service layer for salary operations"""
     
+    # Simplified flat tax on gross salary
+    TAX_RATE = Decimal('0.10')
+    CENT = Decimal('0.01')
+    
+    @classmethod
+    def calculate_salary(cls, base_salary, allowances):
+        """Gross, tax and net for one payslip, rounded to the cent"""
+        gross_salary = base_salary + allowances
+        tax = (gross_salary * cls.TAX_RATE).quantize(cls.CENT, rounding=ROUND_HALF_UP)
+        return gross_salary, tax, gross_salary - tax
+    
     @transaction.atomic
     def process_monthly_salary(self, staff_id, payment_period, processed_by):
         """
@@ -175,23 +219,24 @@ class SalaryService:
             payment_period: String like "January 2025"
             processed_by: User who is processing the payment
         """
+        payment_period, as_of = parse_payment_period(payment_period)
+        
         try:
             staff = Staff.objects.get(id=staff_id)
         except Staff.DoesNotExist:
             raise ValidationError("Staff not found")
         
-        # Check if salary already processed for this period
-        if SalaryPayment.objects.filter(staff=staff, payment_period=payment_period).exists():
+        # Check if salary already processed for this period, under any spelling
+        if SalaryPayment.objects.filter(
+            staff=staff, payment_period__in=payment_period_spellings(payment_period)
+        ).exists():
             raise ValidationError(f"Salary already processed for {payment_period}")
         
-        # Get current salary structure
-        salary_structure = SalaryStructure.objects.filter(
-            staff=staff,
-            effective_from__lte=datetime.now().date()
-        ).order_by('-effective_from').first()
+        # Salary structure in effect at the end of the period
+        salary_structure = get_salary_structure(staff.id, as_of)
         
         if not salary_structure:
-            raise ValidationError("No salary structure found for this staff")
+            raise ValidationError(f"No salary structure in effect for {payment_period}")
         
         # Calculate salary components
         base_salary = salary_structure.base_salary
@@ -201,12 +246,7 @@ class SalaryService:
             salary_structure.other_allowances
         )
         
-        # Calculate tax (simplified - 10% of gross)
-        gross_salary = base_salary + allowances
-        tax = gross_salary * 0.10
-        
-        # Calculate net salary
-        net_salary = gross_salary - tax
+        gross_salary, tax, net_salary = self.calculate_salary(base_salary, allowances)
         
         # Create salary payment record
         salary_payment = SalaryPayment.objects.create(
@@ -239,4 +279,254 @@ class SalaryService:
         salary_payment.payment_method = payment_method
         salary_payment.save()
         
-        return salary_payment
\ No newline at end of file
+        return salary_payment
+    
+    @transaction.atomic
+    def run_payroll(self, payment_period, processed_by, staff_ids=None):
+        """
+        Create pending salary payments for every active staff member in one pass.
+        
+        Staff already paid for the period are skipped with an anti-join, and
+        the salary structures in effect on the last day of the period come
+        from the structure cache in at most one query, so the run costs the
+        same handful of queries however many staff there are.
+        
+        Args:
+            payment_period: String like "January 2025"
+            processed_by: User who is running the payroll
+            staff_ids: optional list of Staff IDs to limit the run to
+        
+        Returns:
+            dict with created payments, the number of staff already processed
+            and the staff skipped for having no salary structure
+        """
+        payment_period, as_of = parse_payment_period(payment_period)
+        spellings = payment_period_spellings(payment_period)
+        
+        staff = Staff.objects.filter(user__is_active=True)
+        if staff_ids is not None:
+            staff = staff.filter(id__in=staff_ids)
+        
+        unpaid = list(staff.exclude(
+            Exists(SalaryPayment.objects.filter(staff=OuterRef('pk'), payment_period__in=spellings))
+        ).values_list('id', 'first_name', 'last_name'))
+        structures = get_salary_structures([staff_id for staff_id, _, _ in unpaid], as_of)
+        
+        payments, missing_structure = [], []
+        for staff_id, first_name, last_name in unpaid:
+            structure = structures.get(staff_id)
+            if structure is None:
+                missing_structure.append({'staff_id': staff_id, 'staff_name': f"{first_name} {last_name}"})
+                continue
+            allowances = (
+                structure.housing_allowance +
+                structure.transport_allowance +
+                structure.other_allowances
+            )
+            gross_salary, tax, net_salary = self.calculate_salary(structure.base_salary, allowances)
+            payments.append(SalaryPayment(
+                staff_id=staff_id,
+                payment_period=payment_period,
+                base_salary=structure.base_salary,
+                allowances=allowances,
+                deductions=0,
+                tax=tax,
+                net_salary=net_salary,
+                status=SalaryPayment.PaymentStatus.PENDING,
+                processed_by=processed_by
+            ))
+        
+        try:
+            with transaction.atomic():
+                SalaryPayment.objects.bulk_create(payments, batch_size=500)
+        except IntegrityError:
+            raise ValidationError(f"Payroll for {payment_period} is already being processed")
+        
+        return {
+            'payment_period': payment_period,
+            'payments': payments,
+            'already_processed': SalaryPayment.objects.filter(
+                staff__in=staff, payment_period__in=spellings
+            ).count() - len(payments),
+            'missing_structure': missing_structure
+        }
+    
+    @transaction.atomic
+    def mark_payroll_as_paid(self, payment_period, payment_date, payment_method, staff_ids=None):
+        """
+        Settle every pending salary payment of a period in a single UPDATE.
+        
+        Returns:
+            Number of payments marked as paid
+        """
+        payment_period, _ = parse_payment_period(payment_period)
+        if payment_method not in SalaryPayment.PaymentMethod.values:
+            raise ValidationError(f"Invalid payment method '{payment_method}'")
+        
+        pending = SalaryPayment.objects.filter(
+            payment_period__in=payment_period_spellings(payment_period),
+            status=SalaryPayment.PaymentStatus.PENDING
+        )
+        if staff_ids is not None:
+            pending = pending.filter(staff_id__in=staff_ids)
+        
+        return pending.update(
+            status=SalaryPayment.PaymentStatus.PAID,
+            payment_date=payment_date,
+            payment_method=payment_method
+        )
+
+
+class StaffAttendanceService:
+    """Service layer for staff attendance operations"""
+    
+    CHECK_IN = 'check_in'
+    CHECK_OUT = 'check_out'
+    
+    # Columns each clock action may overwrite on an existing row
+    CLOCK_UPDATE_FIELDS = {
+        CHECK_IN: ['check_in', 'status', 'remarks'],
+        CHECK_OUT: ['check_out'],
+    }
+    
+    @transaction.atomic
+    def record_clock_events(self, clock_action, records, attendance_date=None):
+        """
+        Clock a batch of staff in or out, upserting StaffAttendance by
+        (staff, attendance_date) in one statement.
+        
+        A check-in marks the staff member present (or half day) and sets
+        check_in; a check-out only sets check_out, creating a present row
+        if the staff member never clocked in.
+        
+        Args:
+            clock_action: 'check_in' or 'check_out'
+            records: list of dicts with staff_id and optional time, status and remarks
+            attendance_date: day being recorded, today if not given
+        
+        Returns:
+            dict with created/updated counts and per-row errors
+        """
+        if clock_action not in self.CLOCK_UPDATE_FIELDS:
+            raise ValidationError(f"Invalid clock action '{clock_action}'")
+        attendance_date = attendance_date or timezone.localdate()
+        now = timezone.now()
+        
+        staff_ids = {record['staff_id'] for record in records}
+        active = set(
+            Staff.objects.filter(id__in=staff_ids, user__is_active=True).values_list('id', flat=True)
+        )
+        
+        rows = {}
+        errors = []
+        for index, record in enumerate(records):
+            staff_id = record['staff_id']
+            if staff_id not in active:
+                errors.append({'row': index, 'staff_id': staff_id, 'error': "Staff not found or inactive"})
+                continue
+            event_time = record.get('time') or now
+            # A staff member listed twice keeps the last event
+            rows[staff_id] = StaffAttendance(
+                staff_id=staff_id,
+                attendance_date=attendance_date,
+                check_in=event_time if clock_action == self.CHECK_IN else None,
+                check_out=event_time if clock_action == self.CHECK_OUT else None,
+                status=record.get('status') or StaffAttendance.AttendanceStatus.PRESENT,
+                remarks=record.get('remarks', '')
+            )
+        
+        existing = set(
+            StaffAttendance.objects.filter(
+                attendance_date=attendance_date,
+                staff_id__in=rows.keys()
+            ).values_list('staff_id', flat=True)
+        ) if rows else set()
+        
+        if rows:
+            StaffAttendance.objects.bulk_create(
+                rows.values(),
+                batch_size=500,
+                update_conflicts=True,
+                # MySQL's ON DUPLICATE KEY UPDATE cannot name the conflict target
+                unique_fields=(
+                    ['staff', 'attendance_date']
+                    if connection.features.supports_update_conflicts_with_target else None
+                ),
+                update_fields=self.CLOCK_UPDATE_FIELDS[clock_action]
+            )
+        
+        return {
+            'attendance_date': attendance_date,
+            'created_count': len(rows) - len(existing),
+            'updated_count': len(existing),
+            'errors': errors
+        }
+    
+    @transaction.atomic
+    def close_day(self, attendance_date):
+        """
+        Materialize the missing attendance rows of a day: active staff
+        employed by then with no record are marked on leave when an approved
+        leave request covers the day, absent otherwise. Existing rows are
+        left alone, so a day can be closed again safely.
+        
+        Returns:
+            dict with the number of absent and on-leave rows created
+        """
+        on_approved_leave = LeaveRequest.objects.filter(
+            staff=OuterRef('pk'),
+            status=LeaveRequest.LeaveStatus.APPROVED,
+            start_date__lte=attendance_date,
+            end_date__gte=attendance_date
+        )
+        missing = Staff.objects.filter(
+            Q(employment_date__isnull=True) | Q(employment_date__lte=attendance_date),
+            user__is_active=True
+        ).exclude(
+            Exists(StaffAttendance.objects.filter(staff=OuterRef('pk'), attendance_date=attendance_date))
+        ).annotate(
+            on_leave=Exists(on_approved_leave)
+        ).values_list('id', 'on_leave')
+        
+        rows = [
+            StaffAttendance(
+                staff_id=staff_id,
+                attendance_date=attendance_date,
+                status=(
+                    StaffAttendance.AttendanceStatus.ON_LEAVE if on_leave
+                    else StaffAttendance.AttendanceStatus.ABSENT
+                ),
+                remarks='Recorded at day close'
+            )
+            for staff_id, on_leave in missing
+        ]
+        # A clock-in racing the close wins
+        StaffAttendance.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+        
+        on_leave_count = sum(1 for row in rows if row.status == StaffAttendance.AttendanceStatus.ON_LEAVE)
+        return {
+            'absent': len(rows) - on_leave_count,
+            'on_leave': on_leave_count
+        }
+    
+    @staticmethod
+    def monthly_summary(year, month, staff_ids=None):
+        """Per-staff status counts for a month, from one grouped query"""
+        records = StaffAttendance.objects.filter(
+            attendance_date__range=[date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])]
+        )
+        if staff_ids is not None:
+            records = records.filter(staff_id__in=staff_ids)
+        
+        Status = StaffAttendance.AttendanceStatus
+        return list(
+            records.values(
+                'staff_id', first_name=F('staff__first_name'), last_name=F('staff__last_name')
+            ).annotate(
+                total_days=Count('id'),
+                present_days=Count('id', filter=Q(status=Status.PRESENT)),
+                half_days=Count('id', filter=Q(status=Status.HALF_DAY)),
+                absent_days=Count('id', filter=Q(status=Status.ABSENT)),
+                leave_days=Count('id', filter=Q(status=Status.ON_LEAVE))
+            ).order_by('staff__last_name', 'staff__first_name', 'staff_id')
+        )
\ No newline at end of file
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .cache import forget_salary_structures
+from .models import SalaryStructure
+
+
+@receiver(post_save, sender=SalaryStructure)
+@receiver(post_delete, sender=SalaryStructure)
+def forget_changed_salary_structures(sender, instance, raw=False, **kwargs):
+    """Salary changes are seen by every worker's next payroll run"""
+    if not raw:
+        forget_salary_structures(instance.staff_id)
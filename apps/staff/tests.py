@@ -1,3 +1,458 @@
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Subject, SubjectAssignment
+from apps.teachers.models import Teacher
+from .cache import (
+    SALARY_STRUCTURE_VERSION_KEY, _structure_cache, get_salary_structure_version, get_salary_structures
+)
+from .models import Staff, SalaryStructure, SalaryPayment, StaffAttendance, LeaveRequest
+from .services import SalaryService, StaffAttendanceService, parse_payment_period
 
-# Create your tests here.
+
+class StaffTestData:
+    """An admin and a helper creating staff with an optional salary structure"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='payroll', password='payroll-pass-123', role=User.Role.ADMIN)
+
+    def setUp(self):
+        _structure_cache.clear()
+
+    @staticmethod
+    def add_staff(last_name, base_salary=None, effective_from=date(2024, 1, 1), effective_to=None):
+        user = User.objects.create_user(
+            username=last_name.lower(), password='staff-pass-123', role=User.Role.TEACHER
+        )
+        staff = Staff.objects.create(
+            user=user, first_name='Akua', last_name=last_name, staff_type=Staff.StaffType.TEACHER
+        )
+        if base_salary is not None:
+            SalaryStructure.objects.create(
+                staff=staff,
+                base_salary=Decimal(base_salary),
+                housing_allowance=Decimal('150.00'),
+                transport_allowance=Decimal('50.00'),
+                effective_from=effective_from,
+                effective_to=effective_to
+            )
+        return staff
+
+    def add_payment(self, staff, payment_period, status=SalaryPayment.PaymentStatus.PENDING):
+        return SalaryPayment.objects.create(
+            staff=staff,
+            payment_period=payment_period,
+            base_salary=Decimal('1000.00'),
+            allowances=Decimal('200.00'),
+            tax=Decimal('120.00'),
+            net_salary=Decimal('1080.00'),
+            status=status,
+            processed_by=self.user
+        )
+
+
+class StaffDetailsQueryTest(StaffTestData, TestCase):
+    """Staff list and retrieve read everything StaffSerializer needs from the with_details() plan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_teachers(self, count):
+        """Staff who are class teacher of one class and teach a subject in it"""
+        staff_members = []
+        for _ in range(count):
+            number = Staff.objects.count()
+            staff = self.add_staff(f'Teacher{number}')
+            teacher = Teacher.objects.create(user=staff.user, first_name='Akua', last_name=staff.last_name)
+            school_class = Class.objects.create(
+                class_name=f'Grade 3{number}', grade_level=3, academic_year=self.year, class_teacher=teacher
+            )
+            subject = Subject.objects.create(subject_name='Science', subject_code=f'SCI{number}', grade_level=3)
+            SubjectAssignment.objects.create(class_obj=school_class, subject=subject, teacher=staff)
+            staff_members.append(staff)
+        return staff_members
+
+    def list_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/staff/')
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_list_uses_fixed_query_count(self):
+        self.add_teachers(1)
+        small, response = self.list_queries()
+
+        self.add_teachers(5)
+        # Page count, staff with user, creator and teacher profile, then the
+        # subject assignment and assigned class prefetches
+        with self.assertNumQueries(4):
+            large, response = self.list_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertTrue(all(
+            len(staff['assigned_subjects']) == 1 and len(staff['managed_classes']) == 1
+            for staff in response.data['results']
+        ))
+
+    def test_retrieve_uses_fixed_query_count(self):
+        staff = self.add_teachers(2)[0]
+
+        # Staff with user, creator and teacher profile, then the two prefetches
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/staff/{staff.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assigned_subjects'][0]['class_name'], 'Grade 30')
+        self.assertEqual(response.data['managed_classes'][0]['class_name'], 'Grade 30')
+
+
+class PayrollTest(StaffTestData, TestCase):
+    """Payroll runs pay each staff member once per month, however the month was spelled"""
+
+    def setUp(self):
+        super().setUp()
+        self.service = SalaryService()
+        self.mensah = self.add_staff('Mensah', '1000.00')
+        self.owusu = self.add_staff('Owusu', '2000.00')
+
+    def test_parse_payment_period_accepts_legacy_spellings(self):
+        for spelling in ['January 2025', 'january  2025 ', 'Jan 2025', 'JAN, 2025', '2025-01', '01/2025', '1-2025']:
+            with self.subTest(spelling=spelling):
+                self.assertEqual(parse_payment_period(spelling), ('January 2025', date(2025, 1, 31)))
+        for spelling in ['', None, 'Janvier 2025', '2025/13', 'January']:
+            with self.subTest(spelling=spelling):
+                with self.assertRaises(ValidationError):
+                    parse_payment_period(spelling)
+
+    def test_run_payroll_creates_pending_payments(self):
+        unstructured = self.add_staff('Asante')
+
+        result = self.service.run_payroll('february 2025', self.user)
+
+        self.assertEqual(result['payment_period'], 'February 2025')
+        self.assertEqual(result['already_processed'], 0)
+        self.assertEqual(result['missing_structure'], [{'staff_id': unstructured.pk, 'staff_name': 'Akua Asante'}])
+        payments = {payment.staff_id: payment for payment in SalaryPayment.objects.all()}
+        self.assertEqual(set(payments), {self.mensah.pk, self.owusu.pk})
+        self.assertEqual(payments[self.mensah.pk].net_salary, Decimal('1080.00'))
+        self.assertEqual(payments[self.owusu.pk].tax, Decimal('220.00'))
+        self.assertEqual(payments[self.owusu.pk].status, SalaryPayment.PaymentStatus.PENDING)
+
+    def test_run_payroll_skips_a_month_already_processed(self):
+        self.service.run_payroll('March 2025', self.user)
+
+        for spelling in ['March 2025', 'Mar 2025', '2025-03']:
+            with self.subTest(spelling=spelling):
+                result = self.service.run_payroll(spelling, self.user)
+                self.assertEqual(result['payments'], [])
+                self.assertEqual(result['already_processed'], 2)
+        self.assertEqual(SalaryPayment.objects.count(), 2)
+
+    def test_month_stored_in_a_legacy_spelling_is_not_paid_twice(self):
+        self.add_payment(self.mensah, 'Jan 2025')
+
+        result = self.service.run_payroll('January 2025', self.user)
+
+        self.assertEqual([payment.staff_id for payment in result['payments']], [self.owusu.pk])
+        self.assertEqual(result['already_processed'], 1)
+        with self.assertRaisesMessage(ValidationError, 'Salary already processed for January 2025'):
+            self.service.process_monthly_salary(self.mensah.pk, '2025-01', self.user)
+        self.assertEqual(SalaryPayment.objects.filter(staff=self.mensah).count(), 1)
+
+    def test_mark_payroll_as_paid(self):
+        legacy = self.add_payment(self.mensah, 'jan 2025')
+        self.service.run_payroll('January 2025', self.user)
+        other_month = self.add_payment(self.owusu, 'February 2025')
+
+        paid = self.service.mark_payroll_as_paid('2025-01', date(2025, 1, 31), SalaryPayment.PaymentMethod.CASH)
+
+        self.assertEqual(paid, 2)
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.status, SalaryPayment.PaymentStatus.PAID)
+        self.assertEqual(legacy.payment_date, date(2025, 1, 31))
+        self.assertEqual(legacy.payment_method, SalaryPayment.PaymentMethod.CASH)
+        self.assertFalse(
+            SalaryPayment.objects.filter(staff=self.owusu, payment_period='January 2025', payment_date=None).exists()
+        )
+        other_month.refresh_from_db()
+        self.assertEqual(other_month.status, SalaryPayment.PaymentStatus.PENDING)
+
+        self.assertEqual(
+            self.service.mark_payroll_as_paid('January 2025', date(2025, 2, 1), SalaryPayment.PaymentMethod.CASH), 0
+        )
+        with self.assertRaises(ValidationError):
+            self.service.mark_payroll_as_paid('February 2025', date(2025, 2, 28), 'barter')
+
+    def test_migration_normalizes_stored_periods(self):
+        legacy = self.add_payment(self.mensah, 'Jan 2025')
+        normalized = self.add_payment(self.owusu, 'January 2025')
+        duplicate = self.add_payment(self.owusu, '2025-01')
+        unreadable = self.add_payment(self.mensah, 'Term 1 bonus')
+
+        migration = import_module('apps.staff.migrations.0004_normalize_payment_periods')
+        migration.normalize_payment_periods(django_apps, None)
+
+        periods = dict(SalaryPayment.objects.values_list('pk', 'payment_period'))
+        self.assertEqual(periods, {
+            legacy.pk: 'January 2025',
+            normalized.pk: 'January 2025',
+            duplicate.pk: '2025-01',
+            unreadable.pk: 'Term 1 bonus',
+        })
+
+
+class SalaryStructureTest(StaffTestData, TestCase):
+    """Which structure is in effect on a date, overlap checks and the cross-worker structure cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.staff = self.add_staff('Boateng', '1000.00', effective_to=date(2024, 6, 30))
+        self.first = self.staff.salary_structures.get()
+        self.second = SalaryStructure.objects.create(
+            staff=self.staff, base_salary=Decimal('1200.00'), effective_from=date(2024, 7, 1)
+        )
+
+    def structure_on(self, as_of):
+        structure = get_salary_structures([self.staff.pk], as_of).get(self.staff.pk)
+        return structure and structure.pk
+
+    def test_effective_on_boundaries(self):
+        cases = [
+            (date(2023, 12, 31), []),
+            (date(2024, 1, 1), [self.first.pk]),
+            (date(2024, 6, 30), [self.first.pk]),
+            (date(2024, 7, 1), [self.second.pk]),
+            (date(2030, 1, 1), [self.second.pk]),
+        ]
+        for as_of, expected in cases:
+            with self.subTest(as_of=as_of):
+                self.assertEqual(list(SalaryStructure.objects.in_effect(as_of).values_list('pk', flat=True)), expected)
+                self.assertEqual(
+                    list(SalaryStructure.objects.effective_on(as_of).values_list('pk', flat=True)), expected
+                )
+                self.assertEqual(self.structure_on(as_of), expected[0] if expected else None)
+
+    def test_latest_open_ended_structure_supersedes(self):
+        promotion = SalaryStructure.objects.create(
+            staff=self.staff, base_salary=Decimal('1500.00'), effective_from=date(2025, 1, 1)
+        )
+
+        self.assertEqual(
+            set(SalaryStructure.objects.in_effect(date(2025, 1, 1)).values_list('pk', flat=True)),
+            {self.second.pk, promotion.pk}
+        )
+        self.assertEqual(
+            list(SalaryStructure.objects.effective_on(date(2025, 1, 1)).values_list('pk', flat=True)), [promotion.pk]
+        )
+        self.assertEqual(self.structure_on(date(2025, 1, 1)), promotion.pk)
+        self.assertEqual(self.structure_on(date(2024, 12, 31)), self.second.pk)
+
+    def test_clean_rejects_overlaps(self):
+        def candidate(effective_from, effective_to=None):
+            return SalaryStructure(
+                staff=self.staff, base_salary=Decimal('1300.00'),
+                effective_from=effective_from, effective_to=effective_to
+            )
+
+        for structure in [
+            candidate(date(2024, 6, 1), date(2024, 6, 15)),
+            candidate(date(2024, 6, 30), date(2024, 6, 30)),
+            candidate(date(2023, 12, 1), date(2024, 1, 1)),
+            candidate(date(2024, 7, 1)),
+            candidate(date(2024, 5, 1), date(2024, 4, 1)),
+        ]:
+            with self.subTest(effective_from=structure.effective_from, effective_to=structure.effective_to):
+                with self.assertRaises(ValidationError):
+                    structure.clean()
+
+        # Touching ranges, superseding the open-ended structure and editing in place are allowed
+        candidate(date(2023, 1, 1), date(2023, 12, 31)).clean()
+        candidate(date(2024, 8, 1)).clean()
+        self.first.effective_to = date(2024, 6, 1)
+        self.first.clean()
+
+    def test_lookups_are_served_from_memory(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.structure_on(date(2024, 3, 1)), self.first.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.structure_on(date(2024, 9, 1)), self.second.pk)
+
+    def test_change_retires_every_workers_cache_on_commit(self):
+        self.structure_on(date(2024, 9, 1))
+        version = get_salary_structure_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.second.base_salary = Decimal('1250.00')
+            self.second.save()
+            self.assertEqual(get_salary_structure_version(), version)
+        self.assertNotEqual(get_salary_structure_version(), version)
+
+    def test_stale_histories_reload_after_a_version_bump(self):
+        self.structure_on(date(2024, 9, 1))
+        # Another worker changes a structure: this process keeps its entry, only the shared version moves
+        SalaryStructure.objects.filter(pk=self.second.pk).update(base_salary=Decimal('1250.00'))
+        cache.set(SALARY_STRUCTURE_VERSION_KEY, get_salary_structure_version() + 1, None)
+
+        with self.assertNumQueries(1):
+            structure = get_salary_structures([self.staff.pk], date(2024, 9, 1))[self.staff.pk]
+        self.assertEqual(structure.base_salary, Decimal('1250.00'))
+
+
+class StaffAttendanceTest(StaffTestData, TestCase):
+    """Bulk clock events, closing a day and the monthly totals built from them"""
+
+    MONDAY = date(2025, 3, 3)
+
+    def setUp(self):
+        super().setUp()
+        self.service = StaffAttendanceService()
+        self.mensah = self.add_staff('Mensah')
+        self.owusu = self.add_staff('Owusu')
+        self.asante = self.add_staff('Asante')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    @staticmethod
+    def at(day, hour, minute=0):
+        return datetime(day.year, day.month, day.day, hour, minute, tzinfo=dt_timezone.utc)
+
+    def clock(self, clock_action, day, *records):
+        return self.service.record_clock_events(clock_action, list(records), attendance_date=day)
+
+    def test_duplicate_clock_in_updates_the_day_row(self):
+        first = self.clock('check_in', self.MONDAY, {'staff_id': self.mensah.pk, 'time': self.at(self.MONDAY, 8)})
+        again = self.clock(
+            'check_in', self.MONDAY,
+            {
+                'staff_id': self.mensah.pk, 'time': self.at(self.MONDAY, 8, 5),
+                'status': StaffAttendance.AttendanceStatus.HALF_DAY
+            },
+            # Listed twice in one batch: the last event wins
+            {'staff_id': self.owusu.pk, 'time': self.at(self.MONDAY, 8, 10)},
+            {'staff_id': self.owusu.pk, 'time': self.at(self.MONDAY, 8, 20)}
+        )
+
+        self.assertEqual((first['created_count'], first['updated_count']), (1, 0))
+        self.assertEqual((again['created_count'], again['updated_count']), (1, 1))
+        rows = {row.staff_id: row for row in StaffAttendance.objects.filter(attendance_date=self.MONDAY)}
+        self.assertEqual(set(rows), {self.mensah.pk, self.owusu.pk})
+        self.assertEqual(rows[self.mensah.pk].check_in, self.at(self.MONDAY, 8, 5))
+        self.assertEqual(rows[self.mensah.pk].status, StaffAttendance.AttendanceStatus.HALF_DAY)
+        self.assertEqual(rows[self.owusu.pk].check_in, self.at(self.MONDAY, 8, 20))
+
+    def test_clock_out_keeps_the_clock_in(self):
+        self.clock('check_in', self.MONDAY, {'staff_id': self.mensah.pk, 'time': self.at(self.MONDAY, 8)})
+        self.asante.user.is_active = False
+        self.asante.user.save()
+
+        result = self.clock(
+            'check_out', self.MONDAY,
+            {'staff_id': self.mensah.pk, 'time': self.at(self.MONDAY, 16)},
+            {'staff_id': self.owusu.pk, 'time': self.at(self.MONDAY, 15)},
+            {'staff_id': self.asante.pk}
+        )
+
+        self.assertEqual((result['created_count'], result['updated_count']), (1, 1))
+        self.assertEqual(
+            result['errors'], [{'row': 2, 'staff_id': self.asante.pk, 'error': 'Staff not found or inactive'}]
+        )
+        mensah = StaffAttendance.objects.get(staff=self.mensah)
+        self.assertEqual((mensah.check_in, mensah.check_out), (self.at(self.MONDAY, 8), self.at(self.MONDAY, 16)))
+        owusu = StaffAttendance.objects.get(staff=self.owusu)
+        self.assertEqual((owusu.check_in, owusu.status), (None, StaffAttendance.AttendanceStatus.PRESENT))
+        with self.assertRaises(ValidationError):
+            self.clock('clock_in', self.MONDAY, {'staff_id': self.mensah.pk})
+
+    def test_close_day_fills_in_missing_rows_only(self):
+        # Clocked in but never out: the row stays present, without a check-out
+        self.clock('check_in', self.MONDAY, {'staff_id': self.mensah.pk, 'time': self.at(self.MONDAY, 8)})
+        LeaveRequest.objects.create(
+            staff=self.owusu, leave_type=LeaveRequest.LeaveType.SICK, start_date=self.MONDAY,
+            end_date=self.MONDAY, total_days=1, reason='Flu', status=LeaveRequest.LeaveStatus.APPROVED
+        )
+
+        self.assertEqual(self.service.close_day(self.MONDAY), {'absent': 1, 'on_leave': 1})
+        self.assertEqual(self.service.close_day(self.MONDAY), {'absent': 0, 'on_leave': 0})
+
+        rows = dict(StaffAttendance.objects.filter(attendance_date=self.MONDAY).values_list('staff_id', 'status'))
+        Status = StaffAttendance.AttendanceStatus
+        self.assertEqual(rows, {
+            self.mensah.pk: Status.PRESENT, self.owusu.pk: Status.ON_LEAVE, self.asante.pk: Status.ABSENT
+        })
+        mensah = StaffAttendance.objects.get(staff=self.mensah)
+        self.assertIsNone(mensah.check_out)
+        self.assertEqual(mensah.remarks, '')
+
+    def test_close_staff_day_command_skips_weekends(self):
+        out = StringIO()
+        call_command('close_staff_day', '--date', '2025-03-09', '--days', '7', stdout=out)
+
+        # Monday 3rd to Friday 7th; Saturday 8th and Sunday 9th are skipped
+        self.assertEqual(out.getvalue().count('marked 3 absent'), 5)
+        self.assertEqual(
+            sorted(set(StaffAttendance.objects.values_list('attendance_date', flat=True))),
+            [date(2025, 3, day) for day in range(3, 8)]
+        )
+
+        call_command('close_staff_day', '--date', '2025-03-08', '--include-weekends', stdout=StringIO())
+        self.assertEqual(StaffAttendance.objects.filter(attendance_date=date(2025, 3, 8)).count(), 3)
+        for options in [{'date': '08/03/2025'}, {'days': 0}]:
+            with self.subTest(**options):
+                with self.assertRaises(CommandError):
+                    call_command('close_staff_day', stdout=StringIO(), **options)
+
+    def test_monthly_summary_totals(self):
+        tuesday = date(2025, 3, 4)
+        self.clock('check_in', self.MONDAY, {'staff_id': self.mensah.pk}, {'staff_id': self.owusu.pk})
+        self.clock(
+            'check_in', tuesday,
+            {'staff_id': self.mensah.pk, 'status': StaffAttendance.AttendanceStatus.HALF_DAY}
+        )
+        self.service.close_day(self.MONDAY)
+        self.service.close_day(tuesday)
+        # Other months are not counted
+        self.service.close_day(date(2025, 4, 1))
+
+        response = self.client.get('/staff-attendance/monthly_summary/', {'year': 2025, 'month': 3})
+
+        self.assertEqual(response.status_code, 200)
+        totals = {
+            row['staff_id']: (row['total_days'], row['present_days'], row['half_days'], row['absent_days'])
+            for row in response.data['staff']
+        }
+        self.assertEqual(totals, {
+            self.mensah.pk: (2, 1, 1, 0),
+            self.owusu.pk: (2, 1, 0, 1),
+            self.asante.pk: (2, 0, 0, 2),
+        })
+
+        response = self.client.get(
+            '/staff-attendance/monthly_summary/', {'year': 2025, 'month': 3, 'staff_id': self.owusu.pk}
+        )
+        self.assertEqual([row['staff_id'] for row in response.data['staff']], [self.owusu.pk])
+
+    def test_monthly_summary_rejects_bad_parameters(self):
+        for params in [{'year': 'last'}, {'month': '13'}, {'month': '3.5'}, {'staff_id': 'mensah'}]:
+            with self.subTest(**params):
+                response = self.client.get('/staff-attendance/monthly_summary/', params)
+                self.assertEqual(response.status_code, 400)
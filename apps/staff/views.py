@@ -2,22 +2,28 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
 from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from .models import Staff, SalaryStructure, SalaryPayment, StaffAttendance, LeaveRequest
 from .serializers import (
     StaffSerializer, StaffCreateSerializer, StaffUpdateSerializer,
     SalaryStructureSerializer, SalaryPaymentSerializer,
+    PayrollRunSerializer, PayrollSettlementSerializer, BulkStaffClockSerializer,
     StaffAttendanceSerializer, LeaveRequestSerializer, LeaveApprovalSerializer
 )
-from .services import StaffService, SalaryService
+from .services import StaffService, SalaryService, StaffAttendanceService
 from apps.accounts.permissions import CanManageStaff, IsAdminOrHeadmaster
+from config.pagination import KeysetPagination
 
 
 class StaffViewSet(viewsets.ModelViewSet):
     serializer_class = StaffSerializer
+    query_budgets = {'list': 5, 'retrieve': 4, 'teachers': 4}
 
     def get_queryset(self):
-        queryset = Staff.objects.all().select_related('user')
+        queryset = Staff.objects.with_details()
         
         role = self.request.query_params.get('role')
         department = self.request.query_params.get('department')
@@ -89,7 +95,7 @@ class StaffViewSet(viewsets.ModelViewSet):
             created_by=request.user
         )
         
-        response_data = StaffSerializer(result['staff']).data
+        response_data = StaffSerializer(Staff.objects.with_details().get(pk=result['staff'].pk)).data
         
         # Include generated credentials if password was auto-generated
         if result['generated_password']:
@@ -111,7 +117,7 @@ class StaffViewSet(viewsets.ModelViewSet):
         service = StaffService()
         staff = service.update_staff(instance.id, serializer.validated_data)
         
-        return Response(StaffSerializer(staff).data)
+        return Response(StaffSerializer(Staff.objects.with_details().get(pk=staff.pk)).data)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, CanManageStaff])
     def deactivate(self, request, pk=None):
@@ -123,7 +129,7 @@ class StaffViewSet(viewsets.ModelViewSet):
         
         return Response({
             'message': f'{staff.full_name} has been deactivated',
-            'staff': StaffSerializer(staff).data
+            'staff': StaffSerializer(Staff.objects.with_details().get(pk=staff.pk)).data
         })
     
     @action(detail=False, methods=['get'])
@@ -158,6 +164,14 @@ class SalaryStructureViewSet(viewsets.ModelViewSet):
         if staff_id:
             queryset = queryset.filter(staff_id=staff_id)
         
+        # Only the structure each staff member is paid on at a date
+        as_of = self.request.query_params.get('as_of', None)
+        if as_of:
+            as_of_date = parse_date(as_of)
+            if as_of_date is None:
+                raise ValidationError({'as_of': 'Enter a date as YYYY-MM-DD.'})
+            queryset = queryset.effective_on(as_of_date)
+        
         return queryset
 
 
@@ -240,6 +254,51 @@ class SalaryPaymentViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    
+    @action(detail=False, methods=['post'])
+    def run_payroll(self, request):
+        """Process the monthly salary of every active staff member for a period"""
+        serializer = PayrollRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = SalaryService()
+        try:
+            result = service.run_payroll(
+                payment_period=serializer.validated_data['payment_period'],
+                processed_by=request.user,
+                staff_ids=serializer.validated_data.get('staff_ids')
+            )
+            
+            payments = result['payments']
+            return Response({
+                'payment_period': result['payment_period'],
+                'success': len(payments),
+                'already_processed': result['already_processed'],
+                'total_gross': sum(payment.base_salary + payment.allowances for payment in payments),
+                'total_tax': sum(payment.tax for payment in payments),
+                'total_net': sum(payment.net_salary for payment in payments),
+                'missing_structure': result['missing_structure']
+            }, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_mark_as_paid(self, request):
+        """Mark all pending salary payments of a period as paid"""
+        serializer = PayrollSettlementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = SalaryService()
+        try:
+            updated = service.mark_payroll_as_paid(
+                payment_period=serializer.validated_data['payment_period'],
+                payment_date=serializer.validated_data['payment_date'],
+                payment_method=serializer.validated_data['payment_method'],
+                staff_ids=serializer.validated_data.get('staff_ids')
+            )
+            return Response({'updated': updated})
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 class StaffAttendanceViewSet(viewsets.ModelViewSet):
     """ViewSet for StaffAttendance management"""
@@ -247,6 +306,8 @@ class StaffAttendanceViewSet(viewsets.ModelViewSet):
     queryset = StaffAttendance.objects.select_related('staff').all()
     serializer_class = StaffAttendanceSerializer
     permission_classes = [IsAuthenticated, IsAdminOrHeadmaster]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-attendance_date', '-id')
     
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -288,6 +349,45 @@ class StaffAttendanceViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    
+    @action(detail=False, methods=['post'])
+    def bulk_clock(self, request):
+        """Clock many staff in or out at once"""
+        serializer = BulkStaffClockSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        service = StaffAttendanceService()
+        try:
+            result = service.record_clock_events(
+                clock_action=serializer.validated_data['action'],
+                records=serializer.validated_data['records'],
+                attendance_date=serializer.validated_data.get('attendance_date')
+            )
+            return Response(result, status=status.HTTP_201_CREATED)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    @action(detail=False, methods=['get'])
+    def monthly_summary(self, request):
+        """Per-staff attendance counts for a month"""
+        today = timezone.localdate()
+        try:
+            year = int(request.query_params.get('year', today.year))
+            month = int(request.query_params.get('month', today.month))
+            if not 1 <= month <= 12 or not 1 <= year <= 9999:
+                raise ValueError
+            staff_id = request.query_params.get('staff_id', None)
+            staff_id = int(staff_id) if staff_id else None
+        except ValueError:
+            return Response(
+                {'error': 'year and month must be a valid year and month number, and staff_id a staff ID'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        summary = StaffAttendanceService.monthly_summary(
+            year, month, staff_ids=[staff_id] if staff_id else None
+        )
+        return Response({'year': year, 'month': month, 'staff': summary})
 
 class LeaveRequestViewSet(viewsets.ModelViewSet):
     """ViewSet for LeaveRequest management"""
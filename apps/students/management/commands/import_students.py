@@ -0,0 +1,55 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.academic.models import AcademicYear
+from apps.accounts.models import User
+from apps.students.services import StudentImportService
+
+
+class Command(BaseCommand):
+    help = 'Registers students, parents and class enrollments in bulk from a CSV or XLSX sheet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file, one student per row')
+        parser.add_argument('--academic-year', type=int, help='Academic year ID for class lookups (default: current)')
+        parser.add_argument('--created-by', help='Username recorded as the registering staff member')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and report without saving anything')
+        parser.add_argument('--limit', type=int, default=50, help='Number of row errors to list')
+
+    def handle(self, *args, **options):
+        academic_year = None
+        if options['academic_year']:
+            academic_year = AcademicYear.objects.filter(pk=options['academic_year']).first()
+            if academic_year is None:
+                raise CommandError(f"Academic year {options['academic_year']} not found")
+
+        created_by = None
+        if options['created_by']:
+            created_by = User.objects.filter(username=options['created_by']).first()
+            if created_by is None:
+                raise CommandError(f"User {options['created_by']} not found")
+
+        service = StudentImportService(academic_year=academic_year, created_by=created_by)
+        try:
+            with open(options['path'], 'rb') as file:
+                result = service.import_rows(
+                    service.read_rows(file, options['path']),
+                    dry_run=options['dry_run']
+                )
+        except OSError as e:
+            raise CommandError(str(e))
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        for error in result['errors'][:options['limit']]:
+            self.stdout.write(f"  row {error['row']} ({error['admission_number'] or 'no admission number'}): {error['error']}")
+        if result['errors']:
+            self.stdout.write(self.style.WARNING(f"{len(result['errors'])} row(s) skipped."))
+
+        summary = (
+            f"{result['created']} student(s), {result['enrolled']} enrollment(s), "
+            f"{result['parents_created']} new parent(s), {result['parents_linked']} parent link(s)"
+        )
+        if result['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Dry run: would import {summary}. Nothing was saved."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {summary}."))
@@ -3,6 +3,27 @@ from django.core.validators import RegexValidator
 from apps.accounts.models import User
 
 
+class StudentQuerySet(models.QuerySet):
+    def with_details(self):
+        """
+        Prefetch plan for detail serialization: active enrollments with their
+        class and academic year, and parent links with their parents.
+        """
+        from apps.academic.models import Enrollment
+
+        return self.select_related('class_obj').prefetch_related(
+            models.Prefetch(
+                'enrollments',
+                queryset=Enrollment.objects.filter(status='active').select_related('class_obj__academic_year'),
+                to_attr='active_enrollments'
+            ),
+            models.Prefetch(
+                'parent_links',
+                queryset=StudentParent.objects.select_related('parent')
+            )
+        )
+
+
 class Student(models.Model):
     """
     Student records - NO user account required.
@@ -53,6 +74,8 @@ class Student(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     class_obj =  models.ForeignKey('academic.Class', on_delete=models.SET_NULL, null=True, blank=True)
+
+    objects = StudentQuerySet.as_manager()
     
     class Meta:
         db_table = 'students'
@@ -80,9 +103,16 @@ class Student(models.Model):
             (today.month, today.day) < (self.date_of_birth.month, self.date_of_birth.day)
         )
     
+    @property
+    def active_enrollment(self):
+        """Active enrollment, read from the with_details() prefetch when present"""
+        if hasattr(self, 'active_enrollments'):
+            return self.active_enrollments[0] if self.active_enrollments else None
+        return self.enrollments.filter(status="active").select_related("class_obj__academic_year").first()
+
     @property
     def class_info(self):
-        enrollment = self.enrollments.filter(status="active").select_related("class_obj").first()
+        enrollment = self.active_enrollment
         if enrollment:
             c = enrollment.class_obj
             return {
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from typing import List, Dict, Any, Optional
 from drf_spectacular.utils import extend_schema_field
-from apps.academic.models import Class
+from apps.academic.models import AcademicYear, Class
 from .models import Student, Parent, StudentParent
 
 
@@ -114,30 +114,21 @@ class StudentDetailSerializer(serializers.ModelSerializer):
 
     @extend_schema_field(serializers.ListSerializer(child=serializers.DictField()))
     def get_parents(self, obj) -> List[Dict[str, Any]]:
-        links = obj.parent_links.select_related("parent")
+        # Served from the parent_links prefetch in Student.objects.with_details()
         return [
             {
                 "parent": ParentSerializer(link.parent).data,
                 "is_primary_contact": link.is_primary_contact,
                 "can_pickup": link.can_pickup,
             }
-            for link in links
+            for link in obj.parent_links.all()
         ]
 
 
     @extend_schema_field(serializers.DictField())
     def get_current_class(self, obj):
-        # Get the active enrollment
-        enrollment = obj.enrollments.filter(status="active").select_related("class_obj").first()
-        if enrollment:
-            return {
-                "id": enrollment.class_obj.id,
-                "name": enrollment.class_obj.class_name,
-                "grade_level": enrollment.class_obj.grade_level,
-                "section": enrollment.class_obj.section,
-                "academic_year": enrollment.class_obj.academic_year.year_name
-            }
-        return None
+        # Served from the active_enrollments prefetch in Student.objects.with_details()
+        return obj.class_info
 
 
 class StudentCreateSerializer(serializers.Serializer):
@@ -165,6 +156,22 @@ class StudentCreateSerializer(serializers.Serializer):
     )
 
 
+class StudentImportSerializer(serializers.Serializer):
+    file = serializers.FileField(help_text="CSV or XLSX sheet, one student per row")
+    academic_year_id = serializers.IntegerField(required=False, help_text="Defaults to the current academic year")
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate_file(self, value):
+        if not value.name.lower().endswith(('.csv', '.xlsx')):
+            raise serializers.ValidationError("Upload a .csv or .xlsx file")
+        return value
+
+    def validate_academic_year_id(self, value):
+        if not AcademicYear.objects.filter(pk=value).exists():
+            raise serializers.ValidationError("Academic year not found")
+        return value
+
+
 class StudentUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Student
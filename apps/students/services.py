@@ -1,9 +1,15 @@
-from django.db import transaction
+import csv
+import io
+from itertools import islice
+from django.db import transaction, connection
+from django.db.models import Count, Max, Q
 from django.core.exceptions import ValidationError
 from .models import Student, Parent, StudentParent
 from apps.grades.models import Grade
 from apps.attendance.models import Attendance
-from apps.academic.models import Class, Enrollment
+from apps.academic.models import AcademicYear, Class, Enrollment
+from apps.search.models import SearchEntry
+from apps.search.services import SearchService
 from datetime import datetime
 
 
@@ -189,14 +195,8 @@ class StudentService:
     @staticmethod
     # apps/students/services.py
     def get_student_with_details(student_id):
-        # The error is happening right here in this prefetch_related call
         return {
-            'student': Student.objects.prefetch_related(
-                'parent_links__parent',
-                'academic_grades',  # <--- CHANGE THIS from 'grades'
-                'enrollments',
-                'attendance_records' 
-            ).get(id=student_id),
+            'student': Student.objects.with_details().get(id=student_id),
             
             'parents': Parent.objects.filter(student_links__student_id=student_id),
             
@@ -211,12 +211,8 @@ class StudentService:
     
     @staticmethod
     def search_students(query):
-        """Search students by name or admission number"""
-        return Student.objects.filter(
-            models.Q(first_name__icontains=query) |
-            models.Q(last_name__icontains=query) |
-            models.Q(admission_number__icontains=query)
-        )
+        """Search students by name or admission number, best match first"""
+        return SearchService.filter(Student.objects.all(), SearchEntry.EntityType.STUDENT, query)
     
     def delete_student(self, student_id):
         try:
@@ -254,4 +250,321 @@ class ParentService:
             parent = Parent.objects.prefetch_related('student_links__student').get(id=parent_id)
             return [link.student for link in parent.student_links.all()]
         except Parent.DoesNotExist:
-            raise ValidationError("Parent not found")
\ No newline at end of file
+            raise ValidationError("Parent not found")
+
+
+class StudentImportService:
+    """
+    Bulk student registration from a CSV or XLSX sheet, one student per row.
+
+    Parents go in `parent1_*` / `parent2_*` columns and are matched by
+    national_id, then phone number, against parents already on file and earlier
+    rows of the sheet. Rows are processed in chunks: each chunk costs one lookup
+    for admission numbers, one for parents and one bulk insert per table.
+    """
+
+    CHUNK_SIZE = 500
+    PARENT_PREFIXES = ('parent1_', 'parent2_')
+    STUDENT_FIELDS = [
+        'admission_number', 'first_name', 'last_name', 'middle_name', 'date_of_birth',
+        'gender', 'address', 'nationality', 'religion', 'blood_group',
+        'medical_conditions', 'admission_date',
+    ]
+    PARENT_FIELDS = [
+        'first_name', 'last_name', 'phone_number', 'email', 'address',
+        'occupation', 'workplace', 'national_id', 'relationship',
+    ]
+    TRUE_VALUES = ('1', 'true', 'yes', 'y')
+
+    def __init__(self, academic_year=None, created_by=None):
+        self.academic_year = academic_year or AcademicYear.objects.filter(is_current=True).first()
+        self.created_by = created_by
+
+    # Reading
+
+    @classmethod
+    def read_rows(cls, file, filename):
+        """Yield (row_number, row) pairs from a binary file, one row at a time"""
+        if filename.lower().endswith('.xlsx'):
+            return cls._read_xlsx(file)
+        return cls._read_csv(file)
+
+    @staticmethod
+    def _column(header):
+        return str(header or '').strip().lower().replace(' ', '_')
+
+    @staticmethod
+    def _cell(value):
+        if value is None:
+            return ''
+        if hasattr(value, 'date') and callable(value.date):
+            return value.date().isoformat()
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return str(value).strip()
+
+    @classmethod
+    def _read_csv(cls, file):
+        reader = csv.reader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+        header = [cls._column(column) for column in next(reader, [])]
+        for row_number, values in enumerate(reader, start=2):
+            if any(value.strip() for value in values):
+                yield row_number, {
+                    column: value.strip() for column, value in zip(header, values) if column
+                }
+
+    @classmethod
+    def _read_xlsx(cls, file):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValidationError("XLSX import requires the openpyxl package")
+
+        workbook = load_workbook(file, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [cls._column(column) for column in next(rows, ())]
+            for row_number, values in enumerate(rows, start=2):
+                if any(value not in (None, '') for value in values):
+                    yield row_number, {
+                        column: cls._cell(value) for column, value in zip(header, values) if column
+                    }
+        finally:
+            workbook.close()
+
+    # Importing
+
+    def import_rows(self, rows, dry_run=False):
+        """
+        Validate and register every row; rows with errors are skipped and reported.
+        With dry_run the whole import is rolled back after validation and inserts.
+        """
+        self.result = {
+            'created': 0,
+            'enrolled': 0,
+            'parents_created': 0,
+            'parents_linked': 0,
+            'errors': [],
+            'dry_run': dry_run,
+        }
+        self._seen_admission_numbers = set()
+        self._parents_by_national_id = {}
+        self._parents_by_phone = {}
+
+        rows = iter(rows)
+        with transaction.atomic():
+            self._classes = self._load_classes()
+            while True:
+                chunk = list(islice(rows, self.CHUNK_SIZE))
+                if not chunk:
+                    break
+                self._import_chunk(chunk)
+            if dry_run:
+                transaction.set_rollback(True)
+
+        return self.result
+
+    def _load_classes(self):
+        """Classes of the academic year by id and name, with seats taken and the last roll number"""
+        if self.academic_year is None:
+            return {}
+        # Lock the classes so concurrent registrations cannot take the same seats or roll numbers
+        list(Class.objects.select_for_update().filter(academic_year=self.academic_year).values_list('id'))
+        classes = Class.objects.filter(academic_year=self.academic_year).annotate(
+            active_count=Count('enrollments', filter=Q(enrollments__status=Enrollment.EnrollmentStatus.ACTIVE)),
+            last_roll_number=Max('enrollments__roll_number')
+        )
+        index = {}
+        for class_obj in classes:
+            class_obj.last_roll_number = class_obj.last_roll_number or 0
+            index[str(class_obj.id)] = class_obj
+            index[class_obj.class_name.lower()] = class_obj
+        return index
+
+    def _import_chunk(self, chunk):
+        admission_numbers = [row.get('admission_number') for row_number, row in chunk if row.get('admission_number')]
+        existing = set(
+            Student.objects.filter(admission_number__in=admission_numbers).values_list('admission_number', flat=True)
+        )
+        self._index_parents(chunk)
+
+        accepted = []
+        new_parents = []
+        for row_number, row in chunk:
+            try:
+                student, parents, class_obj = self._validate_row(row, existing)
+            except ValidationError as e:
+                self.result['errors'].append({
+                    'row': row_number,
+                    'admission_number': row.get('admission_number', ''),
+                    'error': '; '.join(e.messages)
+                })
+                continue
+
+            self._seen_admission_numbers.add(student.admission_number)
+            links = {}
+            for candidate, link_options in parents:
+                parent = self._match_parent(candidate)
+                if parent is candidate:
+                    new_parents.append(candidate)
+                links.setdefault(id(parent), (parent, link_options))
+
+            roll_number = None
+            if class_obj is not None:
+                class_obj.active_count += 1
+                class_obj.last_roll_number += 1
+                roll_number = class_obj.last_roll_number
+            accepted.append((student, list(links.values()), class_obj, roll_number))
+
+        if accepted:
+            self._write(accepted, new_parents)
+
+    def _validate_row(self, row, existing):
+        """Build the row's student, parent candidates and class, reporting every problem at once"""
+        problems = []
+        admission_number = row.get('admission_number', '')
+        if admission_number in existing:
+            problems.append(f"Admission number {admission_number} already exists")
+        elif admission_number in self._seen_admission_numbers:
+            problems.append(f"Admission number {admission_number} appears more than once in the file")
+
+        student = Student(
+            **{field: row.get(field, '') for field in self.STUDENT_FIELDS},
+            created_by=self.created_by
+        )
+        student.gender = student.gender.lower()
+        if not student.admission_date:
+            student.admission_date = datetime.now().date()
+        problems.extend(self._clean(student))
+
+        parents = []
+        for prefix in self.PARENT_PREFIXES:
+            values = {field: row.get(prefix + field, '') for field in self.PARENT_FIELDS}
+            if not any(values.values()):
+                continue
+            candidate = Parent(**values)
+            candidate.relationship = candidate.relationship.lower()
+            problems.extend(self._clean(candidate, label=prefix.rstrip('_')))
+            parents.append((candidate, {
+                'is_primary_contact': row.get(prefix + 'is_primary_contact', '').lower() in self.TRUE_VALUES,
+                'can_pickup': row.get(prefix + 'can_pickup', 'yes').lower() in self.TRUE_VALUES,
+            }))
+
+        class_obj = None
+        class_key = row.get('class_id') or row.get('class_name', '')
+        if class_key:
+            class_obj = self._classes.get(class_key.lower())
+            if class_obj is None:
+                year = self.academic_year.year_name if self.academic_year else 'no current academic year'
+                problems.append(f"Class {class_key} not found in {year}")
+            elif class_obj.active_count >= class_obj.capacity:
+                problems.append(f"Class {class_obj.class_name} is at full capacity")
+
+        if problems:
+            raise ValidationError(problems)
+        return student, parents, class_obj
+
+    @staticmethod
+    def _clean(obj, label=None):
+        """Field validation messages, without the per-row uniqueness and foreign key queries"""
+        try:
+            obj.full_clean(
+                exclude=['created_by', 'class_obj'],
+                validate_unique=False,
+                validate_constraints=False
+            )
+        except ValidationError as e:
+            prefix = f"{label} " if label else ''
+            return [
+                f"{prefix}{field}: {message}"
+                for field, messages in e.message_dict.items()
+                for message in messages
+            ]
+        return []
+
+    def _index_parents(self, chunk):
+        """Add parents on file that share a national_id or phone with this chunk to the in-memory index"""
+        national_ids = set()
+        phones = set()
+        for row_number, row in chunk:
+            for prefix in self.PARENT_PREFIXES:
+                national_id = row.get(prefix + 'national_id')
+                phone = row.get(prefix + 'phone_number')
+                if national_id and national_id not in self._parents_by_national_id:
+                    national_ids.add(national_id)
+                if phone and phone not in self._parents_by_phone:
+                    phones.add(phone)
+        if not (national_ids or phones):
+            return
+
+        matches = Parent.objects.filter(
+            Q(national_id__in=national_ids) | Q(phone_number__in=phones)
+        ).only('id', 'national_id', 'phone_number').order_by('id')
+        for parent in matches:
+            if parent.national_id:
+                self._parents_by_national_id.setdefault(parent.national_id, parent)
+            self._parents_by_phone.setdefault(parent.phone_number, parent)
+
+    def _match_parent(self, candidate):
+        """The known parent for a candidate, or the candidate itself once registered as new"""
+        parent = None
+        if candidate.national_id:
+            parent = self._parents_by_national_id.get(candidate.national_id)
+        if parent is None:
+            parent = self._parents_by_phone.get(candidate.phone_number)
+        if parent is None:
+            parent = candidate
+        if candidate.national_id:
+            self._parents_by_national_id.setdefault(candidate.national_id, parent)
+        self._parents_by_phone.setdefault(candidate.phone_number, parent)
+        return parent
+
+    def _write(self, accepted, new_parents):
+        students = [student for student, links, class_obj, roll_number in accepted]
+        Student.objects.bulk_create(students, batch_size=self.CHUNK_SIZE)
+        Parent.objects.bulk_create(new_parents, batch_size=self.CHUNK_SIZE)
+
+        # Backends without RETURNING (MySQL) leave the primary keys unset
+        if not connection.features.can_return_rows_from_bulk_insert:
+            ids_by_number = dict(
+                Student.objects.filter(
+                    admission_number__in=[student.admission_number for student in students]
+                ).values_list('admission_number', 'id')
+            )
+            for student in students:
+                student.id = ids_by_number[student.admission_number]
+            # New parents never share a phone with a parent already on file
+            ids_by_phone = dict(
+                Parent.objects.filter(
+                    phone_number__in=[parent.phone_number for parent in new_parents]
+                ).order_by('id').values_list('phone_number', 'id')
+            )
+            for parent in new_parents:
+                parent.id = ids_by_phone[parent.phone_number]
+
+        StudentParent.objects.bulk_create([
+            StudentParent(student=student, parent_id=parent.pk, **link_options)
+            for student, links, class_obj, roll_number in accepted
+            for parent, link_options in links
+        ], batch_size=self.CHUNK_SIZE)
+
+        enrollments = [
+            Enrollment(
+                student=student,
+                class_obj=class_obj,
+                roll_number=roll_number,
+                status=Enrollment.EnrollmentStatus.ACTIVE
+            )
+            for student, links, class_obj, roll_number in accepted
+            if class_obj is not None
+        ]
+        Enrollment.objects.bulk_create(enrollments, batch_size=self.CHUNK_SIZE)
+
+        # bulk_create skips the search index signals
+        SearchService.index(SearchEntry.EntityType.STUDENT, students)
+        SearchService.index(SearchEntry.EntityType.PARENT, new_parents)
+
+        self.result['created'] += len(students)
+        self.result['enrolled'] += len(enrollments)
+        self.result['parents_created'] += len(new_parents)
+        self.result['parents_linked'] += sum(len(links) for student, links, class_obj, roll_number in accepted)
\ No newline at end of file
@@ -1,3 +1,195 @@
+import io
+from datetime import date
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Enrollment
+from .models import Student, Parent, StudentParent
+from .services import StudentImportService
 
-# Create your tests here.
+
+class StudentDetailQueryCountTest(TestCase):
+    """Detail serialization must read from the prefetch plan, not query per student"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='registrar', password='registrar-pass-123', role=User.Role.ADMIN
+        )
+        year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.school_class = Class.objects.create(class_name='Grade 5A', grade_level=5, academic_year=year)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_students(self, count):
+        for _ in range(count):
+            number = Student.objects.count() + 1
+            student = Student.objects.create(
+                admission_number=f'ADM{number:04d}',
+                first_name='Ama',
+                last_name=f'Mensah{number}',
+                date_of_birth=date(2014, 3, 1),
+                gender=Student.Gender.FEMALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=self.school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=self.school_class)
+            for relationship in (Parent.Relationship.MOTHER, Parent.Relationship.FATHER):
+                parent = Parent.objects.create(
+                    first_name='Kofi',
+                    last_name=f'Mensah{number}',
+                    phone_number='+233200000000',
+                    relationship=relationship
+                )
+                StudentParent.objects.create(student=student, parent=parent)
+
+    def list_query_count(self):
+        with self.assertNumQueries(4):
+            # count, page of students, active enrollments, parent links
+            response = self.client.get('/students/', {'details': 'true'})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_list_with_details_uses_fixed_query_count(self):
+        self.add_students(2)
+        results = self.list_query_count()
+        self.assertEqual(len(results), 2)
+
+        self.add_students(18)
+        results = self.list_query_count()
+        self.assertEqual(len(results), 20)
+        self.assertEqual(len(results[0]['parents']), 2)
+        self.assertEqual(results[0]['current_class']['academic_year'], '2025/2026')
+
+    def test_retrieve_uses_fixed_query_count(self):
+        self.add_students(1)
+        student = Student.objects.get()
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/students/{student.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['current_class']['name'], 'Grade 5A')
+
+
+class StudentImportTest(TestCase):
+    """A registration sheet is imported in a fixed number of queries per chunk"""
+
+    HEADER = (
+        'Admission Number,First Name,Last Name,Date of Birth,Gender,Class Name,'
+        'Parent1 First Name,Parent1 Last Name,Parent1 Phone Number,Parent1 National ID,Parent1 Relationship'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='registrar', password='registrar-pass-123', role=User.Role.ADMIN
+        )
+        cls.year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31), is_current=True
+        )
+        cls.school_class = Class.objects.create(
+            class_name='Grade 1A', grade_level=1, academic_year=cls.year, capacity=3
+        )
+
+    def sheet(self, *lines):
+        return io.BytesIO('\n'.join((self.HEADER,) + lines).encode())
+
+    def import_sheet(self, *lines, dry_run=False):
+        service = StudentImportService(created_by=self.user)
+        return service.import_rows(service.read_rows(self.sheet(*lines), 'students.csv'), dry_run=dry_run)
+
+    def row(self, number, parent_phone='+233200000001', national_id='', class_name='Grade 1A', gender='Female'):
+        return (
+            f'ADM{number:04d},Efua,Sarpong{number},2019-04-0{number % 9 + 1},{gender},{class_name},'
+            f'Yaw,Sarpong,{parent_phone},{national_id},Father'
+        )
+
+    def test_imports_students_parents_and_enrollments(self):
+        existing = Parent.objects.create(
+            first_name='Akua', last_name='Mensah', phone_number='+233209999999',
+            national_id='GHA-1', relationship=Parent.Relationship.MOTHER
+        )
+        result = self.import_sheet(
+            self.row(1),
+            # Sibling: same parent phone, so the parent is shared
+            self.row(2),
+            # Matched to the parent on file by national id, despite a new phone
+            self.row(3, parent_phone='+233201111111', national_id='GHA-1'),
+        )
+        self.assertEqual(result['errors'], [])
+        self.assertEqual((result['created'], result['enrolled']), (3, 3))
+        self.assertEqual((result['parents_created'], result['parents_linked']), (1, 3))
+
+        self.assertEqual(Parent.objects.count(), 2)
+        self.assertEqual(
+            set(StudentParent.objects.filter(parent=existing).values_list('student__admission_number', flat=True)),
+            {'ADM0003'}
+        )
+        self.assertEqual(
+            list(Enrollment.objects.order_by('roll_number').values_list('student__admission_number', 'roll_number')),
+            [('ADM0001', 1), ('ADM0002', 2), ('ADM0003', 3)]
+        )
+        student = Student.objects.get(admission_number='ADM0001')
+        self.assertEqual((student.gender, student.created_by), (Student.Gender.FEMALE, self.user))
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        Student.objects.create(
+            admission_number='ADM0009', first_name='Ama', last_name='Mensah',
+            date_of_birth=date(2019, 1, 1), gender=Student.Gender.FEMALE, admission_date=date(2025, 9, 1)
+        )
+        result = self.import_sheet(
+            self.row(1),
+            self.row(9),
+            self.row(1),
+            self.row(2, parent_phone='call me', gender='unknown'),
+            self.row(3, class_name='Grade 9Z'),
+            self.row(4),
+            self.row(5),
+            # Grade 1A holds three and is full by now
+            self.row(6),
+        )
+        errors = {error['row']: error['error'] for error in result['errors']}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6, 9])
+        self.assertIn('already exists', errors[3])
+        self.assertIn('more than once', errors[4])
+        # Every problem in a row is reported together
+        self.assertIn('gender', errors[5])
+        self.assertIn('parent1 phone_number', errors[5])
+        self.assertIn('Grade 9Z not found', errors[6])
+        self.assertIn('full capacity', errors[9])
+        self.assertEqual(result['created'], 3)
+
+    def test_dry_run_rolls_back(self):
+        result = self.import_sheet(self.row(1), self.row(2), dry_run=True)
+        self.assertEqual(result['created'], 2)
+        self.assertTrue(result['dry_run'])
+        self.assertFalse(Student.objects.exists())
+        self.assertFalse(Parent.objects.exists())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        Class.objects.filter(pk=self.school_class.pk).update(capacity=40)
+
+        def imported_queries(numbers):
+            rows = [self.row(number, parent_phone=f'+2332000000{number:02d}') for number in numbers]
+            with CaptureQueriesContext(connection) as queries:
+                result = self.import_sheet(*rows)
+            self.assertEqual(result['created'], len(numbers))
+            return len(queries)
+
+        self.assertEqual(imported_queries(range(1, 3)), imported_queries(range(3, 11)))
+
+    def test_upload_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        upload = SimpleUploadedFile('students.csv', self.sheet(self.row(1), self.row(2)).getvalue(), 'text/csv')
+
+        response = client.post('/students/import/', {'file': upload, 'dry_run': 'true'}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['success'], 2)
+        self.assertFalse(Student.objects.exists())
@@ -2,15 +2,19 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
+from rest_framework.parsers import MultiPartParser, FormParser
+from django.core.exceptions import ValidationError
 from .models import Student, Parent, StudentParent
 from .serializers import (
     StudentSerializer, StudentCreateSerializer, StudentUpdateSerializer,
-    ParentSerializer, StudentParentSerializer, StudentDetailSerializer
+    ParentSerializer, StudentParentSerializer, StudentDetailSerializer, StudentImportSerializer
 )
 from apps.grades.serializers import StudentMinimalSerializer,StudentTranscriptSerializer
-from .services import StudentService, ParentService
+from .services import StudentService, ParentService, StudentImportService
+from apps.academic.models import AcademicYear
 from apps.accounts.permissions import CanManageStudents
+from apps.search.models import SearchEntry
+from apps.search.services import SearchService
 
 
 class StudentViewSet(viewsets.ModelViewSet):
@@ -24,13 +28,21 @@ class StudentViewSet(viewsets.ModelViewSet):
             return StudentCreateSerializer
         elif self.action in ['update', 'partial_update']:
             return StudentUpdateSerializer
-        elif self.action == 'retrieve':
+        elif self.action == 'retrieve' or self._wants_details():
             return StudentDetailSerializer
         return StudentSerializer
 
+    def _wants_details(self):
+        return (
+            self.action == 'list' and
+            self.request.query_params.get('details', '').lower() in ('1', 'true', 'yes')
+        )
 
     def get_queryset(self):
-        queryset = Student.objects.select_related('class_obj') 
+        if self.action == 'retrieve' or self._wants_details():
+            queryset = Student.objects.with_details()
+        else:
+            queryset = Student.objects.select_related('class_obj')
             
         class_id = self.request.query_params.get('class_id')
         if class_id:
@@ -46,12 +58,7 @@ class StudentViewSet(viewsets.ModelViewSet):
 
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(middle_name__icontains=search) |
-                Q(admission_number__icontains=search)
-            )
+            queryset = SearchService.filter(queryset, SearchEntry.EntityType.STUDENT, search)
 
         return queryset
 
@@ -147,6 +154,39 @@ class StudentViewSet(viewsets.ModelViewSet):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(
+        detail=False, methods=['post'], url_path='import',
+        parser_classes=[MultiPartParser, FormParser], serializer_class=StudentImportSerializer
+    )
+    def import_students(self, request):
+        """Register students in bulk from an uploaded CSV or XLSX sheet"""
+        serializer = StudentImportSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        upload = serializer.validated_data['file']
+        academic_year_id = serializer.validated_data.get('academic_year_id')
+        service = StudentImportService(
+            academic_year=AcademicYear.objects.get(pk=academic_year_id) if academic_year_id else None,
+            created_by=request.user
+        )
+        try:
+            result = service.import_rows(
+                service.read_rows(upload.file, upload.name),
+                dry_run=serializer.validated_data['dry_run']
+            )
+        except (ValidationError, ValueError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'success': result['created'],
+            'errors': len(result['errors']),
+            'enrolled': result['enrolled'],
+            'parents_created': result['parents_created'],
+            'parents_linked': result['parents_linked'],
+            'dry_run': result['dry_run'],
+            'error_details': result['errors']
+        }, status=status.HTTP_200_OK if result['dry_run'] else status.HTTP_201_CREATED)
+    
     @action(detail=True, methods=['get'])
     def full_details(self, request, pk=None):
         """Get full student details with parents, grades, and academic summary"""
@@ -204,12 +244,7 @@ class ParentViewSet(viewsets.ModelViewSet):
         # 1. Search Logic (Same as before)
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(first_name__icontains=search) |
-                Q(last_name__icontains=search) |
-                Q(phone_number__icontains=search) |
-                Q(email__icontains=search)
-            )
+            queryset = SearchService.filter(queryset, SearchEntry.EntityType.PARENT, search)
 
         # 2. Filter by Class (Updated Path)
         # Path: Parent -> student_links -> student -> enrollments -> class_obj
@@ -1,5 +1,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework import status
 from django.db.models import Sum
 from django.db.models.functions import TruncMonth
 
@@ -7,14 +9,18 @@ from django.db.models.functions import TruncMonth
 from apps.students.models import Student
 from apps.staff.models import Staff
 from apps.finance.models import Payment
+from apps.accounts.permissions import IsAdminOrHeadmaster
+from config.profiling import store
 
 class DashboardSummary(APIView):
+    query_budgets = {'get': 8}
+
     def get(self, request):
         student_count = Student.objects.count()
         staff_count = Staff.objects.count()
         total_fees = Payment.objects.aggregate(Sum('amount_paid'))['amount_paid__sum'] or 0
 
-        recent_payments = Payment.objects.select_related('invoice').order_by('-payment_date')[:5]
+        recent_payments = Payment.objects.select_related('invoice__student').order_by('-payment_date')[:5]
         
         transactions = []
         for p in recent_payments:
@@ -70,4 +76,20 @@ class DashboardSummary(APIView):
                 "labels": chart_labels,
                 "values": chart_values
             }
-        })
\ No newline at end of file
+        })
+
+
+class ProfilingSummary(APIView):
+    """
+    Per-endpoint request histograms recorded by config.profiling in this
+    worker process: latency, query count, DB and serializer time.
+    DELETE clears them.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrHeadmaster]
+
+    def get(self, request):
+        return Response(store.snapshot())
+
+    def delete(self, request):
+        store.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,169 @@
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from itertools import accumulate
+
+
+# A timetable entry reduced to what conflict checks need; id is None for proposed slots
+Slot = namedtuple('Slot', 'id class_id teacher_id room day_of_week start_time end_time')
+
+CONFLICT_MESSAGES = {
+    'class': 'Class already has a session at this time',
+    'teacher': 'Teacher already has a session at this time',
+    'room': 'Room is already booked at this time',
+}
+
+
+def room_key(room_number):
+    """Rooms compare case- and whitespace-insensitively; a blank room never clashes"""
+    return ' '.join((room_number or '').split()).upper() or None
+
+
+def proposed_id(position):
+    return ('proposed', position)
+
+
+def slot_from_entry(entry):
+    return Slot(
+        entry.pk, entry.class_obj_id, entry.teacher_id, room_key(entry.room_number),
+        entry.day_of_week, entry.start_time, entry.end_time
+    )
+
+
+class IntervalList:
+    """
+    Time intervals of one (resource, day), sorted by start. A running maximum
+    of the end times lets a lookup skip, by bisection, every interval that
+    finishes before the probe starts, so an overlap check costs O(log n)
+    plus the overlaps found, even if stored intervals overlap each other.
+    """
+
+    def __init__(self):
+        self._slots = []
+        self._starts = []
+        self._max_ends = []
+
+    def _reindex(self):
+        self._starts = [slot.start_time for slot in self._slots]
+        self._max_ends = list(accumulate((slot.end_time for slot in self._slots), max))
+
+    def add(self, slot):
+        insort(self._slots, slot, key=lambda stored: (stored.start_time, stored.end_time))
+        self._reindex()
+
+    def remove(self, slot_id):
+        self._slots = [slot for slot in self._slots if slot.id != slot_id]
+        self._reindex()
+
+    def overlapping(self, start_time, end_time):
+        """Stored slots with start < end_time and end > start_time"""
+        first = bisect_right(self._max_ends, start_time)
+        last = bisect_left(self._starts, end_time)
+        return [slot for slot in self._slots[first:last] if slot.end_time > start_time]
+
+
+class ConflictIndex:
+    """
+    In-memory index of one term's timetable, answering "who is busy then"
+    for classes, teachers and rooms without a query per check.
+
+    Entries are kept in per-(class, day), per-(teacher, day) and
+    per-(room, day) interval lists. Load a term once with for_term(), then
+    check single slots with conflicts() or a whole proposed timetable with
+    validate().
+    """
+
+    def __init__(self, slots=()):
+        self._intervals = {}
+        self._slots = {}
+        for slot in slots:
+            self.add(slot)
+
+    @classmethod
+    def for_term(cls, term=None, academic_year=None, day_of_week=None):
+        """
+        Index of a term's timetable in one query, optionally limited to one
+        day. A term or academic year left as None is not filtered on, so
+        callers that do not know the term check against every entry.
+        """
+        from .models import Timetable
+
+        entries = Timetable.objects.all()
+        if term is not None:
+            entries = entries.filter(term=term)
+        if academic_year is not None:
+            entries = entries.filter(academic_year=academic_year)
+        if day_of_week:
+            entries = entries.filter(day_of_week=day_of_week)
+        rows = entries.values_list(
+            'id', 'class_obj_id', 'teacher_id', 'room_number', 'day_of_week', 'start_time', 'end_time'
+        )
+        return cls(Slot(row[0], row[1], row[2], room_key(row[3]), *row[4:]) for row in rows)
+
+    @staticmethod
+    def _keys(slot):
+        keys = [('class', slot.class_id, slot.day_of_week)]
+        if slot.teacher_id is not None:
+            keys.append(('teacher', slot.teacher_id, slot.day_of_week))
+        if slot.room:
+            keys.append(('room', slot.room, slot.day_of_week))
+        return keys
+
+    def add(self, slot):
+        if slot.id is not None:
+            self.remove(slot.id)
+            self._slots[slot.id] = slot
+        for key in self._keys(slot):
+            self._intervals.setdefault(key, IntervalList()).add(slot)
+
+    def remove(self, slot_id):
+        slot = self._slots.pop(slot_id, None)
+        if slot is None:
+            return
+        for key in self._keys(slot):
+            self._intervals[key].remove(slot_id)
+
+    def remove_classes(self, class_ids):
+        """Drop every entry of these classes, e.g. before checking their replacement timetable"""
+        for slot in [slot for slot in self._slots.values() if slot.class_id in class_ids]:
+            self.remove(slot.id)
+
+    def conflicts(self, slot, exclude_ids=()):
+        """
+        Clashes of `slot` with indexed entries as {type: [slots]}, type being
+        'class', 'teacher' or 'room'. The slot's own entry is ignored.
+        """
+        exclude_ids = set(exclude_ids)
+        if slot.id is not None:
+            exclude_ids.add(slot.id)
+        found = {}
+        for key in self._keys(slot):
+            intervals = self._intervals.get(key)
+            if intervals is None:
+                continue
+            clashes = [
+                other for other in intervals.overlapping(slot.start_time, slot.end_time)
+                if other.id is None or other.id not in exclude_ids
+            ]
+            if clashes:
+                found[key[0]] = clashes
+        return found
+
+    def validate(self, slots):
+        """
+        Check a proposed timetable in one pass: each slot against the indexed
+        entries and the proposed slots before it. A proposed slot with an id
+        replaces that entry. Returns {position: {type: [slots]}} for the slots
+        that clash; a clashing proposed slot has the id ('proposed', position).
+        """
+        for slot in slots:
+            if slot.id is not None:
+                self.remove(slot.id)
+
+        problems = {}
+        for position, slot in enumerate(slots):
+            slot = slot._replace(id=proposed_id(position))
+            found = self.conflicts(slot)
+            if found:
+                problems[position] = found
+            self.add(slot)
+        return problems
@@ -2,6 +2,7 @@ from django.db import models
 from django.core.exceptions import ValidationError
 from apps.academic.models import Class, Subject
 from apps.teachers.models import Teacher
+from .conflicts import CONFLICT_MESSAGES, ConflictIndex, slot_from_entry
 
 class Timetable(models.Model):
     class Day(models.TextChoices):
@@ -45,23 +46,11 @@ class Timetable(models.Model):
         if self.start_time >= self.end_time:
             raise ValidationError("Start time must be before end time.")
 
-        # Check for teacher scheduling conflicts
-        clash = Timetable.objects.filter(
-            teacher=self.teacher,
-            day_of_week=self.day_of_week,
-            term=self.term,
-            academic_year=self.academic_year,
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time
-        )
-        
-        if self.pk:
-            clash = clash.exclude(pk=self.pk)
-        
-        if clash.exists():
-            raise ValidationError(
-                f"Teacher {self.teacher} already has a class scheduled during this time."
-            )
+        # Check class, teacher and room double-booking within the term
+        index = ConflictIndex.for_term(self.term, self.academic_year, self.day_of_week)
+        clashes = index.conflicts(slot_from_entry(self))
+        if clashes:
+            raise ValidationError([CONFLICT_MESSAGES[kind] + '.' for kind in clashes])
 
 class Syllabus(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name="syllabi")
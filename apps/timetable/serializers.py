@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import Timetable
 from apps.academic.serializers import ClassSerializer, SubjectSerializer
-from apps.staff.serializers import StaffSerializer
+from apps.staff.serializers import StaffSummarySerializer
 
 from rest_framework import serializers
 from .models import Syllabus
@@ -17,7 +17,7 @@ class TimetableSerializer(serializers.ModelSerializer):
     class_id = serializers.IntegerField(write_only=True, source='class_obj')
     subject = SubjectSerializer(read_only=True)
     subject_id = serializers.IntegerField(write_only=True)
-    teacher = StaffSerializer(read_only=True)
+    teacher = StaffSummarySerializer(read_only=True)
     teacher_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     day_of_week_display = serializers.CharField(source='get_day_of_week_display', read_only=True)
     
@@ -35,6 +35,36 @@ class TimetableSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Start time must be before end time")
 
 
+class TimetableSlotSerializer(serializers.Serializer):
+    """A proposed timetable slot to check for conflicts"""
+    
+    id = serializers.IntegerField(required=False, allow_null=True, help_text="Existing entry this slot replaces")
+    class_id = serializers.IntegerField()
+    teacher_id = serializers.IntegerField(required=False, allow_null=True)
+    room_number = serializers.CharField(required=False, allow_blank=True, default='')
+    day_of_week = serializers.ChoiceField(choices=Timetable.Day.choices)
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    
+    def validate(self, data):
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError("Start time must be before end time")
+        return data
+
+
+class TimetableConflictCheckSerializer(serializers.Serializer):
+    """Serializer for checking a whole proposed timetable in one call"""
+    
+    # Left out, every term's entries are checked
+    term = serializers.CharField(required=False, allow_blank=True)
+    academic_year = serializers.CharField(required=False, allow_blank=True)
+    slots = TimetableSlotSerializer(many=True, allow_empty=False)
+    replace_classes = serializers.BooleanField(
+        default=False,
+        help_text="Treat the slots as the complete new timetable of their classes"
+    )
+
+
 class SyllabusSerializer(serializers.ModelSerializer):
     # Read-only nested serializers (for GET requests)
     subject = serializers.SerializerMethodField(read_only=True)
@@ -1,3 +1,291 @@
+from datetime import date, time
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from apps.accounts.models import User
+from apps.academic.models import AcademicYear, Class, Enrollment, Subject
+from apps.students.models import Student
+from apps.teachers.models import Teacher
+from .conflicts import ConflictIndex, IntervalList, Slot, proposed_id
+from .models import Timetable
 
-# Create your tests here.
+
+def slot(slot_id, class_id, start, end, teacher_id=None, room=None, day='Monday'):
+    return Slot(slot_id, class_id, teacher_id, room, day, time(*start), time(*end))
+
+
+class IntervalListTest(TestCase):
+    """Overlap lookups on one resource's day"""
+
+    def setUp(self):
+        self.intervals = IntervalList()
+        self.first = slot(1, 1, (8, 0), (9, 0))
+        self.second = slot(2, 1, (10, 0), (11, 0))
+        for stored in [self.second, self.first]:
+            self.intervals.add(stored)
+
+    def test_overlapping_excludes_touching_intervals(self):
+        cases = [
+            ((8, 30), (10, 30), [self.first, self.second]),
+            ((8, 59), (9, 1), [self.first]),
+            ((9, 0), (10, 0), []),
+            ((7, 0), (8, 0), []),
+            ((11, 0), (12, 0), []),
+        ]
+        for start, end, expected in cases:
+            with self.subTest(start=start, end=end):
+                self.assertEqual(self.intervals.overlapping(time(*start), time(*end)), expected)
+
+    def test_long_interval_is_found_past_shorter_ones(self):
+        whole_morning = slot(3, 1, (7, 0), (12, 0))
+        self.intervals.add(whole_morning)
+
+        self.assertEqual(self.intervals.overlapping(time(9, 15), time(9, 45)), [whole_morning])
+
+    def test_remove(self):
+        self.intervals.remove(self.first.id)
+
+        self.assertEqual(self.intervals.overlapping(time(8, 0), time(12, 0)), [self.second])
+
+
+class ConflictIndexTest(TestCase):
+    """Single-slot checks and whole-timetable validation against the index"""
+
+    def setUp(self):
+        self.existing = slot(1, 10, (8, 0), (9, 0), teacher_id=20, room='R1')
+        self.other = slot(2, 11, (8, 0), (9, 0), teacher_id=21)
+        self.index = ConflictIndex([self.existing, self.other])
+
+    def test_overlap_reports_every_clashing_resource(self):
+        proposed = slot(None, 10, (8, 30), (9, 30), teacher_id=20, room='R1')
+
+        self.assertEqual(self.index.conflicts(proposed), {
+            'class': [self.existing], 'teacher': [self.existing], 'room': [self.existing]
+        })
+        self.assertEqual(self.index.conflicts(proposed, exclude_ids=[self.existing.id]), {})
+
+    def test_touching_boundaries_do_not_clash(self):
+        problems = self.index.validate([
+            slot(None, 10, (7, 0), (8, 0), teacher_id=20, room='R1'),
+            slot(None, 10, (9, 0), (10, 0), teacher_id=20, room='R1'),
+        ])
+
+        self.assertEqual(problems, {})
+
+    def test_other_days_and_blank_rooms_do_not_clash(self):
+        problems = self.index.validate([
+            slot(None, 10, (8, 0), (9, 0), teacher_id=20, room='R1', day='Tuesday'),
+            slot(None, 12, (8, 0), (9, 0)),
+        ])
+
+        self.assertEqual(problems, {})
+
+    def test_proposed_slot_with_an_id_replaces_its_entry(self):
+        problems = self.index.validate([
+            # The existing lesson moves an hour later, freeing its old time for another class
+            slot(self.existing.id, 10, (9, 0), (10, 0), teacher_id=20, room='R1'),
+            slot(None, 12, (8, 0), (9, 0), teacher_id=20, room='R1'),
+        ])
+
+        self.assertEqual(problems, {})
+
+    def test_proposed_slots_clash_with_each_other(self):
+        first = slot(None, 12, (10, 0), (11, 0), teacher_id=22, room='R2')
+
+        problems = self.index.validate([
+            first,
+            slot(None, 13, (10, 30), (11, 30), teacher_id=22, room='R2'),
+            slot(None, 14, (8, 30), (9, 30), teacher_id=21),
+        ])
+
+        clash = first._replace(id=proposed_id(0))
+        self.assertEqual(problems, {
+            1: {'teacher': [clash], 'room': [clash]},
+            2: {'teacher': [self.other]},
+        })
+
+
+class TimetableConflictApiTest(TestCase):
+    """POST /timetable/check_conflicts/ for one slot and for a proposed timetable"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='scheduler', password='scheduler-pass-123', role=User.Role.ADMIN)
+        teacher_user = User.objects.create_user(
+            username='ofori', password='ofori-pass-123', role=User.Role.TEACHER
+        )
+        cls.teacher = Teacher.objects.create(user=teacher_user, first_name='Kwame', last_name='Ofori')
+        year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.class_a = Class.objects.create(class_name='Grade 5A', grade_level=5, academic_year=year)
+        cls.class_b = Class.objects.create(class_name='Grade 5B', grade_level=5, academic_year=year)
+        subject = Subject.objects.create(subject_name='Science', subject_code='SCI5', grade_level=5)
+        cls.entry = Timetable.objects.create(
+            class_obj=cls.class_a, subject=subject, teacher=cls.teacher, term='Term 1',
+            academic_year='2025/2026', day_of_week=Timetable.Day.MONDAY,
+            start_time=time(8, 0), end_time=time(9, 0), room_number='Lab 1'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def check(self, **data):
+        return self.client.post('/timetable/check_conflicts/', data, format='json')
+
+    def single(self, **data):
+        return self.check(
+            class_id=self.class_b.pk, teacher_id=self.teacher.pk, room_number='lab 1',
+            day_of_week='Monday', start_time='08:30', end_time='09:30', **data
+        )
+
+    def test_single_slot_without_term_checks_every_term(self):
+        response = self.single()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['has_conflicts'])
+        clashes = {
+            conflict['type']: [entry['id'] for entry in conflict['entries']] for conflict in response.data['conflicts']
+        }
+        self.assertEqual(clashes, {'teacher': [self.entry.pk], 'room': [self.entry.pk]})
+
+    def test_single_slot_with_term_checks_that_term(self):
+        response = self.single(term='Term 1', academic_year='2025/2026')
+        self.assertTrue(response.data['has_conflicts'])
+
+        # One query loads the term's Monday; nothing clashes, so nothing is serialized
+        with self.assertNumQueries(1):
+            response = self.single(term='Term 2', academic_year='2025/2026')
+        self.assertFalse(response.data['has_conflicts'])
+
+        response = self.single(exclude_id=self.entry.pk)
+        self.assertFalse(response.data['has_conflicts'])
+
+    def test_single_slot_requires_day_and_times(self):
+        for data in [
+            {'start_time': '08:00', 'end_time': '09:00'},
+            {'day_of_week': 'Monday', 'start_time': 'eight', 'end_time': '09:00'},
+            {'day_of_week': 'Monday', 'start_time': '08:00', 'end_time': '09:00', 'class_id': 'A'},
+        ]:
+            with self.subTest(**data):
+                self.assertEqual(self.check(**data).status_code, 400)
+
+    def test_slots_report_existing_and_proposed_clashes(self):
+        response = self.check(term='Term 1', academic_year='2025/2026', slots=[
+            {'class_id': self.class_b.pk, 'teacher_id': self.teacher.pk, 'room_number': 'LAB 1',
+             'day_of_week': 'Monday', 'start_time': '08:30', 'end_time': '09:30'},
+            {'class_id': self.class_b.pk, 'day_of_week': 'Monday', 'start_time': '09:00', 'end_time': '10:00'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(conflict['slot'], conflict['type'], conflict['entry_ids'], conflict['slots'])
+             for conflict in response.data['conflicts']],
+            [
+                (0, 'teacher', [self.entry.pk], []),
+                (0, 'room', [self.entry.pk], []),
+                (1, 'class', [], [0]),
+            ]
+        )
+
+    def test_replace_classes_ignores_their_current_timetable(self):
+        slots = [{'class_id': self.class_a.pk, 'day_of_week': 'Monday', 'start_time': '08:15', 'end_time': '09:15'}]
+
+        response = self.check(slots=slots)
+        self.assertEqual([conflict['type'] for conflict in response.data['conflicts']], ['class'])
+
+        response = self.check(slots=slots, replace_classes=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['has_conflicts'])
+
+    def test_slots_are_validated(self):
+        response = self.check(slots=[
+            {'class_id': self.class_a.pk, 'day_of_week': 'Monday', 'start_time': '10:00', 'end_time': '09:00'}
+        ])
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ScheduleQueryCountTest(TestCase):
+    """Weekly schedules cost the same queries however many lessons and classes they hold"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='planner', password='planner-pass-123', role=User.Role.ADMIN)
+        teacher_user = User.objects.create_user(
+            username='asante', password='asante-pass-123', role=User.Role.TEACHER
+        )
+        cls.teacher = Teacher.objects.create(user=teacher_user, first_name='Ama', last_name='Asante')
+        cls.year = AcademicYear.objects.create(
+            year_name='2025/2026', start_date=date(2025, 9, 1), end_date=date(2026, 7, 31)
+        )
+        cls.school_class = Class.objects.create(
+            class_name='Grade 4A', grade_level=4, academic_year=cls.year, class_teacher=cls.teacher
+        )
+        cls.subject = Subject.objects.create(subject_name='Reading', subject_code='READ4', grade_level=4)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_lessons(self, count):
+        """A morning lesson for the class and an afternoon one in a new class of one active student"""
+        for _ in range(count):
+            number = Enrollment.objects.count()
+            school_class = Class.objects.create(
+                class_name=f'Grade 4{number}', grade_level=4, academic_year=self.year, class_teacher=self.teacher
+            )
+            student = Student.objects.create(
+                admission_number=f'ADM{number:04d}',
+                first_name='Kojo',
+                last_name=f'Addo{number}',
+                date_of_birth=date(2015, 2, 1),
+                gender=Student.Gender.MALE,
+                admission_date=date(2025, 9, 1),
+                class_obj=school_class
+            )
+            Enrollment.objects.create(student=student, class_obj=school_class)
+            for lesson_class, hour in [(self.school_class, 8), (school_class, 13)]:
+                Timetable.objects.create(
+                    class_obj=lesson_class, subject=self.subject, teacher=self.teacher, term='Term 1',
+                    academic_year='2025/2026', day_of_week=Timetable.Day.choices[number % 5][0],
+                    start_time=time(hour + number // 5, 0), end_time=time(hour + 1 + number // 5, 0)
+                )
+
+    def schedule_queries(self, action, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/timetable/{action}/', params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries), response
+
+    def test_class_schedule(self):
+        self.add_lessons(1)
+        small, response = self.schedule_queries('class_schedule', class_id=self.school_class.pk)
+
+        self.add_lessons(6)
+        # Entries with their class, year, class teacher, subject and teacher, plus each
+        # class's active enrollment count, in one query
+        with self.assertNumQueries(1):
+            large, response = self.schedule_queries('class_schedule', class_id=self.school_class.pk)
+        self.assertEqual(small, large)
+        self.assertEqual(sum(len(lessons) for lessons in response.data.values()), 7)
+        self.assertEqual({lesson['class_obj']['current_enrollment'] for lessons in response.data.values()
+                          for lesson in lessons}, {0})
+
+    def test_teacher_schedule(self):
+        self.add_lessons(1)
+        small, response = self.schedule_queries('teacher_schedule', teacher_id=self.teacher.pk)
+
+        self.add_lessons(6)
+        with self.assertNumQueries(1):
+            large, response = self.schedule_queries('teacher_schedule', teacher_id=self.teacher.pk)
+        self.assertEqual(small, large)
+        enrollments = {
+            lesson['class_obj']['id']: lesson['class_obj']['current_enrollment']
+            for lessons in response.data.values() for lesson in lessons
+        }
+        self.assertEqual(len(enrollments), 8)
+        self.assertEqual(enrollments.pop(self.school_class.pk), 0)
+        self.assertEqual(set(enrollments.values()), {1})
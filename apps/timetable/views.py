@@ -4,8 +4,14 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import filters
 
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_time
+
+from .conflicts import CONFLICT_MESSAGES, ConflictIndex, Slot, room_key
+from apps.academic.models import Enrollment
 from .models import Timetable
-from .serializers import TimetableSerializer
+from .serializers import TimetableSerializer, TimetableConflictCheckSerializer
 from apps.accounts.permissions import IsAdminOrHeadmaster
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Syllabus
@@ -15,7 +21,9 @@ from .serializers import SyllabusSerializer, SyllabusListSerializer
 class TimetableViewSet(viewsets.ModelViewSet):
     """ViewSet for Timetable management"""
     
-    queryset = Timetable.objects.select_related('class_obj', 'subject', 'teacher').all()
+    queryset = Timetable.objects.select_related(
+        'class_obj__academic_year', 'class_obj__class_teacher', 'subject', 'teacher'
+    ).all()
     serializer_class = TimetableSerializer
     permission_classes = [IsAuthenticated]
     
@@ -44,6 +52,26 @@ class TimetableViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    def weekly_schedule(self, timetable_entries):
+        """
+        Serialized entries grouped by day. Each class's active enrollment count
+        comes from a subquery, not a COUNT per entry.
+        """
+        active_enrollments = Enrollment.objects.filter(
+            class_obj_id=OuterRef('class_obj_id'), status='active'
+        ).order_by().values('class_obj_id').annotate(total=Count('id')).values('total')
+        timetable_entries = timetable_entries.annotate(
+            class_active_enrollment_count=Coalesce(Subquery(active_enrollments), Value(0), output_field=IntegerField())
+        )
+        
+        # Group by day
+        schedule = {}
+        for entry in timetable_entries:
+            entry.class_obj.active_enrollment_count = entry.class_active_enrollment_count
+            schedule.setdefault(entry.get_day_of_week_display(), []).append(TimetableSerializer(entry).data)
+        
+        return schedule
+    
     @action(detail=False, methods=['get'])
     def class_schedule(self, request):
         """Get full weekly schedule for a class"""
@@ -55,20 +83,11 @@ class TimetableViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        timetable_entries = Timetable.objects.filter(
+        timetable_entries = self.queryset.filter(
             class_obj_id=class_id
-        ).select_related('subject', 'teacher').order_by('day_of_week', 'start_time')
-        
-        # Group by day
-        schedule = {}
-        for entry in timetable_entries:
-            day = entry.get_day_of_week_display()
-            if day not in schedule:
-                schedule[day] = []
-            
-            schedule[day].append(TimetableSerializer(entry).data)
+        ).order_by('day_of_week', 'start_time')
         
-        return Response(schedule)
+        return Response(self.weekly_schedule(timetable_entries))
     
     @action(detail=False, methods=['get'])
     def teacher_schedule(self, request):
@@ -81,69 +100,93 @@ class TimetableViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        timetable_entries = Timetable.objects.filter(
+        timetable_entries = self.queryset.filter(
             teacher_id=teacher_id
-        ).select_related('class_obj', 'subject').order_by('day_of_week', 'start_time')
-        
-        # Group by day
-        schedule = {}
-        for entry in timetable_entries:
-            day = entry.get_day_of_week_display()
-            if day not in schedule:
-                schedule[day] = []
-            
-            schedule[day].append(TimetableSerializer(entry).data)
+        ).order_by('day_of_week', 'start_time')
         
-        return Response(schedule)
+        return Response(self.weekly_schedule(timetable_entries))
     
     @action(detail=False, methods=['post'])
     def check_conflicts(self, request):
-        """Check for scheduling conflicts"""
-        class_id = request.data.get('class_id')
-        teacher_id = request.data.get('teacher_id')
-        day_of_week = request.data.get('day_of_week')
-        start_time = request.data.get('start_time')
-        end_time = request.data.get('end_time')
-        exclude_id = request.data.get('exclude_id')  # For updates
+        """
+        Check scheduling conflicts for one slot, or with `slots` for a whole
+        proposed timetable. The term's timetable is loaded once and every
+        slot is checked in memory for class, teacher and room clashes.
+        """
+        if 'slots' in request.data:
+            return self.check_timetable_conflicts(request)
         
-        conflicts = []
+        try:
+            class_id, teacher_id, exclude_id = (
+                int(request.data[field]) if request.data.get(field) else None
+                for field in ('class_id', 'teacher_id', 'exclude_id')  # exclude_id for updates
+            )
+            start_time = parse_time(str(request.data.get('start_time') or ''))
+            end_time = parse_time(str(request.data.get('end_time') or ''))
+        except (TypeError, ValueError):
+            start_time = end_time = None
+        day_of_week = request.data.get('day_of_week')
         
-        # Check class conflicts
-        if class_id:
-            class_conflicts = Timetable.objects.filter(
-                class_obj_id=class_id,
-                day_of_week=day_of_week,
-                start_time__lt=end_time,
-                end_time__gt=start_time
+        if not day_of_week or start_time is None or end_time is None:
+            return Response(
+                {'error': 'day_of_week, start_time and end_time are required, with integer ids'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            if exclude_id:
-                class_conflicts = class_conflicts.exclude(id=exclude_id)
-            
-            if class_conflicts.exists():
-                conflicts.append({
-                    'type': 'class',
-                    'message': 'Class already has a session at this time',
-                    'entries': TimetableSerializer(class_conflicts, many=True).data
-                })
         
-        # Check teacher conflicts
-        if teacher_id:
-            teacher_conflicts = Timetable.objects.filter(
-                teacher_id=teacher_id,
-                day_of_week=day_of_week,
-                start_time__lt=end_time,
-                end_time__gt=start_time
+        # Clients that send no term or academic year are checked against every term, as before the index
+        index = ConflictIndex.for_term(
+            request.data.get('term'), request.data.get('academic_year'), day_of_week
+        )
+        slot = Slot(
+            None, class_id, teacher_id, room_key(request.data.get('room_number')),
+            day_of_week, start_time, end_time
+        )
+        clashes = index.conflicts(slot, exclude_ids=[exclude_id] if exclude_id else ())
+        
+        # One query serializes the clashing entries of every type
+        entries = self.queryset.in_bulk([other.id for found in clashes.values() for other in found])
+        conflicts = [
+            {
+                'type': kind,
+                'message': CONFLICT_MESSAGES[kind],
+                'entries': TimetableSerializer([entries[other.id] for other in found], many=True).data
+            }
+            for kind, found in clashes.items()
+        ]
+        
+        return Response({
+            'has_conflicts': len(conflicts) > 0,
+            'conflicts': conflicts
+        })
+    
+    def check_timetable_conflicts(self, request):
+        """Batch mode of check_conflicts: validate every proposed slot in one pass"""
+        serializer = TimetableConflictCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        slots = [
+            Slot(
+                slot.get('id'), slot['class_id'], slot.get('teacher_id'), room_key(slot['room_number']),
+                slot['day_of_week'], slot['start_time'], slot['end_time']
             )
-            
-            if exclude_id:
-                teacher_conflicts = teacher_conflicts.exclude(id=exclude_id)
-            
-            if teacher_conflicts.exists():
+            for slot in data['slots']
+        ]
+        
+        index = ConflictIndex.for_term(data.get('term'), data.get('academic_year'))
+        if data['replace_classes']:
+            index.remove_classes({slot.class_id for slot in slots})
+        problems = index.validate(slots)
+        
+        conflicts = []
+        for position, clashes in sorted(problems.items()):
+            for kind, found in clashes.items():
                 conflicts.append({
-                    'type': 'teacher',
-                    'message': 'Teacher already has a session at this time',
-                    'entries': TimetableSerializer(teacher_conflicts, many=True).data
+                    'slot': position,
+                    'type': kind,
+                    'message': CONFLICT_MESSAGES[kind],
+                    'entry_ids': [other.id for other in found if isinstance(other.id, int)],
+                    'slots': [other.id[1] for other in found if isinstance(other.id, tuple)]
                 })
         
         return Response({
@@ -0,0 +1,142 @@
+import math
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.academic.models import AcademicYear, Class
+from apps.attendance.models import Attendance
+from apps.finance.models import Invoice, Payment
+from apps.grades.models import Grade
+from apps.staff.models import Staff
+from apps.students.models import Student
+from config.profiling import RequestProfile
+
+
+# (name, path); placeholders are filled from the data being benchmarked
+BENCHMARK_ENDPOINTS = [
+    ('students.list', '/students/'),
+    ('students.list_details', '/students/?details=true'),
+    ('students.search', '/students/?search={search}'),
+    ('students.retrieve', '/students/{student_id}/'),
+    ('classes.students', '/classes/{class_id}/students/'),
+    ('classes.statistics', '/classes/{class_id}/statistics/'),
+    ('staff.list', '/staff/'),
+    ('attendance.list', '/attendance/'),
+    ('attendance.keyset', '/attendance/?cursor='),
+    ('attendance.class_attendance', '/attendance/class_attendance/?class_id={class_id}&date={last_day}'),
+    ('attendance.class_summary', '/attendance/class_summary/?class_id={class_id}&start_date={start}&end_date={end}'),
+    ('attendance.student_report', '/attendance/student_report/?student_id={student_id}&start_date={start}&end_date={end}'),
+    ('grades.list', '/grades/'),
+    ('transcripts.list', '/transcripts/'),
+    ('transcripts.retrieve', '/transcripts/{student_id}/'),
+    ('invoices.list', '/invoices/'),
+    ('payments.list', '/payments/'),
+    ('finance.summary', '/financial-dashboard/summary/?start_date={start}&end_date={end}'),
+    ('finance.monthly_trends', '/financial-dashboard/monthly_trends/?year={year}'),
+    ('search.typeahead', '/search/?q={search}'),
+    ('dashboard.summary', '/api/dashboard-summary/'),
+]
+
+# Counted into the baseline so results from differently sized datasets are not compared blindly
+DATASET_MODELS = [Student, Staff, Attendance, Grade, Invoice, Payment]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * fraction)) - 1]
+
+
+def dataset_summary():
+    return {model._meta.db_table: model.objects.count() for model in DATASET_MODELS}
+
+
+def endpoint_parameters():
+    """Placeholder values taken from the data: the busiest class, one of its students, the current year"""
+    academic_year = AcademicYear.objects.filter(is_current=True).first() or AcademicYear.objects.order_by('-start_date').first()
+    class_obj = Class.objects.annotate(size=Count('enrollments')).order_by('-size', 'id').first()
+    student = None
+    if class_obj is not None:
+        student = Student.objects.filter(enrollments__class_obj=class_obj).order_by('id').first()
+    student = student or Student.objects.order_by('id').first()
+    last_day = Attendance.objects.order_by('-attendance_date').values_list('attendance_date', flat=True).first()
+    start = academic_year.start_date if academic_year else timezone.localdate().replace(month=1, day=1)
+    end = academic_year.end_date if academic_year else timezone.localdate()
+    return {
+        'student_id': student.pk if student else 0,
+        'class_id': class_obj.pk if class_obj else 0,
+        'search': student.last_name[:4].lower() if student else 'a',
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'last_day': (last_day or end).isoformat(),
+        'year': start.year,
+    }
+
+
+def run_benchmark(user, runs=20, warmup=2, names=None):
+    """
+    Request each endpoint `warmup` + `runs` times through the test client as
+    `user` and report status, p50/p95/max latency and the query count. Warm-up
+    requests fill caches first, so the figures describe steady-state reads.
+    """
+    parameters = endpoint_parameters()
+    client = APIClient()
+    client.force_authenticate(user)
+    results = {}
+
+    with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+        for name, template in BENCHMARK_ENDPOINTS:
+            if names and name not in names:
+                continue
+            path = template.format(**parameters)
+            for _ in range(warmup):
+                client.get(path)
+
+            latencies, query_counts, status_code = [], [], None
+            for _ in range(runs):
+                profile = RequestProfile()
+                start = time.perf_counter()
+                with ExitStack() as stack:
+                    for alias in connections:
+                        stack.enter_context(connections[alias].execute_wrapper(profile))
+                    response = client.get(path)
+                latencies.append((time.perf_counter() - start) * 1000)
+                query_counts.append(profile.queries)
+                status_code = response.status_code
+
+            results[name] = {
+                'path': path,
+                'status': status_code,
+                'p50_ms': round(percentile(latencies, 0.50), 2),
+                'p95_ms': round(percentile(latencies, 0.95), 2),
+                'max_ms': round(max(latencies), 2),
+                'queries': max(query_counts),
+            }
+    return results
+
+
+def find_regressions(baseline, current, latency_tolerance=0.5, latency_floor_ms=5.0):
+    """
+    Differences between two benchmark results that count as regressions:
+    a changed status code, any extra query, a p50 latency more than
+    `latency_tolerance` above the baseline, or a p95 more than twice that.
+    Slowdowns under `latency_floor_ms` are treated as noise.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = current.get(name)
+        if actual is None:
+            continue
+        if actual['status'] != expected['status']:
+            regressions.append(f"{name}: status {expected['status']} -> {actual['status']}")
+        if actual['queries'] > expected['queries']:
+            regressions.append(f"{name}: queries {expected['queries']} -> {actual['queries']}")
+        for key, tolerance in (('p50_ms', latency_tolerance), ('p95_ms', latency_tolerance * 2)):
+            allowed = max(expected[key] * (1 + tolerance), expected[key] + latency_floor_ms)
+            if actual[key] > allowed:
+                regressions.append(f"{name}: {key[:3]} {expected[key]}ms -> {actual[key]}ms")
+    return regressions
@@ -0,0 +1,166 @@
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Page-number pagination that switches to keyset (seek) pagination when the
+    request carries a `cursor` parameter (empty for the first page).
+
+    Keyset pages filter on the last row seen instead of using OFFSET, and skip
+    COUNT(*) unless `count=exact` or `count=approximate` is requested, so every
+    page costs the same however deep it is. Views declare the walk order in
+    `keyset_ordering`; it must end with a unique column and be backed by a
+    composite index on the same columns.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    # `count=approximate` stops counting here and reports "at least this many"
+    approximate_count_limit = 10000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def is_keyset_request(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.is_keyset_request(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(view)
+        self.fields = {
+            name: queryset.model._meta.get_field(name) for name, descending in self.ordering
+        }
+
+        self.count, self.count_is_exact = self.get_count(queryset, request)
+
+        position, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.order_expressions(reverse))
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(position, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        # Walking backwards from a cursor means the rows after it exist
+        self.has_next = has_more if not reverse else position is not None
+        self.has_previous = position is not None if not reverse else has_more
+        self.page_rows = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+        if self.count is not None:
+            payload['count'] = self.count
+            payload['count_is_exact'] = self.count_is_exact
+        payload['results'] = data
+        return Response(payload)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not (self.has_next and self.page_rows):
+            return None
+        return self.encode_cursor(self.page_rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not (self.has_previous and self.page_rows):
+            return None
+        return self.encode_cursor(self.page_rows[0], reverse=True)
+
+    def get_ordering(self, view):
+        ordering = getattr(view, 'keyset_ordering', None) or ('-id',)
+        return [(field.lstrip('-'), field.startswith('-')) for field in ordering]
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count(), True
+        if mode == 'approximate':
+            # Bounded count: COUNT(*) over at most limit + 1 rows
+            limit = self.approximate_count_limit
+            count = queryset.order_by()[:limit + 1].count()
+            return min(count, limit), count <= limit
+        return None, None
+
+    def order_expressions(self, reverse):
+        # Nulls sort after every value in the forward walk, so before them in reverse
+        expressions = []
+        for name, descending in self.ordering:
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+            nulls = nulls if self.fields[name].null else {}
+            if descending != reverse:
+                expressions.append(F(name).desc(**nulls))
+            else:
+                expressions.append(F(name).asc(**nulls))
+        return expressions
+
+    def seek_filter(self, position, reverse):
+        """Rows strictly after `position` in the walk order: (a, b) < (x, y) expanded"""
+        condition = None
+        equal = Q()
+        for (name, descending), value in zip(self.ordering, position):
+            after = self._after(name, value, descending != reverse, nulls_last=not reverse)
+            if after is not None:
+                condition = equal & after if condition is None else condition | (equal & after)
+            equal &= Q(**{f'{name}__isnull': True}) if value is None else Q(**{name: value})
+        return condition
+
+    def _after(self, name, value, descending, nulls_last):
+        if value is None:
+            return None if nulls_last else Q(**{f'{name}__isnull': False})
+        after = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+        if self.fields[name].null and nulls_last:
+            after |= Q(**{f'{name}__isnull': True})
+        return after
+
+    def encode_cursor(self, row, reverse):
+        position = []
+        for name, descending in self.ordering:
+            value = getattr(row, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        token = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        encoded = base64.urlsafe_b64encode(token.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            values, reverse = token['p'], bool(token['r'])
+            if len(values) != len(self.ordering):
+                raise ValueError
+            position = [
+                None if value is None else self.fields[name].to_python(value)
+                for (name, descending), value in zip(self.ordering, values)
+            ]
+            if position[-1] is None:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
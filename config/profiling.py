@@ -0,0 +1,259 @@
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from rest_framework import serializers
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+IN_LIST_PATTERN = re.compile(r'\((?:%s, )+%s\)')
+STRING_LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+_current_profile = contextvars.ContextVar('request_profile', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A view ran more queries than its declared budget"""
+
+
+def fingerprint(sql):
+    """SQL with literals and IN-list lengths erased, so repeats of one query compare equal"""
+    sql = IN_LIST_PATTERN.sub('(...)', sql)
+    sql = STRING_LITERAL_PATTERN.sub('?', sql)
+    return NUMBER_LITERAL_PATTERN.sub('?', sql)
+
+
+class RequestProfile:
+    """Counters for one request, fed by a database execute wrapper"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def duplicates(self, limit=5):
+        """The most repeated query shapes, as (fingerprint, count); N+1 loops show up here"""
+        return [(sql, count) for sql, count in self.fingerprints.most_common(limit) if count > 1]
+
+
+def current_profile():
+    return _current_profile.get()
+
+
+def _timed_data(data_property):
+    def data(serializer):
+        profile = current_profile()
+        if profile is None:
+            return data_property.fget(serializer)
+        # Serializers built inside another's .data are part of its time
+        profile.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data_property.fget(serializer)
+        finally:
+            profile.serializer_depth -= 1
+            if not profile.serializer_depth:
+                profile.serializer_time += time.perf_counter() - start
+
+    data.profiled = True
+    return property(data)
+
+
+def instrument_serializers():
+    """Time Serializer.data and ListSerializer.data, where serialization and its lazy queries run"""
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        data_property = serializer_class.__dict__['data']
+        if not getattr(data_property.fget, 'profiled', False):
+            serializer_class.data = _timed_data(data_property)
+
+
+class EndpointStats:
+    """Histograms and totals for one endpoint"""
+
+    def __init__(self):
+        self.requests = 0
+        self.latency_histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.query_histogram = [0] * (len(QUERY_COUNT_BUCKETS) + 1)
+        self.total_latency = 0.0
+        self.total_db_time = 0.0
+        self.total_serializer_time = 0.0
+        self.total_queries = 0
+        self.max_latency = 0.0
+        self.max_queries = 0
+
+    @staticmethod
+    def _bucket(bounds, value):
+        for position, bound in enumerate(bounds):
+            if value <= bound:
+                return position
+        return len(bounds)
+
+    def add(self, profile, latency):
+        latency_ms = latency * 1000
+        self.requests += 1
+        self.latency_histogram[self._bucket(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.query_histogram[self._bucket(QUERY_COUNT_BUCKETS, profile.queries)] += 1
+        self.total_latency += latency_ms
+        self.total_db_time += profile.db_time * 1000
+        self.total_serializer_time += profile.serializer_time * 1000
+        self.total_queries += profile.queries
+        self.max_latency = max(self.max_latency, latency_ms)
+        self.max_queries = max(self.max_queries, profile.queries)
+
+    @staticmethod
+    def _histogram(bounds, counts):
+        labels = [f'<={bound}' for bound in bounds] + [f'>{bounds[-1]}']
+        return dict(zip(labels, counts))
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            'requests': self.requests,
+            'avg_latency_ms': round(self.total_latency / requests, 2),
+            'max_latency_ms': round(self.max_latency, 2),
+            'avg_db_time_ms': round(self.total_db_time / requests, 2),
+            'avg_serializer_time_ms': round(self.total_serializer_time / requests, 2),
+            'avg_queries': round(self.total_queries / requests, 2),
+            'max_queries': self.max_queries,
+            'total_time_ms': round(self.total_latency, 2),
+            'latency_ms': self._histogram(LATENCY_BUCKETS_MS, self.latency_histogram),
+            'queries': self._histogram(QUERY_COUNT_BUCKETS, self.query_histogram),
+        }
+
+
+class ProfileStore:
+    """Per-process aggregate of request profiles, keyed by endpoint tag"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+            self.since = timezone.now()
+
+    def record(self, tag, profile, latency):
+        with self._lock:
+            stats = self._endpoints.get(tag)
+            if stats is None:
+                stats = self._endpoints[tag] = EndpointStats()
+            stats.add(profile, latency)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {tag: stats.as_dict() for tag, stats in self._endpoints.items()}
+        ordered = sorted(endpoints.items(), key=lambda item: -item[1]['total_time_ms'])
+        return {
+            'pid': os.getpid(),
+            'since': self.since,
+            'endpoints': dict(ordered),
+        }
+
+
+store = ProfileStore()
+
+
+def describe_view(resolver_match, method):
+    """
+    (view class, action, tag) for a resolved request. Router views are tagged
+    with their basename and action, e.g. "grade.list" or "user.deactivate";
+    other views with their URL name and HTTP method.
+    """
+    func = resolver_match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    actions = getattr(func, 'actions', None)
+    action = actions.get(method.lower(), method.lower()) if actions else method.lower()
+    basename = getattr(func, 'initkwargs', {}).get('basename')
+    name = basename or resolver_match.url_name or resolver_match.view_name or func.__name__
+    return view_class, action, f'{name}.{action}'
+
+
+def query_budget(view_class, action):
+    """The view's `query_budgets` entry for an action, None if it declares none"""
+    budgets = getattr(view_class, 'query_budgets', None) or {}
+    return budgets.get(action)
+
+
+class ProfilingMiddleware:
+    """
+    Records query count, DB time, serializer time and latency for every
+    request, aggregated per endpoint in `store`.
+
+    Slow requests are logged with their most repeated query shapes. Views may
+    declare `query_budgets = {action: max_queries}`; going over budget is
+    logged, or raises QueryBudgetExceeded when PROFILING_ENFORCE_BUDGETS is
+    set. PROFILING_ENABLED defaults to DEBUG. Queries issued while a
+    streaming response is consumed fall outside the measured request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        if not getattr(settings, 'PROFILING_ENABLED', True):
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        latency = time.perf_counter() - start
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return response
+
+        view_class, action, tag = describe_view(resolver_match, request.method)
+        store.record(tag, profile, latency)
+
+        slow_ms = getattr(settings, 'PROFILING_SLOW_REQUEST_MS', 500)
+        if latency * 1000 >= slow_ms:
+            logger.warning(
+                "Slow request %s %s (%s): %.0fms, %d queries in %.0fms, serializers %.0fms; repeated queries: %s",
+                request.method, request.path, tag, latency * 1000, profile.queries,
+                profile.db_time * 1000, profile.serializer_time * 1000, profile.duplicates()
+            )
+
+        budget = query_budget(view_class, action)
+        if budget is not None and profile.queries > budget:
+            message = (
+                f"{tag} ran {profile.queries} queries, over its budget of {budget}; "
+                f"repeated queries: {profile.duplicates()}"
+            )
+            if getattr(settings, 'PROFILING_ENFORCE_BUDGETS', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+
+        return response
@@ -36,9 +36,11 @@ INSTALLED_APPS = [
     'apps.finance',
     'apps.timetable',
     'apps.teachers',
+    'apps.search',
 ]
 
 MIDDLEWARE = [
+    'config.profiling.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -108,6 +110,46 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'mediafiles'
 
+# Cache
+# Shared across workers when REDIS_URL is set; the local-memory fallback is per process
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache timeouts below: writes invalidate entries sooner, but without REDIS_URL an
+# invalidation only reaches the worker that made the write, so other workers keep
+# serving stale entries until they expire; the defaults are kept short in that case
+
+# Seconds a cached financial dashboard summary is served
+FINANCE_SUMMARY_CACHE_TIMEOUT = config('FINANCE_SUMMARY_CACHE_TIMEOUT', default=900 if REDIS_URL else 60, cast=int)
+
+# Seconds a user's cached teaching scope is kept
+PRINCIPAL_CACHE_TIMEOUT = config('PRINCIPAL_CACHE_TIMEOUT', default=3600 if REDIS_URL else 60, cast=int)
+
+# Seconds each worker trusts a user's cached is_active flag and token claims
+JWT_USER_STATUS_TIMEOUT = config('JWT_USER_STATUS_TIMEOUT', default=60, cast=int)
+
+# Seconds each worker keeps a staff member's salary structures
+SALARY_STRUCTURE_CACHE_TIMEOUT = config(
+    'SALARY_STRUCTURE_CACHE_TIMEOUT', default=300 if REDIS_URL else 60, cast=int
+)
+
+# Request profiling (config/profiling.py); set PROFILING_ENFORCE_BUDGETS to raise on over-budget views
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=DEBUG, cast=bool)
+PROFILING_SLOW_REQUEST_MS = config('PROFILING_SLOW_REQUEST_MS', default=500, cast=int)
+PROFILING_ENFORCE_BUDGETS = config('PROFILING_ENFORCE_BUDGETS', default=False, cast=bool)
+
 # Default primary key
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -117,7 +159,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.accounts.authentication.ClaimsJWTAuthentication',
         # 'rest_framework.authentication.TokenAuthentication',  # Changed from JWT
         # 'rest_framework.authentication.SessionAuthentication',  # For browsable API
     ],
@@ -139,7 +181,7 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
-    'UPDATE_LAST_LOGIN': True,
+    'UPDATE_LAST_LOGIN': False,
     
     'ALGORITHM': 'HS256',
     'SIGNING_KEY': SECRET_KEY,
@@ -1,6 +1,8 @@
 from .base import *
 
 DEBUG = True
+# base.py read DEBUG before it was forced on here
+PROFILING_ENABLED = config('PROFILING_ENABLED', default=True, cast=bool)
 ALLOWED_HOSTS = ["*"]
 CORS_ALLOW_ALL_ORIGINS = True
 
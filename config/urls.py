@@ -25,7 +25,8 @@ from apps.finance.views import (
     ExpenditureViewSet, FinancialDashboardViewSet
 )
 from apps.timetable.views import TimetableViewSet,SyllabusViewSet
-from apps.summary.views import DashboardSummary
+from apps.summary.views import DashboardSummary, ProfilingSummary
+from apps.search.views import SearchViewSet
 
 # Create router
 router = routers.DefaultRouter()
@@ -56,6 +57,7 @@ router.register(r'financial-dashboard', FinancialDashboardViewSet, basename='fin
 router.register(r'timetable', TimetableViewSet, basename='timetable')
 router.register(r'syllabi', SyllabusViewSet, basename='syllabi')
 router.register(r'teachers', TeacherViewSet, basename='teacher')
+router.register(r'search', SearchViewSet, basename='search')
 urlpatterns = [
     # Root endpoint
     path('', lambda r: JsonResponse({
@@ -84,6 +86,7 @@ urlpatterns = [
     path('auth/me/', CurrentUserView.as_view(), name='current-user'),
 
     path('api/dashboard-summary/', DashboardSummary.as_view(), name='dashboard-summary'),
+    path('api/profiling/', ProfilingSummary.as_view(), name='profiling-summary'),
     path('', include(router.urls)),
 ]
 